@@ -4,7 +4,7 @@ from django.contrib.auth.models import User, Group
 from django.contrib import messages
 from .models import (
     Bank, Zone, Scheme, Supplier, DebitAccount,
-    EFTBatch, EFTTransaction, ApprovalAuditLog
+    EFTBatch, EFTTransaction, ApprovalAuditLog, ArchivedEFTBatch
 )
 
 # Custom User Admin - SIMPLIFIED for Django Admin
@@ -12,6 +12,9 @@ class CustomUserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'get_groups', 'is_staff', 'is_active')
     list_filter = ('groups', 'is_staff', 'is_active')
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('groups')
+    
     def get_groups(self, obj):
         return ", ".join([g.name for g in obj.groups.all()])
     get_groups.short_description = 'Roles'
@@ -94,17 +97,46 @@ class EFTBatchAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         return False
 
+    def has_delete_permission(self, request, obj=None):
+        # Batches with audit history are part of the hash chain; they are
+        # only ever removed by archive_batches
+        if obj is not None and obj.audit_logs.exists():
+            return False
+        return super().has_delete_permission(request, obj)
+
 # Approval Audit Log Admin
 @admin.register(ApprovalAuditLog)
 class ApprovalAuditLogAdmin(admin.ModelAdmin):
     list_display = ('batch', 'action', 'user', 'timestamp', 'ip_address')
     list_filter = ('action', 'timestamp')
     search_fields = ('batch__batch_reference', 'user__username')
-    readonly_fields = ('batch', 'action', 'user', 'timestamp', 'remarks', 'ip_address')
+    readonly_fields = ('batch', 'action', 'user', 'timestamp', 'remarks', 'ip_address', 'prev_hash', 'entry_hash')
     
     def has_add_permission(self, request):
         return False
 
+    # Append-only: deleting a row would break the hash chain (see audit.py)
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+# Archived batches are read-only; they are written only by archive_batches
+@admin.register(ArchivedEFTBatch)
+class ArchivedEFTBatchAdmin(admin.ModelAdmin):
+    list_display = ('batch_reference', 'batch_name', 'status', 'total_amount',
+                   'record_count', 'created_by', 'approved_at', 'archived_at')
+    list_filter = ('file_type', 'archived_at')
+    search_fields = ('batch_reference', 'batch_name')
+    list_select_related = ('created_by',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 # Custom Group Admin
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('name', 'get_permissions_count')
@@ -0,0 +1,271 @@
+"""
+analytics.py — Daily rollups for management reporting and dashboard trends.
+
+SpendRollup holds one row per approval day × zone × scheme × cost centre ×
+file type with the number of lines and their total. Approving a batch adds
+its transactions in the same transaction as the status change; exporting an
+approved batch does not change what was spent, so it is counted once, on
+approval. Reports then aggregate a few thousand rollup rows per year
+instead of scanning transactions through batch.status.
+
+rebuild_spend_rollups() recomputes the table (or a date range of it) from
+APPROVED/EXPORTED live transactions plus the archive.
+
+DailyMetric is the dashboard's time series: per day, batches created,
+submitted, approved, rejected and exported, the amounts moved and the number
+of users who acted. Counters are bumped as events happen; the nightly
+record_daily_metrics() recomputes recent days from batches and audit logs,
+which also corrects drift (e.g. deleted drafts) and fills active_users.
+trend() serves the last N days from N rows.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    ApprovalAuditLog, ArchivedAuditLog, ArchivedEFTBatch, ArchivedEFTTransaction,
+    DailyMetric, EFTBatch, EFTTransaction, SpendRollup,
+)
+from .signals import batch_status_changed
+from .stats import PAID_STATUSES
+
+DIMENSIONS = ('zone_id', 'scheme_id', 'cost_center')
+
+# group_by choice -> (label, rollup values() fields)
+GROUPINGS = {
+    'month': ('Month', ['month']),
+    'zone': ('Zone', ['zone__zone_code', 'zone__zone_name']),
+    'scheme': ('Scheme', ['scheme__scheme_code', 'scheme__scheme_name']),
+    'cost_center': ('Cost Centre', ['cost_center']),
+    'file_type': ('File Type', ['file_type']),
+}
+
+
+def _add(rows):
+    """Upsert (key -> [count, amount]) into SpendRollup with F() increments."""
+    with transaction.atomic():
+        SpendRollup.objects.bulk_create(
+            [SpendRollup(day=day, zone_id=zone_id, scheme_id=scheme_id, cost_center=cost_center, file_type=file_type)
+             for day, zone_id, scheme_id, cost_center, file_type in rows],
+            ignore_conflicts=True,
+        )
+        for (day, zone_id, scheme_id, cost_center, file_type), (count, amount) in rows.items():
+            SpendRollup.objects.filter(
+                day=day, zone_id=zone_id, scheme_id=scheme_id, cost_center=cost_center, file_type=file_type,
+            ).update(line_count=F('line_count') + count, amount=F('amount') + amount)
+
+
+def record_batch_spend(batch):
+    """Add an approved batch's transactions to the rollups for its approval day."""
+    day = timezone.localdate(batch.approved_at or timezone.now())
+    rows = {
+        (day, row['zone_id'], row['scheme_id'], row['cost_center'], batch.file_type): (row['count'], row['total'])
+        for row in (
+            EFTTransaction.objects.filter(batch=batch).order_by()
+            .values(*DIMENSIONS).annotate(count=Count('id'), total=Sum('amount'))
+        )
+    }
+    if rows:
+        _add(rows)
+
+
+@receiver(batch_status_changed)
+def _roll_up_approved_batch(sender, batch, old_status, new_status, **kwargs):
+    if new_status == 'APPROVED' and old_status not in PAID_STATUSES:
+        record_batch_spend(batch)
+
+
+def rebuild_spend_rollups(date_from=None, date_to=None):
+    """
+    Recompute the rollups, for every day or only ``date_from``..``date_to``
+    (inclusive); returns the number of rows written.
+    """
+    totals = {}
+    for model in (EFTTransaction, ArchivedEFTTransaction):
+        queryset = (
+            model.objects.filter(batch__status__in=PAID_STATUSES)
+            .annotate(day=TruncDate(Coalesce('batch__approved_at', 'batch__updated_at')))
+        )
+        if date_from:
+            queryset = queryset.filter(day__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(day__lte=date_to)
+        rows = (
+            queryset.order_by()
+            .values('day', *DIMENSIONS, file_type=F('batch__file_type'))
+            .annotate(count=Count('id'), total=Sum('amount'))
+        )
+        for row in rows:
+            key = (row['day'], row['zone_id'], row['scheme_id'], row['cost_center'], row['file_type'])
+            entry = totals.setdefault(key, [0, 0])
+            entry[0] += row['count']
+            entry[1] += row['total'] or 0
+
+    rollups = [
+        SpendRollup(day=day, zone_id=zone_id, scheme_id=scheme_id, cost_center=cost_center,
+                    file_type=file_type, line_count=count, amount=amount)
+        for (day, zone_id, scheme_id, cost_center, file_type), (count, amount) in totals.items()
+    ]
+    stale = SpendRollup.objects.all()
+    if date_from:
+        stale = stale.filter(day__gte=date_from)
+    if date_to:
+        stale = stale.filter(day__lte=date_to)
+    with transaction.atomic():
+        stale.delete()
+        SpendRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def default_period(today=None):
+    """The last 12 months, ending today."""
+    today = today or timezone.localdate()
+    return today - timedelta(days=365), today
+
+
+def spend_report(date_from, date_to, group_by='month', filters=None):
+    """
+    Spend between ``date_from`` and ``date_to`` (inclusive) grouped by one
+    of GROUPINGS; ``filters`` narrows by zone_id/scheme_id/cost_center/
+    file_type. Returns dicts with the group fields, line_count and amount.
+    """
+    fields = GROUPINGS[group_by][1]
+    queryset = SpendRollup.objects.filter(day__range=(date_from, date_to), **(filters or {}))
+    if group_by == 'month':
+        queryset = queryset.annotate(month=TruncMonth('day'))
+    return list(
+        queryset.order_by()
+        .values(*fields)
+        .annotate(line_count=Sum('line_count'), amount=Sum('amount'))
+        .order_by('month' if group_by == 'month' else '-amount')
+    )
+
+
+# ---- daily metrics ----
+
+# new batch status -> (counter, amount) bumped when a batch enters it
+STATUS_METRICS = {
+    'PENDING_FM': ('batches_submitted', 'amount_submitted'),
+    'APPROVED': ('batches_approved', 'amount_approved'),
+    'REJECTED': ('batches_rejected', None),
+    'EXPORTED': ('batches_exported', 'amount_exported'),
+}
+# the same events as recorded in the audit log
+ACTION_METRICS = {
+    'SUBMITTED': STATUS_METRICS['PENDING_FM'],
+    'APPROVED': STATUS_METRICS['APPROVED'],
+    'FM_REJECTED': STATUS_METRICS['REJECTED'],
+    'REJECTED': STATUS_METRICS['REJECTED'],
+    'EXPORTED': STATUS_METRICS['EXPORTED'],
+}
+METRIC_FIELDS = (
+    'batches_created', 'batches_submitted', 'batches_approved', 'batches_rejected', 'batches_exported',
+    'amount_submitted', 'amount_approved', 'amount_exported', 'active_users',
+)
+
+
+def bump_metrics(day, **increments):
+    """Add ``increments`` (field=amount) to ``day``'s DailyMetric row."""
+    with transaction.atomic():
+        DailyMetric.objects.bulk_create([DailyMetric(day=day)], ignore_conflicts=True)
+        DailyMetric.objects.filter(day=day).update(
+            updated_at=timezone.now(), **{field: F(field) + value for field, value in increments.items()}
+        )
+
+
+@receiver(post_save, sender=EFTBatch)
+def _count_created_batch(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump_metrics(timezone.localdate(instance.created_at), batches_created=1)
+
+
+@receiver(batch_status_changed)
+def _count_status_change(sender, batch, old_status, new_status, **kwargs):
+    if new_status == old_status or new_status not in STATUS_METRICS:
+        return
+    counter, amount = STATUS_METRICS[new_status]
+    increments = {counter: 1}
+    if amount:
+        increments[amount] = batch.total_amount or 0
+    bump_metrics(timezone.localdate(), **increments)
+
+
+def _day_bounds(date_from, date_to):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(date_from, time.min), tz),
+        timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min), tz),
+    )
+
+
+def record_daily_metrics(date_from, date_to):
+    """
+    Recompute DailyMetric for every day from ``date_from`` to ``date_to``
+    (inclusive) from batches and audit logs, live and archived; days without
+    activity get a zero row. Returns the number of rows written.
+    """
+    start, end = _day_bounds(date_from, date_to)
+    days = {}
+    users = {}
+
+    def metrics(day):
+        return days.setdefault(day, dict.fromkeys(METRIC_FIELDS, 0))
+
+    for model in (EFTBatch, ArchivedEFTBatch):
+        created = (
+            model.objects.filter(created_at__gte=start, created_at__lt=end)
+            .annotate(day=TruncDate('created_at')).order_by()
+            .values('day', 'created_by_id').annotate(count=Count('id'))
+        )
+        for row in created:
+            metrics(row['day'])['batches_created'] += row['count']
+            users.setdefault(row['day'], set()).add(row['created_by_id'])
+
+    for model in (ApprovalAuditLog, ArchivedAuditLog):
+        events = (
+            model.objects.filter(timestamp__gte=start, timestamp__lt=end)
+            .annotate(day=TruncDate('timestamp')).order_by()
+            .values('day', 'action', 'user_id')
+            .annotate(count=Count('id'), total=Sum('batch__total_amount'))
+        )
+        for row in events:
+            users.setdefault(row['day'], set()).add(row['user_id'])
+            if row['action'] not in ACTION_METRICS:
+                continue
+            counter, amount = ACTION_METRICS[row['action']]
+            entry = metrics(row['day'])
+            entry[counter] += row['count']
+            if amount:
+                entry[amount] += row['total'] or 0
+
+    rows = []
+    day = date_from
+    while day <= date_to:
+        values = metrics(day)
+        values['active_users'] = len(users.get(day, ()))
+        rows.append(DailyMetric(day=day, **values))
+        day += timedelta(days=1)
+    with transaction.atomic():
+        DailyMetric.objects.filter(day__range=(date_from, date_to)).delete()
+        DailyMetric.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def trend(days=90, today=None):
+    """The last ``days`` days of metrics, oldest first, with zeros for missing rows."""
+    today = today or timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    stored = {
+        row['day']: row
+        for row in DailyMetric.objects.filter(day__range=(first, today)).values('day', *METRIC_FIELDS)
+    }
+    series = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        series.append(stored.get(day) or dict(dict.fromkeys(METRIC_FIELDS, 0), day=day))
+    return series
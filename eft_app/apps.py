@@ -6,4 +6,13 @@ class EftAppConfig(AppConfig):
     
     def ready(self):
         """Import signals when app is ready"""
-        import eft_app.permissions  # noqa
\ No newline at end of file
+        import eft_app.permissions  # noqa
+        import eft_app.context_processors  # noqa
+        import eft_app.events  # noqa
+        import eft_app.search  # noqa
+        import eft_app.checks  # noqa
+        import eft_app.stats  # noqa
+        import eft_app.analytics  # noqa
+        import eft_app.reference_data  # noqa
+        import eft_app.health  # noqa
+        import eft_app.middleware  # noqa
\ No newline at end of file
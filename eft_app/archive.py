@@ -0,0 +1,121 @@
+"""
+archive.py — Cold archive tier for old exported batches.
+
+archive_batches() moves EXPORTED batches whose export is older than the
+cutoff, with their transactions and audit logs, into the Archived* tables.
+Each chunk of batches is copied and deleted in one transaction, so an
+interrupted run leaves every batch either fully live or fully archived and
+simply resumes on the next run.
+
+get_batch() is the read side: live table first, archive second.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from . import search
+from .models import (
+    ApprovalAuditLog, ArchivedAuditLog, ArchivedEFTBatch, ArchivedEFTTransaction,
+    EFTBatch, EFTTransaction,
+)
+
+DEFAULT_ARCHIVE_AFTER_MONTHS = 24
+INSERT_BATCH_SIZE = 1000
+
+
+def archive_cutoff(months=None):
+    if months is None:
+        months = getattr(settings, 'EFT_ARCHIVE_AFTER_MONTHS', DEFAULT_ARCHIVE_AFTER_MONTHS)
+    return timezone.now() - timedelta(days=30 * months)
+
+
+def archivable_batches(cutoff):
+    """Ids of EXPORTED batches whose (latest) export is older than ``cutoff``."""
+    exported_recently = ApprovalAuditLog.objects.filter(action='EXPORTED', timestamp__gte=cutoff)
+    return (
+        EFTBatch.objects
+        .filter(status='EXPORTED', audit_logs__action='EXPORTED', audit_logs__timestamp__lt=cutoff)
+        .exclude(id__in=exported_recently.values('batch_id'))
+        .order_by('id')
+        .values_list('id', flat=True)
+        .distinct()
+    )
+
+
+def _copy(source, target_model):
+    values = {f.attname: getattr(source, f.attname) for f in source._meta.concrete_fields}
+    allowed = {f.attname for f in target_model._meta.concrete_fields}
+    return target_model(**{k: v for k, v in values.items() if k in allowed})
+
+
+def archive_chunk(batch_ids):
+    """Archive the given batches atomically; returns (batches, transactions, logs) moved."""
+    moved = [0, 0, 0]
+    with transaction.atomic():
+        # Lock and re-check: a batch may have changed since it was selected
+        batches = list(EFTBatch.objects.select_for_update().filter(id__in=batch_ids, status='EXPORTED'))
+        if not batches:
+            return tuple(moved)
+        ids = [b.id for b in batches]
+
+        ArchivedEFTBatch.objects.bulk_create([_copy(b, ArchivedEFTBatch) for b in batches])
+        moved[0] = len(batches)
+
+        rows = []
+        for txn in EFTTransaction.objects.filter(batch_id__in=ids).order_by('id').iterator(chunk_size=INSERT_BATCH_SIZE):
+            rows.append(_copy(txn, ArchivedEFTTransaction))
+            if len(rows) >= INSERT_BATCH_SIZE:
+                ArchivedEFTTransaction.objects.bulk_create(rows)
+                moved[1] += len(rows)
+                rows = []
+        ArchivedEFTTransaction.objects.bulk_create(rows)
+        moved[1] += len(rows)
+
+        logs = [_copy(log, ArchivedAuditLog) for log in ApprovalAuditLog.objects.filter(batch_id__in=ids)]
+        ArchivedAuditLog.objects.bulk_create(logs, batch_size=INSERT_BATCH_SIZE)
+        moved[2] = len(logs)
+
+        # Children first so the batch delete needs no cascade collection; the
+        # batch's pre_delete receiver can then no longer see its transactions,
+        # so drop their search tokens here.
+        search.unindex('transaction', EFTTransaction.objects.filter(batch_id__in=ids).values('pk'))
+        EFTTransaction.objects.filter(batch_id__in=ids).delete()
+        ApprovalAuditLog.objects.filter(batch_id__in=ids).delete()
+        EFTBatch.objects.filter(id__in=ids).delete()
+    return tuple(moved)
+
+
+def archive_batches(cutoff, chunk_size=50, limit=None, progress=None):
+    """
+    Archive every archivable batch in chunks of ``chunk_size``; returns totals.
+    ``progress`` is called with the running totals after each chunk.
+    """
+    totals = [0, 0, 0]
+    while limit is None or totals[0] < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - totals[0])
+        ids = list(archivable_batches(cutoff)[:size])
+        if not ids:
+            break
+        for i, n in enumerate(archive_chunk(ids)):
+            totals[i] += n
+        if progress:
+            progress(tuple(totals))
+    return tuple(totals)
+
+
+def get_batch(batch_id, queryset=None):
+    """
+    The live batch (from ``queryset``, e.g. an EFTBatch projection), or its
+    archived copy; Http404 if neither exists.
+    """
+    if queryset is None:
+        queryset = EFTBatch.objects.all()
+    batch = queryset.filter(id=batch_id).first()
+    if batch is None:
+        batch = ArchivedEFTBatch.objects.filter(id=batch_id).first()
+    if batch is None:
+        raise Http404('No EFT batch matches the given query.')
+    return batch
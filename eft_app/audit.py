@@ -0,0 +1,168 @@
+"""
+audit.py — Buffered, hash-chained writer for ApprovalAuditLog.
+
+Every audit row carries
+
+    prev_hash  = entry_hash of the row before it (ordered by id)
+    entry_hash = SHA-256 over prev_hash and the row's content
+
+so editing, deleting or inserting a row anywhere breaks the chain from that
+point on. Appends lock the AuditChainHead row, which serialises writers and
+keeps ids in chain order.
+
+record() writes immediately, unless called inside ``with buffered():`` (or a
+function decorated with @buffered), in which case entries are collected and
+written with one bulk_create when the block exits — a bulk action costs one
+INSERT instead of one per batch.
+
+Every settings.EFT_AUDIT_CHECKPOINT_INTERVAL entries an AuditCheckpoint is
+stored. verify_chain() starts from the newest checkpoint that a previous
+verification confirmed, so routine checks only hash recent rows; use
+full=True (``verify_audit_chain --full``) to rehash from the first row.
+Archived logs (ArchivedAuditLog keeps ids and hashes) are verified as part
+of the same chain.
+"""
+import hashlib
+import heapq
+import json
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ApprovalAuditLog, ArchivedAuditLog, AuditChainHead, AuditCheckpoint
+
+DEFAULT_CHECKPOINT_INTERVAL = 1000
+
+_buffer = ContextVar('eft_audit_buffer', default=None)
+
+
+def entry_hash(prev_hash, batch_id, action, user_id, timestamp, remarks, ip_address):
+    payload = json.dumps(
+        [
+            prev_hash, batch_id, action, user_id,
+            timestamp.astimezone(dt_timezone.utc).isoformat(),
+            remarks or '', ip_address or '',
+        ],
+        separators=(',', ':'), ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def hash_log(log, prev_hash):
+    return entry_hash(prev_hash, log.batch_id, log.action, log.user_id, log.timestamp, log.remarks, log.ip_address)
+
+
+# ---- writing ----
+
+def record(batch, action, user, remarks='', ip_address=None):
+    """Append an audit entry for ``batch`` (buffered if a buffer is active)."""
+    log = ApprovalAuditLog(
+        batch=batch, action=action, user=user,
+        remarks=remarks or '', ip_address=ip_address, timestamp=timezone.now(),
+    )
+    pending = _buffer.get()
+    if pending is not None:
+        pending.append(log)
+    else:
+        write([log])
+    return log
+
+
+class buffered(ContextDecorator):
+    """Collect record() calls and write them with one bulk_create on exit."""
+
+    def __enter__(self):
+        self._token = _buffer.set([])
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pending = _buffer.get()
+        _buffer.reset(self._token)
+        if exc_type is None and pending:
+            write(pending)
+        return False
+
+
+def write(logs):
+    """Chain and insert ``logs`` in order, under the chain-head lock."""
+    interval = getattr(settings, 'EFT_AUDIT_CHECKPOINT_INTERVAL', DEFAULT_CHECKPOINT_INTERVAL)
+    with transaction.atomic():
+        head = AuditChainHead.objects.select_for_update().get_or_create(pk=1)[0]
+        prev = head.last_hash
+        for log in logs:
+            log.prev_hash = prev
+            log.entry_hash = prev = hash_log(log, log.prev_hash)
+        ApprovalAuditLog.objects.bulk_create(logs)
+
+        last = logs[-1]
+        if last.pk is None:  # backends that do not return ids from bulk inserts
+            last.pk = ApprovalAuditLog.objects.filter(entry_hash=last.entry_hash).values_list('pk', flat=True).get()
+
+        crossed = (head.entry_count + len(logs)) // interval > head.entry_count // interval
+        head.last_id, head.last_hash = last.pk, last.entry_hash
+        head.entry_count += len(logs)
+        head.save()
+        if crossed:
+            AuditCheckpoint.objects.create(log_id=last.pk, entry_hash=last.entry_hash, entry_count=head.entry_count)
+    return logs
+
+
+# ---- verification ----
+
+class ChainError:
+    def __init__(self, log_id, problem):
+        self.log_id = log_id
+        self.problem = problem
+
+    def __str__(self):
+        return f'log {self.log_id}: {self.problem}'
+
+
+def _chain_rows(after_id):
+    """Live and archived audit rows after ``after_id``, merged in id order."""
+    fields = ('id', 'batch_id', 'action', 'user_id', 'timestamp', 'remarks', 'ip_address', 'prev_hash', 'entry_hash')
+    live = ApprovalAuditLog.objects.filter(id__gt=after_id).order_by('id').only(*fields)
+    archived = ArchivedAuditLog.objects.filter(id__gt=after_id).order_by('id').only(*fields)
+    return heapq.merge(live.iterator(chunk_size=2000), archived.iterator(chunk_size=2000), key=lambda log: log.id)
+
+
+def verify_chain(full=False, max_errors=20):
+    """
+    Rehash the chain and return (rows checked, list of ChainError).
+
+    Starts after the newest verified checkpoint unless ``full``; checkpoints
+    passed on a clean run are marked verified.
+    """
+    start_id, expected = 0, ''
+    checkpoint = None if full else AuditCheckpoint.objects.filter(verified_at__isnull=False).first()
+    if checkpoint:
+        start_id, expected = checkpoint.log_id, checkpoint.entry_hash
+
+    checkpoints = dict(AuditCheckpoint.objects.filter(log_id__gt=start_id).values_list('log_id', 'entry_hash'))
+    passed, errors, checked, last_id = [], [], 0, start_id
+    for log in _chain_rows(start_id):
+        checked += 1
+        last_id = log.id
+        if log.prev_hash != expected:
+            errors.append(ChainError(log.id, 'prev_hash does not match the previous entry (row removed or inserted)'))
+        if hash_log(log, log.prev_hash) != log.entry_hash:
+            errors.append(ChainError(log.id, 'content does not match entry_hash (row modified)'))
+        if log.id in checkpoints:
+            if checkpoints[log.id] != log.entry_hash:
+                errors.append(ChainError(log.id, 'entry_hash differs from checkpoint'))
+            passed.append(log.id)
+        expected = log.entry_hash
+        if len(errors) >= max_errors:
+            return checked, errors
+
+    head = AuditChainHead.objects.filter(pk=1).first()
+    if head and head.last_id is not None and (head.last_id != last_id or head.last_hash != expected):
+        errors.append(ChainError(head.last_id, 'chain head does not match the last entry (tail removed)'))
+
+    if not errors and passed:
+        AuditCheckpoint.objects.filter(log_id__in=passed).update(verified_at=timezone.now())
+    return checked, errors
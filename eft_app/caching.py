@@ -0,0 +1,60 @@
+"""
+caching.py — Cache-aside with per-key stampede protection.
+
+    payload = cache_aside('eft:api:system_status', build_status, timeout=10)
+
+On a miss, the first caller takes a short lock (cache.add, atomic on the
+locmem and Redis backends) and recomputes; concurrent callers for the same
+key poll the cache until the value appears instead of recomputing too, so
+twenty dashboards polling at once cost one set of queries. If the lock
+holder dies, waiters stop once the lock expires and compute themselves.
+
+Values are stored wrapped, so a computed None is cached like any other value.
+"""
+import time
+import uuid
+
+from django.core.cache import cache
+
+LOCK_SUFFIX = ':lock'
+DEFAULT_LOCK_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+
+def _cached(key):
+    entry = cache.get(key)
+    return _MISSING if entry is None else entry[0]
+
+
+def cache_aside(key, compute, timeout, lock_timeout=DEFAULT_LOCK_TIMEOUT):
+    """The cached value for ``key``, or compute() stored for ``timeout`` seconds."""
+    value = _cached(key)
+    if value is not _MISSING:
+        return value
+
+    lock_key = key + LOCK_SUFFIX
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, lock_timeout):
+        try:
+            value = compute()
+            cache.set(key, (value,), timeout)
+            return value
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = _cached(key)
+        if value is not _MISSING:
+            return value
+        if cache.get(lock_key) is None:
+            # Released without a value (the holder failed) or just after storing it
+            value = _cached(key)
+            if value is not _MISSING:
+                return value
+            break
+    return compute()
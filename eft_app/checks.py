@@ -0,0 +1,79 @@
+"""
+checks.py — System checks for CRWB EFT System deployment settings.
+
+Checks run with every ``manage.py`` command and at server start; they only
+inspect settings, so they need no database or cache connection.
+"""
+import importlib.util
+
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+
+@register()
+def check_connection_pool(app_configs, **kwargs):
+    """
+    With persistent connections every worker thread holds one connection per
+    database alias, so workers × threads × aliases (+ headroom for cron jobs
+    and shells) must fit under the server's max_connections.
+    """
+    pool = getattr(settings, 'EFT_DB_POOL', None)
+    if not pool:
+        return []
+
+    persistent = [
+        alias for alias, db in settings.DATABASES.items()
+        if db.get('CONN_MAX_AGE', 0) != 0
+    ]
+    if not persistent:
+        return []
+
+    errors = []
+    per_alias = pool['WORKERS'] * pool['THREADS'] + pool['EXTRA']
+    if per_alias > pool['MAX_CONNECTIONS']:
+        errors.append(Error(
+            f"Persistent DB connections need up to {per_alias} connections per database "
+            f"({pool['WORKERS']} workers x {pool['THREADS']} threads + {pool['EXTRA']} extra) "
+            f"but EFT_DB_MAX_CONNECTIONS is {pool['MAX_CONNECTIONS']}.",
+            hint='Lower EFT_WEB_WORKERS/EFT_WEB_THREADS, raise max_connections on the '
+                 'server, or set EFT_DB_CONN_MAX_AGE=0.',
+            id='eft_app.E001',
+        ))
+
+    for alias in persistent:
+        db = settings.DATABASES[alias]
+        if db.get('CONN_MAX_AGE') is None:
+            errors.append(Warning(
+                f"DATABASES['{alias}']['CONN_MAX_AGE'] is None (unlimited).",
+                hint="Use a finite age below MySQL's wait_timeout so idle connections "
+                     "are recycled rather than dropped by the server.",
+                id='eft_app.W001',
+            ))
+        if not db.get('CONN_HEALTH_CHECKS'):
+            errors.append(Warning(
+                f"DATABASES['{alias}'] uses persistent connections without CONN_HEALTH_CHECKS.",
+                hint='Enable CONN_HEALTH_CHECKS so a connection dropped by the server '
+                     'fails over to a new one instead of erroring the request.',
+                id='eft_app.W002',
+            ))
+    return errors
+
+
+@register()
+def check_cache_backend(app_configs, **kwargs):
+    """EFT_CACHE_BACKEND must name a known backend whose client library is installed."""
+    backend = getattr(settings, 'EFT_CACHE_BACKEND', 'locmem')
+    known = getattr(settings, 'CACHE_BACKENDS', {})
+    if known and backend not in known:
+        return [Error(
+            f"EFT_CACHE_BACKEND '{backend}' is not one of: {', '.join(known)}.",
+            hint='The local memory cache is used instead; set EFT_CACHE_BACKEND correctly.',
+            id='eft_app.E002',
+        )]
+    if backend == 'redis' and importlib.util.find_spec('redis') is None:
+        return [Error(
+            "EFT_CACHE_BACKEND is 'redis' but the redis package is not installed.",
+            hint='pip install redis, or choose the locmem or file backend.',
+            id='eft_app.E003',
+        )]
+    return []
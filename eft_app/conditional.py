@@ -0,0 +1,95 @@
+"""
+conditional.py — ETag revalidation for batch pages and files.
+
+    @login_required
+    @revalidate_batch('view')
+    def view_batch(request, batch_id): ...
+
+A batch's view page, file preview and exported file only change when the
+batch does (status changes and transaction edits all save updated_at via
+update_totals()) or when master data the file is built from changes (the
+reference_data version). The validators are one indexed lookup of the
+batch header plus one aggregate over its lines, so a browser revalidating
+with If-None-Match gets a 304 without the view rendering its pages or
+regenerating the file.
+
+The strong ETag also covers the user and their CSRF secret, since the HTML
+pages carry role-specific actions and a form token. There is no
+Last-Modified: the batch's updated_at does not change with master data or
+with the user, so If-Modified-Since alone would answer 304 for a file whose
+bank details changed, or for another user's page. Exporting an APPROVED
+batch marks it EXPORTED and writes an audit row, so that request gets no
+validators and always runs the view; once EXPORTED, the file is revalidated
+like the pages. A request with queued django.contrib.messages (e.g. an
+error redirected back to view_batch) also gets no validators: the page it
+renders shows them once, so a 304 would drop them. Responses carrying
+validators are sent with
+``Cache-Control: private, no-cache`` so browsers keep them but ask first.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, Sum
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import reference_data
+from .models import ArchivedEFTBatch, ArchivedEFTTransaction, EFTBatch, EFTTransaction
+
+
+def _batch_state(request, batch_id):
+    """(header, line aggregate) for the batch, live or archived; computed once per request."""
+    cache = request.__dict__.setdefault('_eft_batch_state', {})
+    if batch_id not in cache:
+        state = None
+        for batch_model, line_model in ((EFTBatch, EFTTransaction), (ArchivedEFTBatch, ArchivedEFTTransaction)):
+            header = batch_model.objects.filter(id=batch_id).values('updated_at', 'status').first()
+            if header is not None:
+                lines = line_model.objects.filter(batch_id=batch_id).aggregate(
+                    count=Count('id'), total=Sum('amount'), last=Max('id'),
+                )
+                state = (header, lines)
+                break
+        cache[batch_id] = state
+    return cache[batch_id]
+
+
+def _validates(request, variant, header):
+    # The first export of an approved batch has side effects; never answer it with a 304
+    if variant == 'export' and header['status'] == 'APPROVED':
+        return False
+    # len() loads the queued messages without marking them as shown
+    return not len(get_messages(request))
+
+
+def revalidate_batch(variant):
+    """Conditional GET for a view taking ``batch_id``; ``variant`` names the representation."""
+    def etag(request, batch_id, *args, **kwargs):
+        state = _batch_state(request, batch_id)
+        if state is None or not _validates(request, variant, state[0]):
+            return None
+        header, lines = state
+        parts = [
+            variant, kwargs.get('format', ''), batch_id, header['updated_at'].isoformat(), header['status'],
+            lines['count'], lines['total'], lines['last'], reference_data.version(),
+            request.user.pk, request.META.get('CSRF_COOKIE', ''),
+        ]
+        return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                if response.has_header('ETag'):
+                    patch_cache_control(response, private=True, no_cache=True)
+            else:
+                # Redirects and errors (permission denied, wrong status) are not revalidated
+                if response.has_header('ETag'):
+                    del response['ETag']
+            return response
+        return wrapper
+    return decorator
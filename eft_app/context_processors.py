@@ -1,4 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import receiver
+
 from .models import EFTBatch
+from .signals import batch_status_changed
+
+PENDING_COUNT_CACHE_KEY = 'eft:pending_count:{status}'
+
+# Statuses that feed a badge; counts for anything else are never cached
+PENDING_STATUSES = ('PENDING_FM', 'PENDING_DIRECTOR')
+
+
+def get_pending_count(status):
+    """Return the number of batches in ``status``, served from the cache when possible."""
+    key = PENDING_COUNT_CACHE_KEY.format(status=status)
+    count = cache.get(key)
+    if count is None:
+        count = EFTBatch.objects.filter(status=status).count()
+        # The timeout is only a safety net for status changes made outside the
+        # workflow views (e.g. Django admin); transitions invalidate explicitly.
+        cache.set(key, count, getattr(settings, 'PENDING_COUNT_CACHE_TIMEOUT', 300))
+    return count
+
+
+def invalidate_pending_counts(*statuses):
+    """Drop cached counts for the given statuses (all badge statuses if none given)."""
+    statuses = [s for s in (statuses or PENDING_STATUSES) if s in PENDING_STATUSES]
+    if statuses:
+        cache.delete_many([PENDING_COUNT_CACHE_KEY.format(status=s) for s in statuses])
+
+
+@receiver(batch_status_changed)
+def _invalidate_on_transition(sender, old_status, new_status, **kwargs):
+    # Defer until commit so a concurrent render cannot re-cache the old count
+    transaction.on_commit(lambda: invalidate_pending_counts(old_status, new_status))
+
+
+def _user_group_names(request):
+    # Memoised on the request: fragments rendered in the same request reuse it
+    if not hasattr(request, '_eft_group_names'):
+        request._eft_group_names = set(request.user.groups.values_list('name', flat=True))
+    return request._eft_group_names
 
 
 def pending_count(request):
@@ -6,10 +49,10 @@ def pending_count(request):
     if not request.user.is_authenticated:
         return {'pending_count': 0, 'pending_fm_count': 0, 'pending_director_count': 0}
 
-    groups = set(request.user.groups.values_list('name', flat=True))
+    groups = _user_group_names(request)
 
     if 'Finance Manager' in groups:
-        count = EFTBatch.objects.filter(status='PENDING_FM').count()
+        count = get_pending_count('PENDING_FM')
         return {
             'pending_count': count,
             'pending_fm_count': count,
@@ -17,7 +60,7 @@ def pending_count(request):
         }
 
     if 'Director of Finance' in groups:
-        count = EFTBatch.objects.filter(status='PENDING_DIRECTOR').count()
+        count = get_pending_count('PENDING_DIRECTOR')
         return {
             'pending_count': count,
             'pending_fm_count': 0,
@@ -26,7 +69,7 @@ def pending_count(request):
 
     # Legacy: keep Authorizer badge working if that group still exists
     if 'Authorizer' in groups:
-        count = EFTBatch.objects.filter(status__in=['PENDING_FM', 'PENDING_DIRECTOR']).count()
+        count = get_pending_count('PENDING_FM') + get_pending_count('PENDING_DIRECTOR')
         return {'pending_count': count, 'pending_fm_count': 0, 'pending_director_count': 0}
 
-    return {'pending_count': 0, 'pending_fm_count': 0, 'pending_director_count': 0}
\ No newline at end of file
+    return {'pending_count': 0, 'pending_fm_count': 0, 'pending_director_count': 0}
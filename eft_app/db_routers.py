@@ -0,0 +1,111 @@
+"""
+db_routers.py — Read-replica routing for CRWB EFT System.
+
+Reads go to the primary unless a view opts in with @read_from_replica
+(reporting, exports, dashboards). Even inside such a view a read stays on
+the primary when:
+
+  - the connection is inside transaction.atomic() (approval transitions,
+    bulk actions), so a read-modify-write never mixes databases
+  - this request has already written through the ORM
+  - the client wrote in a recent request (PrimaryPinningMiddleware sets a
+    short-lived cookie), so users see their own changes despite replica lag
+
+Only models of REPLICA_APPS are routed; sessions, content types etc. always
+use the primary. With settings.EFT_DB_REPLICA_ALIAS unset the router is a
+no-op and everything uses 'default'.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_APPS = {'eft_app', 'auth'}
+PIN_COOKIE = 'eft_pin_primary'
+
+_replica_reads = ContextVar('eft_replica_reads', default=False)
+_pinned = ContextVar('eft_pinned_primary', default=False)
+_wrote = ContextVar('eft_wrote', default=False)
+
+
+def replica_alias():
+    return getattr(settings, 'EFT_DB_REPLICA_ALIAS', None)
+
+
+def read_from_replica(view_func):
+    """Let reads in this view use the replica (see module docstring for exceptions)."""
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        # Track writes from the start of the view; any made here still pin the
+        # client afterwards via PrimaryPinningMiddleware.
+        tokens = (_replica_reads.set(True), _wrote.set(False))
+        try:
+            return view_func(*args, **kwargs)
+        finally:
+            wrote = _wrote.get()
+            _replica_reads.reset(tokens[0])
+            _wrote.reset(tokens[1])
+            if wrote:
+                _wrote.set(True)
+    return wrapper
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if (
+            not alias
+            or not _replica_reads.get()
+            or _pinned.get()
+            or _wrote.get()
+            or model._meta.app_label not in REPLICA_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in REPLICA_APPS:
+            _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != replica_alias()
+
+
+class PrimaryPinning:
+    """
+    Request-scoped state for the router: honours the pin cookie on the way
+    in and sets it on the way out after a POST or any ORM write.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    def __enter__(self):
+        self._tokens = (
+            _pinned.set(PIN_COOKIE in self.request.COOKIES),
+            _wrote.set(False),
+        )
+        return self
+
+    def __exit__(self, *exc):
+        self.wrote = _wrote.get() or self.request.method not in ('GET', 'HEAD', 'OPTIONS')
+        _pinned.reset(self._tokens[0])
+        _wrote.reset(self._tokens[1])
+        return False
+
+    def pin(self, response):
+        if self.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'EFT_DB_REPLICA_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -31,6 +31,7 @@ import csv
 from io import StringIO
 from django.http import HttpResponse
 from django.utils import timezone
+from . import validation
 from .models import EFTBatch
 
 
@@ -41,51 +42,23 @@ class EFTGenerator:
         if batch.status not in ('APPROVED', 'EXPORTED'):
             raise ValueError("Only approved batches can be exported")
 
-        transactions = batch.transactions.all()
-        if not transactions.exists():
+        lines = validation.load_lines(batch)
+        if not lines:
             raise ValueError("Batch has no transactions")
 
-        total_amount = sum(t.amount for t in transactions)
-        record_count = transactions.count()
+        # Large batches are checked in chunks on a worker pool (validation.py)
+        result = validation.validate_lines(lines)
 
-        if abs(total_amount - batch.total_amount) > 0.01:
+        if abs(result.total - batch.total_amount) > 0.01:
             raise ValueError(
-                f"Transaction total ({total_amount}) doesn't match batch total ({batch.total_amount})"
+                f"Transaction total ({result.total}) doesn't match batch total ({batch.total_amount})"
             )
-        if record_count != batch.record_count:
+        if result.count != batch.record_count:
             raise ValueError(
-                f"Transaction count ({record_count}) doesn't match batch record count ({batch.record_count})"
+                f"Transaction count ({result.count}) doesn't match batch record count ({batch.record_count})"
             )
-
-        for trans in transactions:
-            if not trans.supplier:
-                raise ValueError(f"Supplier is required for transaction {trans.sequence_number}")
-            if not trans.supplier.supplier_code:
-                raise ValueError(f"Vendor Code (supplier_code) required for transaction {trans.sequence_number}")
-            if not trans.supplier.account_name:
-                raise ValueError(f"Payee Details (account_name) required for transaction {trans.sequence_number}")
-            if not trans.supplier.bank or not trans.supplier.bank.swift_code:
-                raise ValueError(f"Bank SWIFT code required for transaction {trans.sequence_number}")
-            
-            # Validate BIC format
-            bic = trans.supplier.bank.swift_code
-            if bic.startswith('NBMA') and bic.endswith('W'):
-                raise ValueError(
-                    f"Invalid BIC '{bic}' for transaction {trans.sequence_number}. "
-                    f"RBM BIC codes must end with '0', not 'W'. "
-                    f"Please update the bank's SWIFT code in the database."
-                )
-            
-            if not trans.supplier.account_number:
-                raise ValueError(f"Credit Account Number required for transaction {trans.sequence_number}")
-            if not trans.debit_account:
-                raise ValueError(f"Debit account required for transaction {trans.sequence_number}")
-            if not trans.reference_number:
-                raise ValueError(f"Invoice Number required for transaction {trans.sequence_number}")
-            if not trans.source_reference:
-                raise ValueError(f"Source Reference required for transaction {trans.sequence_number}")
-            if not trans.narration:
-                raise ValueError(f"Description required for transaction {trans.sequence_number}")
+        if result.errors:
+            raise ValueError(result.errors[0])
 
         return True
 
@@ -97,7 +70,11 @@ class EFTGenerator:
     def generate_eft_file(batch: EFTBatch) -> str:
         EFTGenerator.validate_batch(batch)
 
-        transactions = batch.transactions.all().order_by('sequence_number')
+        # Payee, BIC and account fields come straight from the database in one
+        # query, never from a reference_data snapshot that may be stale
+        transactions = batch.transactions.select_related(
+            'supplier__bank', 'debit_account', 'scheme'
+        ).order_by('sequence_number')
         total_amount = sum(t.amount for t in transactions)
         record_count = transactions.count()
 
@@ -115,26 +92,27 @@ class EFTGenerator:
 
         # BODY RECORDS (17 fields each)
         for trans in transactions:
+            supplier, debit_account = trans.supplier, trans.debit_account
             cost_center = trans.cost_center
             if not cost_center and trans.scheme:
                 cost_center = trans.scheme.default_cost_center
 
-            bic_code = trans.supplier.bank.swift_code[:11]
+            bic_code = supplier.bank.swift_code[:11]
 
             writer.writerow([
                 '1',                                               # Field  0: Line Items Identifier
                 str(int(trans.sequence_number)).zfill(4),          # Field  1: Trans Serial
                 batch.currency,                                    # Field  2: Currency Code
-                trans.debit_account.account_number[:20],           # Field  3: Debit Account Number
-                trans.debit_account.account_name[:55],             # Field  4: Debit Account Name
+                debit_account.account_number[:20],                 # Field  3: Debit Account Number
+                debit_account.account_name[:55],                   # Field  4: Debit Account Name
                 EFTGenerator.format_amount(trans.amount),          # Field  5: Payment Amount
-                trans.supplier.account_name[:55],                  # Field  6: Payee Details
-                trans.supplier.supplier_code[:7],                  # Field  7: Vendor Code
+                supplier.account_name[:55],                        # Field  6: Payee Details
+                supplier.supplier_code[:7],                        # Field  7: Vendor Code
                 (trans.employee_number or '')[:6],                 # Field  8: Employee Number
                 (trans.national_id or '')[:8],                     # Field  9: National ID
                 trans.reference_number[:16],                       # Field 10: Invoice Number
                 bic_code,                                          # Field 11: Payee BIC
-                trans.supplier.account_number[:20],                # Field 12: Credit Account Number
+                supplier.account_number[:20],                      # Field 12: Credit Account Number
                 (cost_center or '')[:50],                          # Field 13: Cost Centre
                 '',                                                # Field 14: DATE (EMPTY - produces ;;)
                 trans.source_reference[:18],                       # Field 15: Source reference
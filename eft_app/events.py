@@ -0,0 +1,248 @@
+"""
+events.py — Live workflow events for the approval queues (Server-Sent Events).
+
+    const source = new EventSource('/events/');
+    source.addEventListener('counts', ...);      // {"PENDING_FM": 4}
+    source.addEventListener('transition', ...);  // one workflow step, see _event()
+
+views.event_stream serves one long-lived text/event-stream response per
+open page under ASGI. Every stream in a worker process listens to one Hub
+on that process's event loop. The hub reads new ApprovalAuditLog rows
+(id > cursor) and hands each subscriber the transitions plus fresh pending
+counts. Audit ids follow commit order (audit.write holds the chain-head
+lock), so the id is the cursor and is sent as the SSE event id; a browser
+that reconnects with Last-Event-ID gets what it missed.
+
+The hub reads the audit log in two cases:
+  - a transition committed in this process wakes it at once
+    (batch_status_changed -> on_commit -> publish());
+  - otherwise it polls every EFT_EVENTS['POLL_SECONDS'], which picks up
+    transitions made in other worker processes or hosts.
+Either way there is one query per process per cycle, however many approvers
+are connected.
+
+Each stream sees the transitions for its user's role: Finance Managers
+those into or out of PENDING_FM, Directors of Finance PENDING_DIRECTOR,
+Accounts Personnel their own batches, System Admins everything.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.dispatch import receiver
+from django.urls import reverse
+
+from .context_processors import PENDING_STATUSES, get_pending_count
+from .models import ApprovalAuditLog
+from .signals import batch_status_changed
+from .transitions import TRANSITIONS
+
+logger = logging.getLogger('eft_app.events')
+
+DEFAULTS = {
+    'POLL_SECONDS': 5,
+    'HEARTBEAT_SECONDS': 20,
+    'MAX_STREAM_SECONDS': 3600,
+    'RETRY_MS': 3000,
+    'REPLAY_LIMIT': 200,
+}
+
+# audit action -> (status left, status entered)
+ACTION_STATUSES = {t.action: (t.source, t.target) for t in TRANSITIONS.values()}
+
+
+def get_events_settings():
+    return {**DEFAULTS, **getattr(settings, 'EFT_EVENTS', {})}
+
+
+class Audience:
+    """What one user's stream receives."""
+
+    def __init__(self, user_id, statuses=(), everything=False, own=False):
+        self.user_id = user_id
+        self.statuses = tuple(statuses)
+        self.everything = everything
+        self.own = own
+
+    @classmethod
+    async def for_user(cls, user):
+        groups = {name async for name in user.groups.values_list('name', flat=True)}
+        if user.is_superuser or 'System Admin' in groups:
+            return cls(user.pk, PENDING_STATUSES, everything=True)
+        statuses = []
+        if 'Finance Manager' in groups or 'Authorizer' in groups:
+            statuses.append('PENDING_FM')
+        if 'Director of Finance' in groups or 'Authorizer' in groups:
+            statuses.append('PENDING_DIRECTOR')
+        return cls(user.pk, statuses, own='Accounts Personnel' in groups)
+
+    def sees(self, event):
+        if self.everything:
+            return True
+        if self.own and event['created_by_id'] == self.user_id:
+            return True
+        return bool({event['old_status'], event['new_status']} & set(self.statuses))
+
+    def counts(self, counts):
+        return {status: counts[status] for status in self.statuses}
+
+
+def _event(log):
+    old_status, new_status = ACTION_STATUSES.get(log.action, ('', ''))
+    batch = log.batch
+    return {
+        'id': log.id,
+        'batch_id': batch.id,
+        'batch_reference': batch.batch_reference,
+        'batch_name': batch.batch_name,
+        'total_amount': str(batch.total_amount),
+        'record_count': batch.record_count,
+        'created_by_id': batch.created_by_id,
+        'action': log.action,
+        'old_status': old_status,
+        'new_status': new_status,
+        'user': log.user.get_full_name() or log.user.username,
+        'timestamp': log.timestamp.isoformat(),
+        'url': reverse('view_batch', args=[batch.id]),
+    }
+
+
+async def fetch(after_id, limit):
+    """Transitions recorded after audit id ``after_id``, oldest first."""
+    logs = ApprovalAuditLog.objects.filter(id__gt=after_id).select_related('batch', 'user').order_by('id')[:limit]
+    return [_event(log) async for log in logs]
+
+
+async def latest_id():
+    return await ApprovalAuditLog.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+
+def _pending_counts():
+    return {status: get_pending_count(status) for status in PENDING_STATUSES}
+
+
+pending_counts = sync_to_async(_pending_counts)
+
+
+class Hub:
+    """Fan-out of new transitions to the streams on one event loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.subscribers = set()
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue()
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            # A fresh context: the hub outlives the request that started it,
+            # so it must not inherit that request's query recorder
+            self.task = self.loop.create_task(self._run(), context=contextvars.Context())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def wake(self):
+        self.wakeup.set()
+
+    async def _run(self):
+        config = get_events_settings()
+        cursor = await latest_id()
+        while self.subscribers:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), config['POLL_SECONDS'])
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                events = await fetch(cursor, config['REPLAY_LIMIT'])
+                if not events:
+                    continue
+                counts = await pending_counts()
+            except DatabaseError:
+                # Streams stay open on their heartbeats; the next cycle catches up
+                logger.warning('Live events: reading the audit log failed', exc_info=True)
+                continue
+            cursor = events[-1]['id']
+            for queue in list(self.subscribers):
+                queue.put_nowait((events, counts))
+
+
+_hubs = {}
+
+
+def get_hub():
+    """The hub for the running event loop."""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        for stale in [other for other in _hubs if other.is_closed()]:
+            del _hubs[stale]
+        hub = _hubs[loop] = Hub(loop)
+    return hub
+
+
+def publish():
+    """Wake every hub in this process; safe to call from any thread."""
+    for loop, hub in list(_hubs.items()):
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(hub.wake)
+
+
+@receiver(batch_status_changed)
+def _publish_on_transition(sender, **kwargs):
+    # After commit, so the hub's query sees the new audit row
+    transaction.on_commit(publish)
+
+
+def _message(event, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {event}', f'data: {json.dumps(data)}']
+    return '\n'.join(lines) + '\n\n'
+
+
+async def stream(user, last_event_id=None):
+    """The SSE body for ``user``: counts first, then their transitions as they happen."""
+    config = get_events_settings()
+    audience = await Audience.for_user(user)
+    hub = get_hub()
+    queue = hub.subscribe()
+    try:
+        yield f"retry: {config['RETRY_MS']}\n\n"
+        sent = last_event_id
+        if sent is not None:
+            # Reconnect: replay what this browser missed while away
+            for event in await fetch(sent, config['REPLAY_LIMIT']):
+                sent = event['id']
+                if audience.sees(event):
+                    yield _message('transition', event, event['id'])
+        yield _message('counts', audience.counts(await pending_counts()))
+
+        deadline = time.monotonic() + config['MAX_STREAM_SECONDS']
+        while time.monotonic() < deadline:
+            try:
+                events, counts = await asyncio.wait_for(queue.get(), config['HEARTBEAT_SECONDS'])
+            except asyncio.TimeoutError:
+                # Keeps proxies from timing the connection out
+                yield ': ping\n\n'
+                continue
+            visible = False
+            for event in events:
+                if sent is not None and event['id'] <= sent:
+                    continue
+                sent = event['id']
+                if audience.sees(event):
+                    visible = True
+                    yield _message('transition', event, event['id'])
+            if visible and audience.statuses:
+                yield _message('counts', audience.counts(counts))
+    finally:
+        hub.unsubscribe(queue)
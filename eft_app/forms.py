@@ -1,11 +1,13 @@
 # eft_app/forms.py - UPDATED WITH OBDX FILE TYPE SUPPORT
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from django.forms.models import ModelChoiceIterator
 from django.contrib.auth.models import User, Group
 from .models import (
     Bank, Zone, Scheme, Supplier, DebitAccount,
     EFTBatch, EFTTransaction
 )
+from . import reference_data
 
 # Role choices
 ROLE_CHOICES = [
@@ -220,6 +222,36 @@ class EFTBatchForm(forms.ModelForm):
         }
 
 
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    """Choices for a ReferenceChoiceField, read from the snapshot when rendered."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from reference_data.table(self.field.table).choices()
+
+    def __len__(self):
+        return len(reference_data.table(self.field.table).active()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(reference_data.table(self.field.table).active())
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField over the active rows of a reference_data table. Choices
+    are rendered from the in-process snapshot; a submitted value is looked
+    up in the database (ModelChoiceField.to_python), because the snapshot
+    may not yet show a row added or deactivated by another worker.
+    """
+    iterator = ReferenceChoiceIterator
+
+    def __init__(self, table, **kwargs):
+        self.table = table
+        kwargs.setdefault('queryset', reference_data.MODELS[table].objects.filter(is_active=True))
+        super().__init__(**kwargs)
+
+
 class EFTTransactionForm(forms.ModelForm):
     """RBM-Compliant Transaction Form - All fields are MANUAL entry except auto-filled zone"""
     
@@ -278,6 +310,21 @@ class EFTTransactionForm(forms.ModelForm):
         help_text="Only for individual payments (UDF3 at UBS)"
     )
     
+    debit_account = ReferenceChoiceField('debit_accounts', widget=forms.Select(attrs={
+        'class': 'form-control',
+        'required': 'required'
+    }))
+
+    supplier = ReferenceChoiceField('suppliers', widget=forms.Select(attrs={
+        'class': 'form-control',
+        'required': 'required'
+    }))
+
+    scheme = ReferenceChoiceField('schemes', widget=forms.Select(attrs={
+        'class': 'form-control',
+        'required': 'required'
+    }))
+
     cost_center = forms.CharField(
         label="Cost Center (Auto-filled from Scheme, but can override)",
         max_length=50,
@@ -297,18 +344,6 @@ class EFTTransactionForm(forms.ModelForm):
             'employee_number', 'national_id', 'cost_center'
         ]
         widgets = {
-            'debit_account': forms.Select(attrs={
-                'class': 'form-control',
-                'required': 'required'
-            }),
-            'supplier': forms.Select(attrs={
-                'class': 'form-control',
-                'required': 'required'
-            }),
-            'scheme': forms.Select(attrs={
-                'class': 'form-control',
-                'required': 'required'
-            }),
             'amount': forms.NumberInput(attrs={
                 'class': 'form-control',
                 'step': '0.01',
@@ -319,9 +354,7 @@ class EFTTransactionForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['supplier'].queryset = Supplier.objects.filter(is_active=True)
-        self.fields['scheme'].queryset = Scheme.objects.filter(is_active=True)
-        self.fields['debit_account'].queryset = DebitAccount.objects.filter(is_active=True)
+        # supplier, scheme and debit_account choices come from reference_data
         
         required_fields = ['debit_account', 'supplier', 'scheme', 'amount', 
                           'reference_number', 'source_reference', 'narration']
@@ -341,6 +374,8 @@ class BatchApprovalForm(forms.Form):
         widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         label='Approval Remarks (Optional)'
     )
+    # The batch version the reviewer saw; the transition only applies to it
+    version = forms.IntegerField(required=False, min_value=0, widget=forms.HiddenInput)
 
 
 class BatchRejectionForm(forms.Form):
@@ -349,4 +384,5 @@ class BatchRejectionForm(forms.Form):
         widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         label='Rejection Reason',
         help_text="Please explain why this batch is being rejected (visible to Accounts Personnel)"
-    )
\ No newline at end of file
+    )
+    version = forms.IntegerField(required=False, min_value=0, widget=forms.HiddenInput)
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+health.py — Process information and liveness/readiness probes.
+
+    GET /healthz   the process is up and serving (no I/O)
+    GET /readyz    SELECT 1 on each database, a cache round trip and a
+                   writable artifact directory; 503 if any check fails
+
+Both are answered by HealthCheckMiddleware (middleware.py) before sessions,
+auth and request logging, so a probe every few seconds costs next to
+nothing and never hits ALLOWED_HOSTS or the login redirect.
+
+The process start time and request counter live in memory here (set when
+the app registry is ready), so the dashboard's uptime is this worker's real
+uptime rather than the age of the oldest user account.
+"""
+import os
+import platform
+import socket
+import threading
+import time
+import uuid
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import connections
+from django.db.utils import DatabaseError
+from django.dispatch import receiver
+from django.utils import timezone
+
+STARTED_AT = timezone.now()
+_started = time.monotonic()
+_served = 0
+_served_lock = threading.Lock()
+
+DEFAULT_DB_TIMEOUT_MS = 1000
+CACHE_PROBE_KEY = 'eft:health:probe'
+
+
+@receiver(request_started)
+def _count_request(sender, **kwargs):
+    global _served
+    with _served_lock:
+        _served += 1
+
+
+def uptime_seconds():
+    return time.monotonic() - _started
+
+
+def format_uptime(seconds):
+    days, rest = divmod(int(seconds), 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes = rest // 60
+    if days > 0:
+        return f"{days}d {hours}h" if hours > 0 else f"{days} day{'s' if days > 1 else ''}"
+    if hours > 0:
+        return f"{hours}h {minutes}m" if minutes > 0 else f"{hours} hour{'s' if hours > 1 else ''}"
+    return f"{minutes} minute{'s' if minutes != 1 else ''}"
+
+
+def process_info():
+    """This worker process: identity, start time, uptime and load."""
+    seconds = uptime_seconds()
+    return {
+        'pid': os.getpid(),
+        'hostname': socket.gethostname(),
+        'started_at': STARTED_AT.isoformat(),
+        'uptime_seconds': round(seconds, 1),
+        'uptime': format_uptime(seconds),
+        'threads': threading.active_count(),
+        'requests_served': _served,
+        'python_version': platform.python_version(),
+        'django_version': django.get_version(),
+    }
+
+
+def liveness():
+    return {'status': 'ok', 'pid': os.getpid(), 'uptime_seconds': round(uptime_seconds(), 1)}
+
+
+# ---- readiness checks: each returns (ok, error) ----
+
+def check_database(alias='default'):
+    """SELECT 1, bounded by EFT_HEALTH['DB_TIMEOUT_MS'] on MySQL."""
+    timeout_ms = getattr(settings, 'EFT_HEALTH', {}).get('DB_TIMEOUT_MS', DEFAULT_DB_TIMEOUT_MS)
+    connection = connections[alias]
+    sql = 'SELECT 1'
+    if connection.vendor == 'mysql':
+        sql = f'SELECT /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */ 1'
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            cursor.fetchone()
+        return True, None
+    except DatabaseError as e:
+        return False, str(e)
+
+
+def check_cache():
+    token = uuid.uuid4().hex
+    try:
+        cache.set(CACHE_PROBE_KEY, token, 10)
+        if cache.get(CACHE_PROBE_KEY) != token:
+            return False, 'value written to the cache was not read back'
+        return True, None
+    except Exception as e:  # backend client errors have no common base class
+        return False, str(e)
+
+
+def check_artifact_store():
+    """The artifact directory, or the parent it would be created in, is writable."""
+    path = os.fspath(getattr(settings, 'EFT_HEALTH', {}).get('ARTIFACT_DIR') or settings.MEDIA_ROOT)
+    existing = path
+    while not os.path.exists(existing):
+        parent = os.path.dirname(existing)
+        if parent == existing:
+            break
+        existing = parent
+    if os.path.isdir(existing) and os.access(existing, os.W_OK | os.X_OK):
+        return True, None
+    return False, f'{path} is not writable'
+
+
+def readiness():
+    """(ready, checks) with per-check status and timing."""
+    probes = [(f'database:{alias}', lambda alias=alias: check_database(alias)) for alias in settings.DATABASES]
+    probes += [('cache', check_cache), ('artifacts', check_artifact_store)]
+    checks = {}
+    for name, probe in probes:
+        start = time.perf_counter()
+        ok, error = probe()
+        checks[name] = {'ok': ok, 'ms': round((time.perf_counter() - start) * 1000, 2)}
+        if error:
+            checks[name]['error'] = error
+    return all(check['ok'] for check in checks.values()), checks
@@ -0,0 +1,297 @@
+"""
+jobs.py — Database-backed background jobs, no broker required.
+
+    @register('archive_batches', queue='maintenance', timeout=3600)
+    def archive_old_batches(months=None): ...
+
+    job = jobs.enqueue('archive_batches', user=request.user, months=24)
+
+A job is a BackgroundJob row naming a registered function and its keyword
+arguments (JSON). ``manage.py run_jobs`` is the worker: it claims due jobs
+from its queues, lowest priority number first, with a conditional UPDATE
+(QUEUED -> RUNNING), so several workers on several hosts never run the same
+job twice, and runs each one in its own child process, up to --processes at
+a time.
+
+The worker refreshes heartbeat_at on its running jobs every
+EFT_JOBS['HEARTBEAT_SECONDS']; a job whose heartbeat is older than
+STALE_AFTER_SECONDS (its worker died) is failed by the next worker that
+looks. A job still running after its timeout is killed. Failures are
+retried with exponential backoff (RETRY_BACKOFF_SECONDS, doubled per
+attempt, capped at RETRY_BACKOFF_MAX_SECONDS) until max_attempts, then the
+job is FAILED with the error kept on the row.
+
+Views enqueue and answer 202 with the job id and its status URL
+(views.job_accepted); clients poll /jobs/<id>/. EFT files are built this
+way by views.generate_batch_file and then downloaded from export_batch
+with ?job=<id>.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import traceback
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import analytics, archive, search, stats
+from .eft_generator import EFTGenerator
+from .models import BackgroundJob, EFTBatch
+
+logger = logging.getLogger('eft_app.jobs')
+
+DEFAULTS = {
+    'PROCESSES': 2,
+    'POLL_SECONDS': 2,
+    'HEARTBEAT_SECONDS': 10,
+    'STALE_AFTER_SECONDS': 60,
+    'RETRY_BACKOFF_SECONDS': 30,
+    'RETRY_BACKOFF_MAX_SECONDS': 3600,
+}
+
+Task = namedtuple('Task', 'name func queue priority max_attempts timeout')
+
+REGISTRY = {}
+
+
+def get_jobs_settings():
+    return {**DEFAULTS, **getattr(settings, 'EFT_JOBS', {})}
+
+
+def register(name, queue='default', priority=100, max_attempts=3, timeout=600):
+    """Register the decorated function as job ``name``; lower priority numbers run first."""
+    def decorator(func):
+        REGISTRY[name] = Task(name, func, queue, priority, max_attempts, timeout)
+        return func
+    return decorator
+
+
+def enqueue(name, user=None, priority=None, delay=0, **kwargs):
+    """Queue job ``name`` with ``kwargs`` (JSON-serialisable); returns the BackgroundJob."""
+    try:
+        task = REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Unknown job '{name}'")
+    return BackgroundJob.objects.create(
+        name=name,
+        queue=task.queue,
+        priority=task.priority if priority is None else priority,
+        kwargs=kwargs,
+        max_attempts=task.max_attempts,
+        timeout=task.timeout,
+        run_after=timezone.now() + timedelta(seconds=delay),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def describe(job):
+    """The job's state as served by the status endpoint."""
+    return {
+        'id': job.id,
+        'name': job.name,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'run_after': job.run_after if job.status == 'QUEUED' else None,
+        'result': job.result,
+        'error': job.error.splitlines()[-1] if job.error else '',
+    }
+
+
+# ---- worker side ----
+
+def backoff(attempts):
+    config = get_jobs_settings()
+    return min(config['RETRY_BACKOFF_SECONDS'] * 2 ** max(attempts - 1, 0), config['RETRY_BACKOFF_MAX_SECONDS'])
+
+
+def claim(queues, worker, limit):
+    """Claim up to ``limit`` due jobs from ``queues`` for ``worker``; returns them RUNNING."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    candidates = list(
+        BackgroundJob.objects
+        .filter(status='QUEUED', queue__in=queues, run_after__lte=now)
+        .order_by('priority', 'run_after', 'id')
+        .values_list('id', flat=True)[:limit * 2]
+    )
+    claimed = []
+    for job_id in candidates:
+        taken = BackgroundJob.objects.filter(id=job_id, status='QUEUED').update(
+            status='RUNNING', worker=worker, attempts=F('attempts') + 1,
+            started_at=now, heartbeat_at=now, finished_at=None,
+        )
+        if taken:
+            claimed.append(job_id)
+            if len(claimed) == limit:
+                break
+    return list(BackgroundJob.objects.filter(id__in=claimed).order_by('priority', 'id'))
+
+
+def fail(job_id, error):
+    """Record a failed attempt of a RUNNING job: queue a retry after backoff, or give up."""
+    job = BackgroundJob.objects.filter(id=job_id, status='RUNNING').first()
+    if job is None:
+        return None
+    if job.attempts < job.max_attempts:
+        changes = {'status': 'QUEUED', 'run_after': timezone.now() + timedelta(seconds=backoff(job.attempts))}
+    else:
+        changes = {'status': 'FAILED', 'finished_at': timezone.now()}
+    BackgroundJob.objects.filter(id=job_id, status='RUNNING').update(error=error, worker='', **changes)
+    logger.warning('Job %s %s attempt %s/%s failed: %s', job.id, job.name, job.attempts, job.max_attempts,
+                   error.strip().splitlines()[-1] if error.strip() else error)
+    return changes['status']
+
+
+def execute(job_id):
+    """Run one claimed job in this process and record the outcome."""
+    job = BackgroundJob.objects.get(id=job_id)
+    try:
+        task = REGISTRY[job.name]
+        result = task.func(**job.kwargs)
+    except Exception:
+        fail(job.id, traceback.format_exc())
+    else:
+        BackgroundJob.objects.filter(id=job.id, status='RUNNING').update(
+            status='SUCCEEDED', result=result, error='', finished_at=timezone.now(),
+        )
+    finally:
+        connections.close_all()
+
+
+def requeue_stale():
+    """Fail (and so retry) RUNNING jobs whose worker stopped sending heartbeats."""
+    cutoff = timezone.now() - timedelta(seconds=get_jobs_settings()['STALE_AFTER_SECONDS'])
+    stale = BackgroundJob.objects.filter(status='RUNNING', heartbeat_at__lt=cutoff).values_list('id', flat=True)
+    return [job_id for job_id in stale if fail(job_id, 'Worker stopped sending heartbeats')]
+
+
+class Worker:
+    """
+    Claims jobs and runs each in a child process started from ``target``
+    (a picklable callable taking the job id, so it also works with the
+    spawn start method).
+    """
+
+    def __init__(self, target, queues=('default',), processes=None, log=None):
+        self.config = get_jobs_settings()
+        self.target = target
+        self.queues = list(queues)
+        self.processes = processes or self.config['PROCESSES']
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.log = log or logger.info
+        self.running = {}  # job id -> (process, deadline, timeout)
+        self.stopping = False
+        self._last_heartbeat = 0.0
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def run(self, burst=False):
+        """Work until stopped (SIGTERM/SIGINT); with ``burst``, until no job is due."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.log(f'Worker {self.name} on queue(s) {", ".join(self.queues)} with {self.processes} process(es)')
+        while True:
+            self._reap()
+            self._heartbeat()
+            claimed = [] if self.stopping else claim(self.queues, self.name, self.processes - len(self.running))
+            for job in claimed:
+                self._start(job)
+            if self.stopping or (burst and not claimed):
+                if not self.running:
+                    return
+            if not claimed:
+                time.sleep(0.2 if self.running else self.config['POLL_SECONDS'])
+
+    def _start(self, job):
+        # Children must not share the parent's database sockets
+        connections.close_all()
+        process = multiprocessing.Process(target=self.target, args=(job.id,), daemon=True)
+        process.start()
+        self.running[job.id] = (process, time.monotonic() + job.timeout, job.timeout)
+        self.log(f'Started job {job.id} {job.name} (attempt {job.attempts}/{job.max_attempts}) in pid {process.pid}')
+
+    def _reap(self):
+        for job_id, (process, deadline, timeout) in list(self.running.items()):
+            if process.is_alive():
+                if time.monotonic() < deadline:
+                    continue
+                process.kill()
+                process.join()
+                fail(job_id, f'Timed out after {timeout}s')
+                self.log(f'Killed job {job_id} after {timeout}s')
+            else:
+                process.join()
+                if process.exitcode != 0:
+                    fail(job_id, f'Worker process exited with code {process.exitcode}')
+                status = BackgroundJob.objects.filter(id=job_id).values_list('status', flat=True).first()
+                self.log(f'Job {job_id} finished: {status}')
+            del self.running[job_id]
+
+    def _heartbeat(self):
+        if time.monotonic() - self._last_heartbeat < self.config['HEARTBEAT_SECONDS']:
+            return
+        self._last_heartbeat = time.monotonic()
+        if self.running:
+            BackgroundJob.objects.filter(id__in=list(self.running), status='RUNNING', worker=self.name).update(
+                heartbeat_at=timezone.now(),
+            )
+        for job_id in requeue_stale():
+            self.log(f'Job {job_id} had no heartbeat; failed for retry')
+
+
+# ---- registered jobs ----
+
+@register('generate_eft_file', priority=50, timeout=900)
+def generate_file(batch_id):
+    batch = EFTBatch.objects.for_export().get(id=batch_id)
+    content = EFTGenerator.generate_eft_file(batch)
+    return {
+        'batch_id': batch.id, 'lines': content.count('\n'), 'generated_at': batch.generated_at,
+        # export_batch serves the stored file only while it is still this one
+        'sha256': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+    }
+
+
+@register('archive_batches', queue='maintenance', timeout=3600)
+def archive_old_batches(months=None, chunk_size=50):
+    batches, transactions, logs = archive.archive_batches(archive.archive_cutoff(months), chunk_size=chunk_size)
+    return {'batches': batches, 'transactions': transactions, 'audit_logs': logs}
+
+
+@register('rebuild_spend_rollups', queue='maintenance', timeout=3600)
+def rebuild_rollups(date_from=None, date_to=None):
+    rows = analytics.rebuild_spend_rollups(
+        date.fromisoformat(date_from) if date_from else None,
+        date.fromisoformat(date_to) if date_to else None,
+    )
+    return {'rows': rows}
+
+
+@register('record_daily_metrics', queue='maintenance', timeout=1800)
+def recompute_daily_metrics(days=2):
+    today = timezone.localdate()
+    return {'rows': analytics.record_daily_metrics(today - timedelta(days=days - 1), today)}
+
+
+@register('rebuild_supplier_stats', queue='maintenance', timeout=1800)
+def rebuild_stats():
+    return {'rows': stats.rebuild_supplier_stats()}
+
+
+@register('rebuild_search_index', queue='maintenance', timeout=3600)
+def rebuild_search(kind):
+    return {'indexed': search.rebuild(kind)}
@@ -0,0 +1,39 @@
+"""
+archive_batches — Move old exported batches to the archive tables.
+
+    python manage.py archive_batches --dry-run
+    python manage.py archive_batches --months 24 --chunk-size 50
+
+Safe to interrupt and re-run: each chunk is archived in its own transaction.
+"""
+from django.core.management.base import BaseCommand
+
+from eft_app import archive
+
+
+class Command(BaseCommand):
+    help = 'Archive EXPORTED batches (with transactions and audit logs) older than N months'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help='Export age in months (default: settings.EFT_ARCHIVE_AFTER_MONTHS)')
+        parser.add_argument('--chunk-size', type=int, default=50, help='Batches per transaction')
+        parser.add_argument('--limit', type=int, help='Stop after this many batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many batches would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = archive.archive_cutoff(options['months'])
+        if options['dry_run']:
+            count = archive.archivable_batches(cutoff).count()
+            self.stdout.write(f'{count} batch(es) exported before {cutoff:%Y-%m-%d} would be archived')
+            return
+
+        def progress(totals):
+            self.stdout.write(f'  archived {totals[0]} batches, {totals[1]} transactions, {totals[2]} audit logs')
+
+        batches, transactions, logs = archive.archive_batches(
+            cutoff, chunk_size=options['chunk_size'], limit=options['limit'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {batches} batch(es), {transactions} transaction(s), {logs} audit log(s) '
+            f'exported before {cutoff:%Y-%m-%d}'
+        ))
@@ -0,0 +1,149 @@
+"""
+benchmark_lookups — Latency of the transaction-entry lookups under many
+parallel clients, sync views vs. their async twins.
+
+    python manage.py benchmark_lookups --username jbanda
+    python manage.py benchmark_lookups --username jbanda --clients 200 --requests 10
+
+Requests go through Django's real ASGI handler in this process (the same
+application uvicorn/daphne serve from eft_system/asgi.py), with the full
+middleware stack. Each client fires its lookups back to back, each one a
+supplier details, scheme zone or scheme details request for a random active
+supplier or scheme; all clients start together. Sync views run in
+threads as Django runs them under ASGI; async views stay on the event loop.
+"""
+import asyncio
+import logging
+import random
+import statistics
+import time
+import types
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import path
+
+from eft_app import reference_data, views
+
+VARIANTS = {
+    'sync': (views.get_supplier_details, views.get_scheme_zone, views.get_scheme_details),
+    'async': (views.aget_supplier_details, views.aget_scheme_zone, views.aget_scheme_details),
+}
+
+
+def _urlconf(variant):
+    supplier_details, scheme_zone, scheme_details = VARIANTS[variant]
+    module = types.ModuleType(f'benchmark_lookups_{variant}')
+    module.urlpatterns = [
+        path('supplier/<int:supplier_id>/', supplier_details),
+        path('scheme/<int:scheme_id>/zone/', scheme_zone),
+        path('scheme/<int:scheme_id>/details/', scheme_details),
+    ]
+    return module
+
+
+class Command(BaseCommand):
+    help = 'Benchmark supplier/scheme lookup latency with many parallel clients, sync vs async views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help='User to make the requests as')
+        parser.add_argument('--clients', type=int, default=200, help='Parallel clients')
+        parser.add_argument('--requests', type=int, default=5, help='Lookups per client per variant')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        suppliers = [row.id for row in reference_data.table('suppliers').active()]
+        schemes = [row.id for row in reference_data.table('schemes').active()]
+        if not suppliers or not schemes:
+            raise CommandError('Need at least one active supplier and one active scheme to look up')
+
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+
+        # One JSON line per request from RequestMetricsMiddleware would drown the report
+        request_log = logging.getLogger('eft_app.requests')
+        log_level = request_log.level
+        request_log.setLevel(logging.ERROR)
+        try:
+            self.stdout.write(
+                f"{'views':<6} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                f"{'p99 ms':>8} {'max ms':>8} {'errors':>7}"
+            )
+            for variant in VARIANTS:
+                with override_settings(ROOT_URLCONF=_urlconf(variant)):
+                    handler = ASGIHandler()
+                    result = asyncio.run(self._run(
+                        handler, host, cookie, suppliers, schemes, options['clients'], options['requests'],
+                    ))
+                connections.close_all()
+                self.stdout.write(
+                    f"{variant:<6} {options['clients']:>7} {result['rps']:>8.1f} {result['p50']:>8.1f} "
+                    f"{result['p95']:>8.1f} {result['p99']:>8.1f} {result['max']:>8.1f} {result['errors']:>7}"
+                )
+        finally:
+            request_log.setLevel(log_level)
+            client.logout()
+
+    @staticmethod
+    async def _request(handler, host, cookie, url):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': url, 'raw_path': url.encode(),
+            'query_string': b'', 'root_path': '', 'client': ('127.0.0.1', 0), 'server': (host, 80),
+            'headers': [(b'host', host.encode()), (b'cookie', cookie.encode())],
+        }
+        sent_body = asyncio.Event()
+        messages = []
+
+        async def receive():
+            if not sent_body.is_set():
+                sent_body.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Event().wait()  # the client never disconnects
+
+        async def send(message):
+            messages.append(message)
+
+        start = time.perf_counter()
+        await handler(scope, receive, send)
+        return (time.perf_counter() - start) * 1000, messages[0]['status']
+
+    async def _run(self, handler, host, cookie, suppliers, schemes, clients, requests):
+        latencies, errors = [], 0
+
+        async def client(n):
+            nonlocal errors
+            for _ in range(n):
+                url = random.choice([
+                    f'/supplier/{random.choice(suppliers)}/',
+                    f'/scheme/{random.choice(schemes)}/zone/',
+                    f'/scheme/{random.choice(schemes)}/details/',
+                ])
+                elapsed, status = await self._request(handler, host, cookie, url)
+                latencies.append(elapsed)
+                if status != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(requests) for _ in range(clients)))
+        wall = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'rps': len(latencies) / wall if wall else 0.0,
+            'p50': statistics.median(latencies),
+            'p95': latencies[int(len(latencies) * 0.95) - 1],
+            'p99': latencies[int(len(latencies) * 0.99) - 1],
+            'max': latencies[-1],
+            'errors': errors,
+        }
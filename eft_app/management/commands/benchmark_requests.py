@@ -0,0 +1,149 @@
+"""
+benchmark_requests — Requests/second for key pages, with and without
+persistent database connections.
+
+    python manage.py benchmark_requests --username jbanda
+    python manage.py benchmark_requests --username jbanda --requests 500 --concurrency 8
+
+Requests go through Django's real WSGI handler in this process, so
+request_started/request_finished close or keep connections exactly as
+under gunicorn. Each page is measured twice: with CONN_MAX_AGE=0 (a new
+connection per request, the development profile) and with the production
+profile's CONN_MAX_AGE and health checks. Run it against the MySQL server
+you want numbers for; on SQLite connecting is nearly free.
+"""
+import io
+import logging
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from eft_app.models import EFTBatch
+
+
+class Command(BaseCommand):
+    help = 'Benchmark dashboard/view_batch requests per second with and without persistent DB connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help='User to make the requests as')
+        parser.add_argument('--batch', type=int, help='Batch id for view_batch (default: latest visible)')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page per profile')
+        parser.add_argument('--concurrency', type=int, default=4, help='Parallel client threads')
+        parser.add_argument('--conn-max-age', type=int, default=300, help='CONN_MAX_AGE for the persistent run')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        batches = EFTBatch.objects.order_by('-created_at')
+        if not user.is_superuser and user.groups.filter(name='Accounts Personnel').exists():
+            batches = batches.filter(created_by=user)
+        batch_id = options['batch'] or batches.values_list('id', flat=True).first()
+
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        # The test client's 'testserver' and wsgiref's '127.0.0.1' are rarely in ALLOWED_HOSTS
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+
+        # 'dashboard' only redirects to the role's dashboard; measure that page
+        dashboard = client.get(reverse('dashboard'), HTTP_HOST=host)
+        if dashboard.status_code not in (200, 302):
+            raise CommandError(f"GET {reverse('dashboard')} returned {dashboard.status_code}")
+        paths = {'dashboard': dashboard.get('Location', reverse('dashboard'))}
+        if batch_id:
+            paths['view_batch'] = reverse('view_batch', args=[batch_id])
+        else:
+            self.stdout.write(self.style.WARNING('No batch found; skipping view_batch'))
+
+        # One JSON line per request from RequestMetricsMiddleware would drown the report
+        request_log = logging.getLogger('eft_app.requests')
+        log_level = request_log.level
+        request_log.setLevel(logging.ERROR)
+
+        profiles = [
+            ('per-request', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}),
+            ('persistent', {'CONN_MAX_AGE': options['conn_max_age'], 'CONN_HEALTH_CHECKS': True}),
+        ]
+        original = {alias: {k: connections[alias].settings_dict.get(k) for k in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+                    for alias in connections}
+        handler = WSGIHandler()
+        try:
+            self.stdout.write(f"{'page':<12} {'profile':<12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+            for name, path in paths.items():
+                for label, conn_settings in profiles:
+                    self._apply(conn_settings)
+                    result = self._run(handler, path, host, cookie, options['requests'], options['concurrency'])
+                    self.stdout.write(
+                        f"{name:<12} {label:<12} {result['rps']:>8.1f} {result['p50']:>8.1f} "
+                        f"{result['p95']:>8.1f} {result['errors']:>7}"
+                    )
+        finally:
+            for alias, values in original.items():
+                connections[alias].settings_dict.update(values)
+            request_log.setLevel(log_level)
+
+    @staticmethod
+    def _apply(conn_settings):
+        for alias in connections:
+            connections[alias].settings_dict.update(conn_settings)
+            connections[alias].close()
+
+    @staticmethod
+    def _request(handler, path, host, cookie):
+        environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'HTTP_HOST': host, 'HTTP_COOKIE': cookie,
+                   'wsgi.errors': sys.stderr, 'wsgi.input': io.BytesIO()}
+        setup_testing_defaults(environ)
+        status = []
+        start = time.perf_counter()
+        response = handler(environ, lambda s, headers, exc_info=None: status.append(s))
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()  # fires request_finished -> close_old_connections()
+        return (time.perf_counter() - start) * 1000, status[0]
+
+    def _run(self, handler, path, host, cookie, total, concurrency):
+        latencies, errors = [], 0
+        lock = threading.Lock()
+
+        def worker(n):
+            nonlocal errors
+            mine = []
+            for _ in range(n):
+                elapsed, status = self._request(handler, path, host, cookie)
+                mine.append(elapsed)
+                if not status.startswith(('2', '3')):
+                    with lock:
+                        errors += 1
+            connections.close_all()
+            with lock:
+                latencies.extend(mine)
+
+        shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, shares))
+        wall = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'rps': len(latencies) / wall if wall else 0.0,
+            'p50': statistics.median(latencies) if latencies else 0.0,
+            'p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+            'errors': errors,
+        }
@@ -0,0 +1,92 @@
+"""
+benchmark_validation — Export validation time for a large batch across
+worker counts, threads vs processes.
+
+    python manage.py benchmark_validation
+    python manage.py benchmark_validation --rows 50000 --workers 1 2 4 8 16
+    python manage.py benchmark_validation --batch 412 --executor process
+
+By default the lines are synthetic: --rows copies of valid lines drawn from
+the active suppliers and debit accounts, so nothing is written to the
+database. With --batch the lines of that batch are used instead. Each
+setting runs validation.validate_lines --repeat times and reports the best
+run, with its speedup over the inline (single-thread) run. Threads only
+scale on a free-threaded Python build; the header says whether the GIL
+is on.
+"""
+import random
+import sys
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eft_app import reference_data, validation
+from eft_app.models import EFTBatch
+
+
+class Command(BaseCommand):
+    help = 'Benchmark chunked export validation across worker counts and executors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Synthetic lines to validate')
+        parser.add_argument('--batch', type=int, help='Validate the lines of this batch instead')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Worker counts to try')
+        parser.add_argument('--executor', choices=['thread', 'process'], action='append',
+                            help='Executor to try; repeat for both (default: both)')
+        parser.add_argument('--chunk-size', type=int, help="Lines per chunk (default: settings.EFT_VALIDATION['CHUNK_SIZE'])")
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per setting; the best is reported')
+
+    def handle(self, *args, **options):
+        if options['batch']:
+            batch = EFTBatch.objects.filter(id=options['batch']).first()
+            if batch is None:
+                raise CommandError(f"Batch {options['batch']} does not exist")
+            lines = validation.load_lines(batch)
+        else:
+            lines = self._synthetic_lines(options['rows'])
+        chunk_size = options['chunk_size'] or validation.get_validation_settings()['CHUNK_SIZE']
+
+        gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+        self.stdout.write(
+            f"{len(lines)} lines, chunks of {chunk_size}, Python {sys.version.split()[0]}, "
+            f"GIL {'on' if gil else 'off'}"
+        )
+        inline_ms = self._best(lines, 'inline', 1, chunk_size, options['repeat'])
+        self.stdout.write(f"{'executor':<9} {'workers':>7} {'ms':>9} {'lines/s':>10} {'speedup':>8}")
+        self._row('inline', 1, inline_ms, len(lines), inline_ms)
+        for executor in options['executor'] or ['thread', 'process']:
+            for workers in options['workers']:
+                elapsed = self._best(lines, executor, workers, chunk_size, options['repeat'])
+                self._row(executor, workers, elapsed, len(lines), inline_ms)
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def _synthetic_lines(self, rows):
+        banks = reference_data.table('banks')
+        suppliers = [row for row in reference_data.table('suppliers').active() if banks.get(row.bank_id)]
+        accounts = list(reference_data.table('debit_accounts').rows)
+        if not suppliers or not accounts:
+            raise CommandError('Need at least one active supplier with a bank and one debit account')
+        lines = []
+        for n in range(1, rows + 1):
+            supplier = random.choice(suppliers)
+            lines.append(validation.Line(
+                n, Decimal(random.randint(1000, 5_000_000)) / 100, supplier.id, supplier.supplier_code,
+                supplier.account_name, supplier.account_number, banks.get(supplier.bank_id).swift_code,
+                random.choice(accounts), f'INV{n:06d}', f'SRC{n:06d}', f'Benchmark line {n}',
+            ))
+        return lines
+
+    @staticmethod
+    def _best(lines, executor, workers, chunk_size, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            validation.validate_lines(lines, executor=executor, workers=workers, chunk_size=chunk_size)
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
+
+    def _row(self, executor, workers, elapsed, count, inline_ms):
+        self.stdout.write(
+            f"{executor:<9} {workers:>7} {elapsed:>9.1f} {count / elapsed * 1000:>10.0f} {inline_ms / elapsed:>7.2f}x"
+        )
@@ -0,0 +1,30 @@
+"""
+rebuild_search_index — Rebuild the SearchToken index used by list-page search.
+
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --kind supplier --kind batch
+
+Needed once after deploying the search tables, and after bulk loads that
+bypass model save() (bulk_create, raw SQL imports).
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from eft_app import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search token index for suppliers, batches and transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', action='append', choices=sorted(search.INDEXED),
+            help='Only rebuild this kind (may be repeated); default is all',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        for kind in options['kind'] or sorted(search.INDEXED):
+            with transaction.atomic():
+                count = search.rebuild(kind, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'{kind}: indexed {count} objects'))
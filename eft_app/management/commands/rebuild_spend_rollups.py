@@ -0,0 +1,36 @@
+"""
+rebuild_spend_rollups — Recompute SpendRollup from transactions.
+
+    python manage.py rebuild_spend_rollups
+    python manage.py rebuild_spend_rollups --from 2024-01-01 --to 2024-12-31
+
+Run once after deploying the rollup table, and for a date range whenever
+figures need repairing (e.g. after data fixes made outside the approval
+workflow).
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eft_app.analytics import rebuild_spend_rollups
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}' (expected YYYY-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily spend rollups from approved and exported batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First approval day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last approval day to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        date_from = _date(options['date_from']) if options['date_from'] else None
+        date_to = _date(options['date_to']) if options['date_to'] else None
+        count = rebuild_spend_rollups(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} spend rollup row(s)'))
@@ -0,0 +1,19 @@
+"""
+rebuild_supplier_stats — Recompute SupplierPaymentStats from transactions.
+
+    python manage.py rebuild_supplier_stats
+
+Run once after deploying the stats table, and whenever the figures need
+repairing (e.g. after data fixes made outside the approval workflow).
+"""
+from django.core.management.base import BaseCommand
+
+from eft_app.stats import rebuild_supplier_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-supplier payment statistics from approved and exported batches'
+
+    def handle(self, *args, **options):
+        count = rebuild_supplier_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt payment stats for {count} supplier(s)'))
@@ -0,0 +1,45 @@
+"""
+record_daily_metrics — Recompute DailyMetric rows from batches and audit logs.
+
+    python manage.py record_daily_metrics                 # yesterday and today (nightly)
+    python manage.py record_daily_metrics --days 90
+    python manage.py record_daily_metrics --from 2024-01-01 --to 2024-12-31
+
+Schedule it nightly shortly after midnight: it settles yesterday's counters
+and fills in active users. Use --from/--to once to backfill history.
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from eft_app.analytics import record_daily_metrics
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}' (expected YYYY-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily dashboard metrics for recent days or a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Number of days up to today (default: 2)')
+        parser.add_argument('--from', dest='date_from', help='First day to recompute (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last day to recompute (YYYY-MM-DD, default: today)')
+
+    def handle(self, *args, **options):
+        date_to = _date(options['date_to']) if options['date_to'] else timezone.localdate()
+        if options['date_from']:
+            date_from = _date(options['date_from'])
+        else:
+            if options['days'] < 1:
+                raise CommandError('--days must be at least 1')
+            date_from = date_to - timedelta(days=options['days'] - 1)
+        if date_from > date_to:
+            raise CommandError('--from must not be after --to')
+        count = record_daily_metrics(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(f'Recorded metrics for {count} day(s) ({date_from} to {date_to})'))
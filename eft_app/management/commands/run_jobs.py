@@ -0,0 +1,42 @@
+"""
+run_jobs — Background job worker (see eft_app/jobs.py).
+
+    python manage.py run_jobs
+    python manage.py run_jobs --queue default --queue maintenance --processes 4
+    python manage.py run_jobs --burst          # run what is due, then exit (cron)
+
+Runs until SIGTERM/Ctrl-C, then stops claiming and waits for running jobs
+to finish. Run one per host under systemd/supervisor (or a Windows
+service); any number of workers can share the database.
+"""
+from django.core.management.base import BaseCommand
+
+
+def run_job(job_id):
+    """Child process entry point; importable before Django is set up (spawn)."""
+    import django
+    django.setup()
+    from eft_app import jobs
+    jobs.execute(job_id)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', dest='queues', action='append',
+                            help='Queue to take jobs from; repeat for several (default: default, maintenance)')
+        parser.add_argument('--processes', type=int, help="Jobs run at once (default: settings.EFT_JOBS['PROCESSES'])")
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        from eft_app import jobs
+
+        worker = jobs.Worker(
+            run_job,
+            queues=options['queues'] or ['default', 'maintenance'],
+            processes=options['processes'],
+            log=self.stdout.write,
+        )
+        worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker.name} stopped'))
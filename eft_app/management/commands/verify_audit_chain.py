@@ -0,0 +1,27 @@
+"""
+verify_audit_chain — Check the approval audit log hash chain for tampering.
+
+    python manage.py verify_audit_chain          # from the last verified checkpoint
+    python manage.py verify_audit_chain --full   # rehash every entry
+
+Exits with status 1 if the chain is broken.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from eft_app import audit
+
+
+class Command(BaseCommand):
+    help = 'Verify the SHA-256 hash chain of the approval audit log (live and archived)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Ignore checkpoints and rehash from the first entry')
+        parser.add_argument('--max-errors', type=int, default=20)
+
+    def handle(self, *args, **options):
+        checked, errors = audit.verify_chain(full=options['full'], max_errors=options['max_errors'])
+        if errors:
+            for error in errors:
+                self.stderr.write(str(error))
+            raise CommandError(f'Audit chain broken: {len(errors)} problem(s) in {checked} entries checked')
+        self.stdout.write(self.style.SUCCESS(f'Audit chain intact: {checked} entries checked'))
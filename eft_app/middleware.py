@@ -0,0 +1,278 @@
+"""
+middleware.py — Request instrumentation for CRWB EFT System.
+
+RequestMetricsMiddleware records, for every request:
+  - number of SQL queries and total SQL time (via an execute wrapper, so it
+    works with DEBUG off and costs two perf_counter() calls per query)
+  - time spent in the view stack (everything below this middleware)
+  - response size in bytes (non-streaming responses only)
+
+The figures are returned in a Server-Timing header and written as one JSON
+log line to the ``eft_app.requests`` logger. Requests over the configured
+thresholds are logged at WARNING with the slowest statement; EXPLAIN is run
+for it when enabled in settings or requested by a staff user via header.
+
+Configured through settings.EFT_REQUEST_METRICS (see DEFAULTS).
+
+PrimaryPinningMiddleware supports the read-replica router in db_routers.py.
+
+HealthCheckMiddleware answers /healthz and /readyz (see health.py).
+
+All three support sync and async, so under ASGI an async view (e.g. the
+EFT_ASYNC_LOOKUPS lookups) runs on the event loop instead of being pushed
+through a thread by a sync-only middleware.
+
+Under ASGI a request's queries run on other threads than the middleware
+(sync views, session/auth lookups and the async ORM all go through
+sync_to_async), and Django's connections are per thread. So the query
+wrapper is installed on every connection as it is opened and finds the
+request's recorder through a context variable, which sync_to_async carries
+into its threads.
+"""
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import JsonResponse
+
+from . import health
+from .db_routers import PrimaryPinning, replica_alias
+
+logger = logging.getLogger('eft_app.requests')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SLOW_REQUEST_MS': 500,      # flag requests slower than this
+    'SLOW_QUERY_COUNT': 50,      # flag requests issuing more queries than this
+    'SLOW_SQL_MS': 100,          # flag requests with a single statement slower than this
+    'EXPLAIN_SLOW_REQUESTS': False,
+    'EXPLAIN_HEADER': 'HTTP_X_EFT_EXPLAIN',  # staff may send "X-EFT-Explain: 1"
+}
+
+
+def get_metrics_settings():
+    return {**DEFAULTS, **getattr(settings, 'EFT_REQUEST_METRICS', {})}
+
+
+class QueryRecorder:
+    """Tallies SQL count, time and the slowest statement of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = None  # (duration, alias, sql, params)
+
+    def execute(self, alias, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if self.slowest is None or elapsed > self.slowest[0]:
+                self.slowest = (elapsed, alias, sql, None if many else params)
+
+
+# The recorder of the request being served, if metrics are on
+_recorder = ContextVar('eft_query_recorder', default=None)
+
+
+def record_queries(execute, sql, params, many, context):
+    """Execute wrapper on every connection; passes through outside a recorded request."""
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder.execute(context['connection'].alias, execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def _install_query_recorder(sender, connection, **kwargs):
+    # Fired on every (re)connect of a per-thread connection object
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_queries)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_metrics_settings()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.config['ENABLED']:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self._record(request, response, recorder, (time.perf_counter() - start) * 1000)
+
+    async def __acall__(self, request):
+        if not self.config['ENABLED']:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        view_ms = (time.perf_counter() - start) * 1000
+        if self._is_slow(view_ms, recorder) or request.META.get(self.config['EXPLAIN_HEADER']) == '1':
+            # May load request.user or run EXPLAIN
+            return await sync_to_async(self._record)(request, response, recorder, view_ms)
+        return self._record(request, response, recorder, view_ms)
+
+    def _is_slow(self, view_ms, recorder):
+        return (
+            view_ms > self.config['SLOW_REQUEST_MS']
+            or recorder.count > self.config['SLOW_QUERY_COUNT']
+            or (recorder.slowest is not None and recorder.slowest[0] * 1000 > self.config['SLOW_SQL_MS'])
+        )
+
+    def _record(self, request, response, recorder, view_ms):
+        sql_ms = recorder.duration * 1000
+
+        size = None if response.streaming else len(response.content)
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={sql_ms:.1f};desc="{recorder.count} queries"',
+            f'view;dur={view_ms:.1f}',
+        ])
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(sql_ms, 1),
+            'view_ms': round(view_ms, 1),
+            'bytes': size,
+        }
+
+        slow = self._is_slow(view_ms, recorder)
+        if slow or self._explain_requested(request):
+            self._add_slowest(record, recorder, request)
+
+        if slow:
+            record['slow'] = True
+            logger.warning(json.dumps(record, default=str))
+        else:
+            logger.info(json.dumps(record, default=str))
+        return response
+
+    def _explain_requested(self, request):
+        if request.META.get(self.config['EXPLAIN_HEADER']) != '1':
+            return False
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
+
+    def _add_slowest(self, record, recorder, request):
+        if recorder.slowest is None:
+            return
+        elapsed, alias, sql, params = recorder.slowest
+        record['slowest_sql'] = {'ms': round(elapsed * 1000, 1), 'db': alias, 'sql': sql}
+        if self.config['EXPLAIN_SLOW_REQUESTS'] or self._explain_requested(request):
+            record['slowest_sql']['explain'] = self._explain(alias, sql, params)
+
+    @staticmethod
+    def _explain(alias, sql, params):
+        # Only plain reads are re-run; EXPLAIN on a write could be unsafe on some backends
+        if params is None or not sql.lstrip().upper().startswith('SELECT'):
+            return None
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(f'EXPLAIN {sql}', params)
+                return [list(row) for row in cursor.fetchall()]
+        except Exception as e:
+            return f'EXPLAIN failed: {e}'
+
+
+class PrimaryPinningMiddleware:
+    """
+    Keeps a client on the primary database for EFT_DB_REPLICA_PIN_SECONDS
+    after it writes, so replica lag never hides the user's own changes
+    (see db_routers.py). Does nothing when no replica is configured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_alias():
+            return self.get_response(request)
+        with PrimaryPinning(request) as pinning:
+            response = self.get_response(request)
+        return pinning.pin(response)
+
+    async def __acall__(self, request):
+        if not replica_alias():
+            return await self.get_response(request)
+        with PrimaryPinning(request) as pinning:
+            response = await self.get_response(request)
+        return pinning.pin(response)
+
+
+class HealthCheckMiddleware:
+    """
+    Answers liveness and readiness probes ahead of every other middleware:
+    no session, auth, host validation or request log line per probe.
+    """
+    PROBES = {'/healthz', '/healthz/', '/readyz', '/readyz/'}
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path not in self.PROBES:
+            return self.get_response(request)
+        if request.path.startswith('/healthz'):
+            return self._respond(health.liveness())
+        return self._ready(*health.readiness())
+
+    async def __acall__(self, request):
+        if request.path not in self.PROBES:
+            return await self.get_response(request)
+        if request.path.startswith('/healthz'):
+            return self._respond(health.liveness())
+        return self._ready(*await sync_to_async(health.readiness)())
+
+    def _ready(self, ready, checks):
+        return self._respond({'status': 'ok' if ready else 'unavailable', 'checks': checks},
+                             status=200 if ready else 503)
+
+    @staticmethod
+    def _respond(payload, status=200):
+        response = JsonResponse(payload, status=status)
+        response['Cache-Control'] = 'no-store'
+        return response
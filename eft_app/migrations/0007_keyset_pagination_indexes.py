@@ -0,0 +1,48 @@
+# Generated by Django 5.0.6 on 2026-10-19 11:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0006_alter_eftbatch_batch_reference"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="approvalauditlog",
+            index=models.Index(
+                fields=["batch", "timestamp", "id"], name="auditlog_batch_ts_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="eftbatch",
+            index=models.Index(
+                fields=["created_at", "id"], name="eftbatch_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="eftbatch",
+            index=models.Index(
+                fields=["status", "created_at", "id"],
+                name="eftbatch_status_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="eftbatch",
+            index=models.Index(
+                fields=["created_by", "created_at", "id"],
+                name="eftbatch_owner_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="efttransaction",
+            index=models.Index(
+                fields=["supplier", "created_at", "id"],
+                name="efttxn_supplier_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-19 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0007_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("supplier", "Supplier"),
+                            ("batch", "EFT Batch"),
+                            ("transaction", "EFT Transaction"),
+                        ],
+                        max_length=12,
+                    ),
+                ),
+                ("object_id", models.BigIntegerField()),
+                ("token", models.CharField(max_length=64)),
+                ("weight", models.PositiveSmallIntegerField(default=1)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "token"], name="searchtoken_kind_token_idx"
+                    )
+                ],
+                "unique_together": {("kind", "object_id", "token")},
+            },
+        ),
+    ]
@@ -0,0 +1,215 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0008_search_tokens"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedEFTBatch",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("batch_name", models.CharField(max_length=100)),
+                ("batch_reference", models.CharField(max_length=50, unique=True)),
+                ("currency", models.CharField(default="MWK", max_length=3)),
+                (
+                    "total_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("record_count", models.IntegerField(default=0)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("DRAFT", "Draft"),
+                            ("PENDING_FM", "Pending Finance Manager"),
+                            ("PENDING_DIRECTOR", "Pending Director of Finance"),
+                            ("APPROVED", "Approved"),
+                            ("REJECTED", "Rejected"),
+                            ("EXPORTED", "Exported to RBM"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("file_reference", models.CharField(blank=True, max_length=16)),
+                (
+                    "file_type",
+                    models.CharField(
+                        choices=[
+                            ("OBDXPMN", "Payment File - Domestic Suppliers"),
+                            ("OBDXFX", "Foreign Payment File - Cross Border"),
+                            ("OBDXRM", "Remittance File - Intra-account Transfers"),
+                            ("OBDXRP", "Remittance with PRN - Tax Payments to MRA"),
+                            ("OBDXSF", "Salary File - Employee Payments"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("fm_reviewed_at", models.DateTimeField(blank=True, null=True)),
+                ("fm_remarks", models.TextField(blank=True)),
+                ("approved_at", models.DateTimeField(blank=True, null=True)),
+                ("remarks", models.TextField(blank=True)),
+                ("rejection_reason", models.TextField(blank=True)),
+                ("generated_file", models.TextField(blank=True)),
+                ("generated_at", models.DateTimeField(blank=True, null=True)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "approved_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "debit_account",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="eft_app.debitaccount",
+                    ),
+                ),
+                (
+                    "fm_reviewed_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedAuditLog",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("SUBMITTED", "Submitted for Finance Manager Review"),
+                            ("FM_REVIEWED", "Reviewed by Finance Manager"),
+                            ("FM_REJECTED", "Rejected by Finance Manager"),
+                            ("APPROVED", "Approved by Director of Finance"),
+                            ("REJECTED", "Rejected by Director of Finance"),
+                            ("EXPORTED", "Exported to RBM"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+                ("remarks", models.TextField(blank=True)),
+                ("ip_address", models.GenericIPAddressField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "batch",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="audit_logs",
+                        to="eft_app.archivedeftbatch",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-timestamp"],
+                "indexes": [
+                    models.Index(
+                        fields=["batch", "timestamp", "id"], name="archlog_batch_ts_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedEFTTransaction",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("sequence_number", models.CharField(max_length=4)),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("narration", models.CharField(max_length=200)),
+                ("reference_number", models.CharField(max_length=16)),
+                ("source_reference", models.CharField(max_length=18)),
+                ("employee_number", models.CharField(blank=True, max_length=6)),
+                ("national_id", models.CharField(blank=True, max_length=8)),
+                ("cost_center", models.CharField(blank=True, max_length=50)),
+                ("created_at", models.DateTimeField()),
+                (
+                    "batch",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transactions",
+                        to="eft_app.archivedeftbatch",
+                    ),
+                ),
+                (
+                    "debit_account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="eft_app.debitaccount",
+                    ),
+                ),
+                (
+                    "scheme",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="eft_app.scheme",
+                    ),
+                ),
+                (
+                    "supplier",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="eft_app.supplier",
+                    ),
+                ),
+                (
+                    "zone",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="eft_app.zone",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["sequence_number"],
+                "unique_together": {("batch", "sequence_number")},
+            },
+        ),
+    ]
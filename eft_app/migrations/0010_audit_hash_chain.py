@@ -0,0 +1,110 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def chain_existing_logs(apps, schema_editor):
+    """Hash existing audit rows (archive and live, in id order) and create the chain head."""
+    import heapq
+
+    from eft_app.audit import hash_log
+
+    ApprovalAuditLog = apps.get_model("eft_app", "ApprovalAuditLog")
+    ArchivedAuditLog = apps.get_model("eft_app", "ArchivedAuditLog")
+    AuditChainHead = apps.get_model("eft_app", "AuditChainHead")
+
+    prev, last_id, count = "", None, 0
+    rows = heapq.merge(
+        ApprovalAuditLog.objects.order_by("id").iterator(chunk_size=2000),
+        ArchivedAuditLog.objects.order_by("id").iterator(chunk_size=2000),
+        key=lambda log: log.id,
+    )
+    for log in rows:
+        log.prev_hash = prev
+        log.entry_hash = prev = hash_log(log, log.prev_hash)
+        log.save(update_fields=["prev_hash", "entry_hash"])
+        last_id, count = log.id, count + 1
+    AuditChainHead.objects.create(
+        pk=1, last_id=last_id, last_hash=prev, entry_count=count
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0009_archive_tier"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditChainHead",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_id", models.BigIntegerField(blank=True, null=True)),
+                ("last_hash", models.CharField(blank=True, max_length=64)),
+                ("entry_count", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="AuditCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("log_id", models.BigIntegerField(unique=True)),
+                ("entry_hash", models.CharField(max_length=64)),
+                ("entry_count", models.BigIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("verified_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-log_id"],
+            },
+        ),
+        migrations.AddField(
+            model_name="approvalauditlog",
+            name="entry_hash",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="approvalauditlog",
+            name="prev_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="archivedauditlog",
+            name="entry_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="archivedauditlog",
+            name="prev_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name="approvalauditlog",
+            name="timestamp",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.RunPython(chain_existing_logs, migrations.RunPython.noop),
+    ]
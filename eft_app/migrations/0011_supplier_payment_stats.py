@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0010_audit_hash_chain"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SupplierPaymentStats",
+            fields=[
+                (
+                    "supplier",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="payment_stats",
+                        serialize=False,
+                        to="eft_app.supplier",
+                    ),
+                ),
+                ("payment_count", models.PositiveIntegerField(default=0)),
+                (
+                    "lifetime_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("last_paid_at", models.DateTimeField(blank=True, null=True)),
+                ("last_batch_id", models.BigIntegerField(blank=True, null=True)),
+                ("last_batch_reference", models.CharField(blank=True, max_length=50)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "Supplier payment stats",
+            },
+        ),
+    ]
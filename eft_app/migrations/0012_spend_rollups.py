@@ -0,0 +1,70 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0011_supplier_payment_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpendRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("cost_center", models.CharField(blank=True, max_length=50)),
+                (
+                    "file_type",
+                    models.CharField(
+                        choices=[
+                            ("OBDXPMN", "Payment File - Domestic Suppliers"),
+                            ("OBDXFX", "Foreign Payment File - Cross Border"),
+                            ("OBDXRM", "Remittance File - Intra-account Transfers"),
+                            ("OBDXRP", "Remittance with PRN - Tax Payments to MRA"),
+                            ("OBDXSF", "Salary File - Employee Payments"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("line_count", models.PositiveIntegerField(default=0)),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "scheme",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="eft_app.scheme",
+                    ),
+                ),
+                (
+                    "zone",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="eft_app.zone",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["day"], name="spendrollup_day_idx")],
+                "unique_together": {
+                    ("day", "zone", "scheme", "cost_center", "file_type")
+                },
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0012_spend_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyMetric",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(unique=True)),
+                ("batches_created", models.PositiveIntegerField(default=0)),
+                ("batches_submitted", models.PositiveIntegerField(default=0)),
+                ("batches_approved", models.PositiveIntegerField(default=0)),
+                ("batches_rejected", models.PositiveIntegerField(default=0)),
+                ("batches_exported", models.PositiveIntegerField(default=0)),
+                (
+                    "amount_submitted",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "amount_approved",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "amount_exported",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("active_users", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["day"],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0014_background_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eftbatch",
+            name="version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
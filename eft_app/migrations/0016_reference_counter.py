@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0015_batch_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReferenceCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(unique=True)),
+                ("last_value", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0016_reference_counter"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="approvalauditlog",
+            name="batch",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="audit_logs",
+                to="eft_app.eftbatch",
+            ),
+        ),
+    ]
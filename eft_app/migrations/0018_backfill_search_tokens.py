@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:10
+
+from django.db import migrations
+
+
+def index_existing_rows(apps, schema_editor):
+    """Tokenise suppliers, batches and transactions created before the search index existed."""
+    from eft_app.search import INDEXED, token_weights
+
+    SearchToken = apps.get_model("eft_app", "SearchToken")
+    for kind, (model, _, fields) in INDEXED.items():
+        if SearchToken.objects.filter(kind=kind).exists():
+            continue
+        rows = []
+        objects = apps.get_model("eft_app", model.__name__).objects.only("pk", *fields)
+        for obj in objects.iterator(chunk_size=2000):
+            rows.extend(
+                SearchToken(kind=kind, object_id=obj.pk, token=token, weight=weight)
+                for token, weight in token_weights(kind, obj).items()
+            )
+            if len(rows) >= 2000:
+                SearchToken.objects.bulk_create(rows)
+                rows = []
+        SearchToken.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eft_app", "0017_audit_log_protect_batch"),
+    ]
+
+    operations = [
+        migrations.RunPython(index_existing_rows, migrations.RunPython.noop),
+    ]
@@ -3,12 +3,16 @@ Models for EFT System - Python 3.14 + Django 5.0.6
 Two-stage approval: Accounts → Finance Manager → Director of Finance
 Updated with OBDX file type support
 """
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, RegexValidator
 from django.utils import timezone
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 
 
 class Bank(models.Model):
@@ -107,6 +111,43 @@ class DebitAccount(models.Model):
         return f"{self.account_number} - {self.account_name}"
 
 
+class EFTBatchQuerySet(models.QuerySet):
+    """
+    Named projections for EFTBatch. The text columns (the generated file can
+    be megabytes) are only loaded where a page shows them; deferred fields
+    still load on access, and save() without update_fields only writes the
+    loaded ones.
+    """
+    HEAVY_FIELDS = ('generated_file', 'fm_remarks', 'remarks', 'rejection_reason')
+
+    def for_list(self):
+        """List pages and dashboards: header columns plus the creator."""
+        return self.defer(*self.HEAVY_FIELDS).select_related('created_by')
+
+    def for_review(self):
+        """Batch view and review pages: everything but the generated file."""
+        return self.defer('generated_file').select_related(
+            'created_by', 'debit_account', 'fm_reviewed_by', 'approved_by'
+        )
+
+    def for_export(self):
+        """File generation and export: header plus the debit account for the party id."""
+        return self.defer('fm_remarks', 'remarks', 'rejection_reason').select_related(
+            'created_by', 'debit_account'
+        )
+
+    def with_line_totals(self):
+        """Annotate line_total and line_count, summed from the transactions in SQL."""
+        lines = EFTTransaction.objects.filter(batch=OuterRef('pk')).order_by().values('batch')
+        return self.annotate(
+            line_total=Coalesce(
+                Subquery(lines.annotate(total=Sum('amount')).values('total')),
+                Value(Decimal('0')), output_field=models.DecimalField(max_digits=20, decimal_places=2),
+            ),
+            line_count=Coalesce(Subquery(lines.annotate(count=Count('id')).values('count')), Value(0)),
+        )
+
+
 class EFTBatch(models.Model):
     """EFT Batch Header — two-stage approval workflow with OBDX file type support"""
 
@@ -134,6 +175,9 @@ class EFTBatch(models.Model):
     total_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
     record_count = models.IntegerField(default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
+    # Bumped by every workflow transition (transitions.py); a transition only
+    # applies to the version it was decided on
+    version = models.PositiveIntegerField(default=0, editable=False)
     file_reference = models.CharField(max_length=16, blank=True, help_text="RBM File Reference (e.g., WTC01-31.01.2023)")
     
     # OBDX File Type
@@ -169,23 +213,26 @@ class EFTBatch(models.Model):
     generated_file = models.TextField(blank=True)
     generated_at = models.DateTimeField(null=True, blank=True)
 
+    objects = EFTBatchQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on (created_at, id), optionally scoped by status or owner
+            models.Index(fields=['created_at', 'id'], name='eftbatch_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='eftbatch_status_created_idx'),
+            models.Index(fields=['created_by', 'created_at', 'id'], name='eftbatch_owner_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.batch_reference} - {self.batch_name}"
 
     def save(self, *args, **kwargs):
-        # Generate batch reference if not set
-        if not self.batch_reference:
-            now = timezone.now()
-            self.batch_reference = f"CRWB-{now.strftime('%Y%m%d-%H%M%S')}"
-        
-        # Generate file reference if not set
-        if not self.file_reference:
-            now = timezone.now()
-            self.file_reference = f"CRWB-{now.strftime('%d.%m.%Y')}"
-        
+        # Number the batch from the day's counter if either reference is missing
+        if not self.batch_reference or not self.file_reference:
+            from .references import assign  # references.py imports this module
+            assign([self])
+
         super().save(*args, **kwargs)
 
     def update_totals(self):
@@ -198,6 +245,9 @@ class EFTBatch(models.Model):
         self.save(update_fields=['total_amount', 'record_count', 'updated_at'])
         return self.total_amount, self.record_count
 
+    # ArchivedEFTBatch sets this to True; lets shared views and templates tell them apart
+    is_archived = False
+
     @property
     def can_fm_review(self):
         return self.status == 'PENDING_FM'
@@ -247,6 +297,18 @@ class EFTBatch(models.Model):
         return f"{filename}.{extension}"
 
 
+class EFTTransactionQuerySet(models.QuerySet):
+
+    def breakdown_by_scheme(self):
+        """One row per scheme: scheme code/name, line_count and line_total."""
+        return (
+            self.order_by()
+            .values('scheme_id', 'scheme__scheme_code', 'scheme__scheme_name')
+            .annotate(line_count=Count('id'), line_total=Sum('amount'))
+            .order_by('scheme__scheme_code')
+        )
+
+
 class EFTTransaction(models.Model):
     """Individual EFT Transaction — RBM Compliant (17-field body record)"""
     batch = models.ForeignKey(EFTBatch, on_delete=models.CASCADE, related_name='transactions')
@@ -271,9 +333,15 @@ class EFTTransaction(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = EFTTransactionQuerySet.as_manager()
+
     class Meta:
         ordering = ['sequence_number']
         unique_together = ['batch', 'sequence_number']
+        indexes = [
+            # Supplier payment history, newest first
+            models.Index(fields=['supplier', 'created_at', 'id'], name='efttxn_supplier_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.batch.batch_reference}-{self.sequence_number}"
@@ -304,15 +372,315 @@ class ApprovalAuditLog(models.Model):
         ('EXPORTED', 'Exported to RBM'),
     ]
 
-    batch = models.ForeignKey(EFTBatch, on_delete=models.CASCADE, related_name='audit_logs')
+    batch = models.ForeignKey(EFTBatch, on_delete=models.PROTECT, related_name='audit_logs')
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
     user = models.ForeignKey(User, on_delete=models.PROTECT, related_name='audit_logs')
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set by the writer before hashing, so not auto_now_add
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     remarks = models.TextField(blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
+    # Tamper-evident chain (see audit.py): entry_hash = SHA-256(prev_hash + row)
+    prev_hash = models.CharField(max_length=64, blank=True, editable=False)
+    entry_hash = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
+
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['batch', 'timestamp', 'id'], name='auditlog_batch_ts_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.batch.batch_reference} - {self.action}"
\ No newline at end of file
+        return f"{self.batch.batch_reference} - {self.action}"
+
+
+class SupplierPaymentStats(models.Model):
+    """
+    Running payment totals per supplier, counted when a batch is APPROVED
+    (exporting it later does not count it again). Maintained by stats.py;
+    ``manage.py rebuild_supplier_stats`` recomputes it from live and archived
+    transactions. The last batch is kept by id/reference, not as a foreign
+    key, so archiving it does not lose the link.
+    """
+    supplier = models.OneToOneField(Supplier, on_delete=models.CASCADE, primary_key=True, related_name='payment_stats')
+    payment_count = models.PositiveIntegerField(default=0)
+    lifetime_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    last_paid_at = models.DateTimeField(null=True, blank=True)
+    last_batch_id = models.BigIntegerField(null=True, blank=True)
+    last_batch_reference = models.CharField(max_length=50, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Supplier payment stats'
+
+    def __str__(self):
+        return f"{self.supplier_id}: {self.payment_count} payments"
+
+
+class SpendRollup(models.Model):
+    """
+    Approved spend per day × zone × scheme × cost centre × file type.
+    Filled incrementally on approval and rebuilt by
+    ``manage.py rebuild_spend_rollups`` (see analytics.py).
+    """
+    day = models.DateField()
+    zone = models.ForeignKey(Zone, on_delete=models.PROTECT, related_name='+')
+    scheme = models.ForeignKey(Scheme, on_delete=models.PROTECT, related_name='+')
+    cost_center = models.CharField(max_length=50, blank=True)
+    file_type = models.CharField(max_length=10, choices=EFTBatch.FILE_TYPE_CHOICES)
+    line_count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['day', 'zone', 'scheme', 'cost_center', 'file_type']
+        indexes = [
+            models.Index(fields=['day'], name='spendrollup_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.zone_id}/{self.scheme_id}/{self.cost_center}/{self.file_type}: {self.amount}"
+
+
+class DailyMetric(models.Model):
+    """
+    One row per day of workflow activity for dashboard trends. Counters are
+    incremented as batches are created and change status; the nightly
+    ``manage.py record_daily_metrics`` recomputes recent days exactly and
+    fills active_users (see analytics.py).
+    """
+    day = models.DateField(unique=True)
+    batches_created = models.PositiveIntegerField(default=0)
+    batches_submitted = models.PositiveIntegerField(default=0)
+    batches_approved = models.PositiveIntegerField(default=0)
+    batches_rejected = models.PositiveIntegerField(default=0)
+    batches_exported = models.PositiveIntegerField(default=0)
+    amount_submitted = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    amount_approved = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    amount_exported = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    active_users = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['day']
+
+    def __str__(self):
+        return f"Metrics for {self.day}"
+
+
+class AuditChainHead(models.Model):
+    """
+    Single row holding the tip of the audit hash chain. Writers lock it with
+    select_for_update() so appends are serialised and ids follow chain order.
+    """
+    last_id = models.BigIntegerField(null=True, blank=True)
+    last_hash = models.CharField(max_length=64, blank=True)
+    entry_count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Audit chain head: {self.entry_count} entries"
+
+
+class AuditCheckpoint(models.Model):
+    """Periodic chain position; verification resumes from the last verified one."""
+    log_id = models.BigIntegerField(unique=True)
+    entry_hash = models.CharField(max_length=64)
+    entry_count = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    verified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-log_id']
+
+    def __str__(self):
+        return f"Checkpoint at log {self.log_id}"
+
+
+class ReferenceCounter(models.Model):
+    """
+    Last batch number handed out on a day (see references.py). Allocation
+    increments it with one UPDATE, so concurrent creators get distinct,
+    increasing numbers.
+    """
+    day = models.DateField(unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+
+class SearchToken(models.Model):
+    """
+    Inverted index for list-page search (see search.py).
+
+    One row per (object, token); lookups are prefix range scans on
+    (kind, token) instead of LIKE '%…%' table scans.
+    """
+    KIND_CHOICES = [
+        ('supplier', 'Supplier'),
+        ('batch', 'EFT Batch'),
+        ('transaction', 'EFT Transaction'),
+    ]
+
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        unique_together = ['kind', 'object_id', 'token']
+        indexes = [
+            models.Index(fields=['kind', 'token'], name='searchtoken_kind_token_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.token}"
+
+
+class BackgroundJob(models.Model):
+    """
+    A unit of work run outside the request by ``manage.py run_jobs`` (see
+    jobs.py). Workers claim QUEUED rows whose run_after has passed, lowest
+    priority number first, with a conditional UPDATE, and refresh
+    heartbeat_at while the job runs.
+    """
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    queue = models.CharField(max_length=30, default='default')
+    priority = models.SmallIntegerField(default=100)
+    kwargs = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    timeout = models.PositiveIntegerField(default=600)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    worker = models.CharField(max_length=100, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'queue', 'priority', 'run_after'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} {self.name} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('SUCCEEDED', 'FAILED')
+
+
+# ================ ARCHIVE TIER ================
+#
+# Batches exported more than EFT_ARCHIVE_AFTER_MONTHS ago are moved here with
+# their transactions and audit logs by ``manage.py archive_batches`` (see
+# archive.py). Rows keep their original ids, so /batches/<id>/view/ and other
+# references stay valid; live list queries and indexes only see current work.
+
+class ArchivedEFTBatch(models.Model):
+    """Read-only copy of an exported EFTBatch."""
+    id = models.BigIntegerField(primary_key=True)
+    batch_name = models.CharField(max_length=100)
+    batch_reference = models.CharField(max_length=50, unique=True)
+    currency = models.CharField(max_length=3, default='MWK')
+    total_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    record_count = models.IntegerField(default=0)
+    status = models.CharField(max_length=20, choices=EFTBatch.STATUS_CHOICES)
+    file_reference = models.CharField(max_length=16, blank=True)
+    file_type = models.CharField(max_length=10, choices=EFTBatch.FILE_TYPE_CHOICES)
+
+    debit_account = models.ForeignKey(DebitAccount, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    created_by = models.ForeignKey(User, on_delete=models.PROTECT, related_name='+')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    fm_reviewed_by = models.ForeignKey(User, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    fm_reviewed_at = models.DateTimeField(null=True, blank=True)
+    fm_remarks = models.TextField(blank=True)
+
+    approved_by = models.ForeignKey(User, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    approved_at = models.DateTimeField(null=True, blank=True)
+    remarks = models.TextField(blank=True)
+    rejection_reason = models.TextField(blank=True)
+
+    generated_file = models.TextField(blank=True)
+    generated_at = models.DateTimeField(null=True, blank=True)
+
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    is_archived = True
+    can_fm_review = False
+    can_director_approve = False
+
+    class Meta:
+        ordering = ['-created_at']
+
+    __str__ = EFTBatch.__str__
+    get_party_id = EFTBatch.get_party_id
+    get_obdx_filename = EFTBatch.get_obdx_filename
+
+
+class ArchivedEFTTransaction(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    batch = models.ForeignKey(ArchivedEFTBatch, on_delete=models.CASCADE, related_name='transactions')
+    sequence_number = models.CharField(max_length=4)
+
+    debit_account = models.ForeignKey(DebitAccount, on_delete=models.PROTECT, related_name='+')
+    supplier = models.ForeignKey(Supplier, on_delete=models.PROTECT, related_name='+')
+    scheme = models.ForeignKey(Scheme, on_delete=models.PROTECT, related_name='+')
+    zone = models.ForeignKey(Zone, on_delete=models.PROTECT, related_name='+')
+
+    amount = models.DecimalField(max_digits=20, decimal_places=2)
+    narration = models.CharField(max_length=200)
+    reference_number = models.CharField(max_length=16)
+    source_reference = models.CharField(max_length=18)
+    employee_number = models.CharField(max_length=6, blank=True)
+    national_id = models.CharField(max_length=8, blank=True)
+    cost_center = models.CharField(max_length=50, blank=True)
+
+    created_at = models.DateTimeField()
+
+    # Same projections as live lines, so shared views work on either
+    objects = EFTTransactionQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['sequence_number']
+        unique_together = ['batch', 'sequence_number']
+
+    __str__ = EFTTransaction.__str__
+
+
+class ArchivedAuditLog(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    batch = models.ForeignKey(ArchivedEFTBatch, on_delete=models.CASCADE, related_name='audit_logs')
+    action = models.CharField(max_length=20, choices=ApprovalAuditLog.ACTION_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.PROTECT, related_name='+')
+    timestamp = models.DateTimeField()
+    remarks = models.TextField(blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    prev_hash = models.CharField(max_length=64, blank=True)
+    entry_hash = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['batch', 'timestamp', 'id'], name='archlog_batch_ts_idx'),
+        ]
+
+    __str__ = ApprovalAuditLog.__str__
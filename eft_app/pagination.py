@@ -0,0 +1,131 @@
+"""
+pagination.py — Keyset (cursor) pagination for CRWB EFT System.
+
+Django's Paginator pages with OFFSET, so page N scans and discards N × per_page
+rows, and it always issues a COUNT(*). KeysetPaginator instead filters on the
+ordering columns of the last row seen, e.g. for ('-created_at', '-id'):
+
+    WHERE created_at < :c OR (created_at = :c AND id < :i)
+    ORDER BY created_at DESC, id DESC LIMIT per_page + 1
+
+which an index on (created_at, id) answers in the same time for every page.
+Ordering fields must be NOT NULL and the last one must be unique (use 'id').
+
+The total is only counted if something reads ``page.total_count``.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    """One page of results; iterable like a list, with cursors for neighbours."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1], 'next')
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0], 'prev')
+        return None
+
+    @cached_property
+    def total_count(self):
+        """COUNT(*) over the whole result set — only runs when accessed."""
+        return self.paginator.queryset.count()
+
+
+class KeysetPaginator:
+
+    def __init__(self, queryset, per_page=20, ordering=('-created_at', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [f.lstrip('-') for f in self.ordering]
+        self.descending = [f.startswith('-') for f in self.ordering]
+
+    # ---- cursors ----
+
+    def encode_cursor(self, obj, direction):
+        values = [getattr(obj, field) for field in self.fields]
+        payload = json.dumps({'d': direction, 'v': values}, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, raw = payload['d'], payload['v']
+            if direction not in ('next', 'prev') or len(raw) != len(self.fields):
+                raise ValueError(cursor)
+            model = self.queryset.model
+            values = [model._meta.get_field(f).to_python(v) for f, v in zip(self.fields, raw)]
+        except Exception as e:
+            raise InvalidCursor(str(e))
+        return direction, values
+
+    # ---- paging ----
+
+    def _after(self, values, reverse=False):
+        """Q for rows strictly after ``values`` in the ordering (before, if reverse)."""
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            descending = self.descending[i] != reverse
+            step = Q(**{f'{field}__{"lt" if descending else "gt"}': values[i]})
+            for prev_field, prev_value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{prev_field: prev_value})
+            condition |= step
+        return condition
+
+    def page(self, cursor=None):
+        """Return the page following/preceding ``cursor``; a bad cursor gives page one."""
+        direction, values = 'next', None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = 'next', None
+
+        if direction == 'prev':
+            reversed_ordering = [f[1:] if f.startswith('-') else f'-{f}' for f in self.ordering]
+            qs = self.queryset.filter(self._after(values, reverse=True)).order_by(*reversed_ordering)
+            rows = list(qs[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return KeysetPage(rows, self, has_next=True, has_previous=has_previous)
+
+        qs = self.queryset.order_by(*self.ordering)
+        if values is not None:
+            qs = qs.filter(self._after(values))
+        rows = list(qs[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return KeysetPage(rows[:self.per_page], self, has_next=has_next, has_previous=values is not None)
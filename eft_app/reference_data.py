@@ -0,0 +1,200 @@
+"""
+reference_data.py — Versioned in-process snapshots of master data.
+
+Banks, zones, schemes, suppliers and debit accounts change rarely but are
+read on every transaction form, supplier/scheme lookup and file export.
+snapshot() keeps all five tables in process memory as immutable rows
+(namedtuples of the concrete fields plus ``label``, the model's str()),
+tagged with a version stamp held in the shared Django cache.
+
+Every save or delete of one of these models bumps the stamp (post_save /
+post_delete receivers below); views that change rows with
+QuerySet.update() call bump() themselves. The stamp is bumped immediately,
+so the writing process sees its change at once, and again on commit, so no
+worker keeps a snapshot built from rows read before the commit. Each worker
+compares its snapshot's version with the shared stamp on access and
+rebuilds when they differ. With a per-process cache (locmem) a bump only
+reaches the worker that made it, so snapshots are also rebuilt once they
+are settings.EFT_REFDATA_MAX_AGE seconds old; configure a shared cache in
+production.
+
+The a-prefixed functions are the same lookups for async views: the stamp is
+read with the async cache API and rows missing from the snapshot with the
+async ORM, so a lookup served from memory never leaves the event loop.
+"""
+import threading
+import time
+import uuid
+from collections import namedtuple
+from types import MappingProxyType
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Bank, DebitAccount, Scheme, Supplier, Zone
+
+VERSION_KEY = 'eft:refdata:version'
+DEFAULT_MAX_AGE = 300
+
+MODELS = {
+    'banks': Bank,
+    'zones': Zone,
+    'schemes': Scheme,
+    'suppliers': Supplier,
+    'debit_accounts': DebitAccount,
+}
+
+_lock = threading.Lock()
+_current = None
+
+
+class Table:
+    """The rows of one model, by primary key, in the model's default ordering."""
+
+    def __init__(self, model, rows):
+        self.model = model
+        self.rows = MappingProxyType({row.id: row for row in rows})
+        self._indexes = {}
+
+    def get(self, pk):
+        try:
+            return self.rows.get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+    def find(self, field, value):
+        """The row whose ``field`` equals ``value`` (for unique fields such as codes)."""
+        index = self._indexes.get(field)
+        if index is None:
+            index = self._indexes[field] = {getattr(row, field): row for row in self.rows.values()}
+        return index.get(value)
+
+    def active(self):
+        return [row for row in self.rows.values() if row.is_active]
+
+    def choices(self):
+        return [(row.id, row.label) for row in self.active()]
+
+    def instance(self, row):
+        """A model instance built from ``row`` without a query (e.g. to assign to a ForeignKey)."""
+        obj = self.model(**{name: value for name, value in row._asdict().items() if name != 'label'})
+        obj._state.adding = False
+        obj._state.db = 'default'
+        return obj
+
+
+class Snapshot:
+    def __init__(self, version, tables):
+        self.version = version
+        self.tables = MappingProxyType(tables)
+        self.built_at = time.monotonic()
+
+    def is_current(self, stamp):
+        max_age = getattr(settings, 'EFT_REFDATA_MAX_AGE', DEFAULT_MAX_AGE)
+        return self.version == stamp and time.monotonic() - self.built_at < max_age
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+
+_row_types = {}
+
+
+def _row(obj):
+    """The immutable row for a model instance."""
+    model = type(obj)
+    if model not in _row_types:
+        fields = [f.attname for f in model._meta.concrete_fields]
+        _row_types[model] = namedtuple(f'{model.__name__}Row', fields + ['label'])
+    row_type = _row_types[model]
+    return row_type(*(getattr(obj, f) for f in row_type._fields[:-1]), str(obj))
+
+
+def _build(version):
+    return Snapshot(version, {
+        name: Table(model, [_row(obj) for obj in model.objects.all()]) for name, model in MODELS.items()
+    })
+
+
+def version():
+    """The shared version stamp, created on first use (or after eviction)."""
+    stamp = cache.get(VERSION_KEY)
+    if stamp is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        stamp = cache.get(VERSION_KEY)
+    return stamp
+
+
+def snapshot():
+    """The current snapshot, rebuilt if another write has bumped the version."""
+    global _current
+    stamp = version()
+    current = _current
+    if current is not None and current.is_current(stamp):
+        return current
+    with _lock:
+        if _current is None or not _current.is_current(stamp):
+            _current = _build(stamp)
+        return _current
+
+
+def table(name):
+    return snapshot()[name]
+
+
+def get(name, pk):
+    """A row by primary key; falls back to the database for rows newer than the snapshot."""
+    row = table(name).get(pk)
+    if row is None and str(pk).isdigit():
+        obj = MODELS[name].objects.filter(pk=pk).first()
+        if obj is not None:
+            row = _row(obj)
+    return row
+
+
+async def aversion():
+    stamp = await cache.aget(VERSION_KEY)
+    if stamp is None:
+        await cache.aadd(VERSION_KEY, uuid.uuid4().hex, None)
+        stamp = await cache.aget(VERSION_KEY)
+    return stamp
+
+
+async def asnapshot():
+    current = _current
+    if current is not None and current.is_current(await aversion()):
+        return current
+    return await sync_to_async(snapshot)()
+
+
+async def atable(name):
+    return (await asnapshot())[name]
+
+
+async def aget(name, pk):
+    row = (await atable(name)).get(pk)
+    if row is None and str(pk).isdigit():
+        obj = await MODELS[name].objects.filter(pk=pk).afirst()
+        if obj is not None:
+            row = _row(obj)
+    return row
+
+
+def bump():
+    """Invalidate every worker's snapshot, now and again once the transaction commits."""
+    def _bump():
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def _changed(sender, **kwargs):
+    bump()
+
+
+for _model in MODELS.values():
+    post_save.connect(_changed, sender=_model, dispatch_uid=f'refdata_save_{_model.__name__}')
+    post_delete.connect(_changed, sender=_model, dispatch_uid=f'refdata_delete_{_model.__name__}')
@@ -0,0 +1,72 @@
+"""
+references.py — Per-day batch numbers for batch_reference and file_reference.
+
+    ref = references.allocate()
+    ref.batch_reference   # 'CRWB-20261019-000042'
+    ref.file_reference    # 'CRWB-191026-0042'  (16 chars, the RBM maximum)
+
+    references.assign(batches)          # before EFTBatch.objects.bulk_create(batches)
+
+Every batch gets the next number of the (local) day from its
+ReferenceCounter row. reserve() increments the row with a single
+UPDATE ... SET last_value = last_value + n and reads back the new value in
+the same transaction. The row lock makes concurrent creators (two clerks,
+a clone, an import) queue behind each other, and each one gets its own
+block of numbers. References are therefore unique and increase through the
+day with no reliance on the clock's resolution. The lock is held until the
+creating transaction commits; a rolled-back creation gives its numbers
+back. Bulk creators reserve a whole block with one UPDATE.
+
+The file reference carries four digits of the number, so a day has at
+most 9999 references; reserve() refuses to go past that.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ReferenceCounter
+
+PREFIX = 'CRWB'
+MAX_PER_DAY = 9999
+
+Reference = namedtuple('Reference', 'day number batch_reference file_reference')
+
+
+def format_reference(day, number):
+    return Reference(
+        day, number,
+        f"{PREFIX}-{day:%Y%m%d}-{number:06d}",
+        f"{PREFIX}-{day:%d%m%y}-{number:04d}",
+    )
+
+
+def reserve(count, day=None):
+    """Reserve the next ``count`` numbers of ``day`` (default today); returns their References."""
+    if count < 1:
+        return []
+    day = day or timezone.localdate()
+    with transaction.atomic():
+        ReferenceCounter.objects.bulk_create([ReferenceCounter(day=day)], ignore_conflicts=True)
+        counter = ReferenceCounter.objects.filter(day=day)
+        counter.update(last_value=F('last_value') + count)
+        last = counter.values_list('last_value', flat=True).get()
+        if last > MAX_PER_DAY:
+            # Raising rolls the increment back with the rest of the block
+            raise ValueError(f"No batch references left for {day:%d.%m.%Y} (limit {MAX_PER_DAY} per day)")
+    return [format_reference(day, number) for number in range(last - count + 1, last + 1)]
+
+
+def allocate(day=None):
+    """The next reference of ``day`` (default today)."""
+    return reserve(1, day)[0]
+
+
+def assign(batches, day=None):
+    """Fill in missing batch/file references on unsaved ``batches`` from one reserved block."""
+    missing = [batch for batch in batches if not batch.batch_reference or not batch.file_reference]
+    for batch, reference in zip(missing, reserve(len(missing), day)):
+        batch.batch_reference = batch.batch_reference or reference.batch_reference
+        batch.file_reference = batch.file_reference or reference.file_reference
+    return batches
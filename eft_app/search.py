@@ -0,0 +1,246 @@
+"""
+search.py — Indexed search for suppliers, batches and transactions.
+
+List pages used to search with ``icontains`` across several columns, which is
+a LIKE '%term%' scan of the whole table on every request. Instead each
+searchable object is broken into tokens stored in SearchToken:
+
+  - names are split into lower-case words, e.g. "Lilongwe Hardware" ->
+    "lilongwe", "hardware"
+  - codes and account numbers are also stored as their suffixes, so that a
+    fragment such as "6161" still finds account "0013006161228"
+
+A query term matches any token it is a prefix of, which is an index range
+scan on (kind, token). Every term must match; results are ranked by the sum
+of the matched token weights (codes > names > secondary fields). Callers
+pass the rows a page is already limited to (``within``) so that the result
+cap applies after their owner/status filters, not before.
+
+The index is kept current by the post_save/pre_delete receivers below and can
+be rebuilt from scratch with ``manage.py rebuild_search_index``; migration
+0018 fills it for rows that existed before it did.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import EFTBatch, EFTTransaction, SearchToken, Supplier
+
+WORD_RE = re.compile(r'\w+')
+MAX_TOKEN_LENGTH = 64
+MIN_TERM_LENGTH = 2
+MIN_SUFFIX_LENGTH = 3
+MAX_TERMS = 6
+RESULT_LIMIT = 1000
+
+# Token weights used for ranking
+WEIGHT_CODE = 3
+WEIGHT_NAME = 2
+WEIGHT_OTHER = 1
+
+
+def words(text):
+    """Lower-case word tokens of ``text``."""
+    return [w[:MAX_TOKEN_LENGTH] for w in WORD_RE.findall(str(text or '').lower())]
+
+
+def code_tokens(text):
+    """Word tokens plus every suffix (>= MIN_SUFFIX_LENGTH) of the compacted code."""
+    tokens = words(text)
+    compact = ''.join(tokens)[:MAX_TOKEN_LENGTH]
+    tokens.extend(compact[i:] for i in range(len(compact) - MIN_SUFFIX_LENGTH + 1))
+    return tokens
+
+
+def query_terms(query):
+    """Distinct search terms of a user query, short fragments dropped."""
+    terms = []
+    for word in words(query):
+        if len(word) >= MIN_TERM_LENGTH and word not in terms:
+            terms.append(word)
+    return terms[:MAX_TERMS]
+
+
+# ---- what gets indexed ----
+
+def supplier_tokens(supplier):
+    return [
+        (code_tokens(supplier.supplier_code), WEIGHT_CODE),
+        (code_tokens(supplier.account_number), WEIGHT_CODE),
+        (words(supplier.supplier_name), WEIGHT_NAME),
+        (words(supplier.account_name), WEIGHT_OTHER),
+    ]
+
+
+def batch_tokens(batch):
+    return [
+        (code_tokens(batch.batch_reference), WEIGHT_CODE),
+        (words(batch.batch_name), WEIGHT_NAME),
+    ]
+
+
+def transaction_tokens(txn):
+    return [
+        (words(txn.reference_number), WEIGHT_CODE),
+        (words(txn.source_reference), WEIGHT_NAME),
+    ]
+
+
+INDEXED = {
+    'supplier': (Supplier, supplier_tokens, ('supplier_code', 'account_number', 'supplier_name', 'account_name')),
+    'batch': (EFTBatch, batch_tokens, ('batch_reference', 'batch_name')),
+    'transaction': (EFTTransaction, transaction_tokens, ('reference_number', 'source_reference')),
+}
+
+
+def token_weights(kind, obj):
+    """{token: weight} for one object; duplicate tokens keep the highest weight."""
+    weights = {}
+    for tokens, weight in INDEXED[kind][1](obj):
+        for token in tokens:
+            if token and weights.get(token, 0) < weight:
+                weights[token] = weight
+    return weights
+
+
+def build_tokens(kind, obj):
+    """SearchToken rows (unsaved) for one object."""
+    return [
+        SearchToken(kind=kind, object_id=obj.pk, token=token, weight=weight)
+        for token, weight in token_weights(kind, obj).items()
+    ]
+
+
+def index_object(kind, obj):
+    with transaction.atomic():
+        SearchToken.objects.filter(kind=kind, object_id=obj.pk).delete()
+        SearchToken.objects.bulk_create(build_tokens(kind, obj))
+
+
+def unindex(kind, object_ids):
+    SearchToken.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def rebuild(kind, chunk_size=2000):
+    """Drop and rebuild the tokens of one kind; returns the number of objects indexed."""
+    model, _, fields = INDEXED[kind]
+    SearchToken.objects.filter(kind=kind).delete()
+    indexed = 0
+    rows = []
+    for obj in model.objects.only('pk', *fields).iterator(chunk_size=chunk_size):
+        rows.extend(build_tokens(kind, obj))
+        indexed += 1
+        if len(rows) >= chunk_size:
+            SearchToken.objects.bulk_create(rows)
+            rows = []
+    SearchToken.objects.bulk_create(rows)
+    return indexed
+
+
+# ---- querying ----
+
+def _prefix_q(term):
+    # An explicit range rather than startswith: tokens are lower-case, so it
+    # matches the same rows, and it stays an index range scan on every
+    # backend (SQLite ignores the index for LIKE without case_sensitive_like,
+    # MySQL turns startswith into LIKE BINARY).
+    upper = term[:-1] + chr(ord(term[-1]) + 1)
+    return Q(token__gte=term, token__lt=upper)
+
+
+def ranked_ids(kind, query, limit=RESULT_LIMIT, within=None):
+    """
+    Object ids of ``kind`` matching every term of ``query``, best first.
+
+    ``within`` (a queryset of the indexed model) restricts the match to those
+    rows before ``limit`` is applied. Returns None when the query has no
+    usable terms (e.g. a single character), so callers can fall back to their
+    unindexed filter.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    term_qs = [_prefix_q(term) for term in terms]
+    matched = reduce(lambda a, b: a + b, [
+        Max(Case(When(q, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for q in term_qs
+    ])
+    tokens = SearchToken.objects.filter(kind=kind)
+    if within is not None:
+        tokens = tokens.filter(object_id__in=within.values('pk'))
+    rows = (
+        tokens
+        .filter(reduce(or_, term_qs))
+        .values('object_id')
+        .annotate(matched=matched, score=Sum('weight'))
+        .filter(matched=len(terms))
+        .order_by('-score', '-object_id')
+        .values_list('object_id', flat=True)
+    )
+    return list(rows[:limit])
+
+
+def rank_ordering(ids, field='pk'):
+    """Order expression that sorts rows in the order of ``ids``."""
+    return Case(
+        *[When(**{field: pk}, then=Value(position)) for position, pk in enumerate(ids)],
+        default=Value(len(ids)),
+        output_field=IntegerField(),
+    )
+
+
+def batch_ids(query, within=None):
+    """Batches matching by reference/name, or containing a matching transaction."""
+    ids = ranked_ids('batch', query, within=within)
+    if ids is None:
+        return None
+    lines = None if within is None else EFTTransaction.objects.filter(batch__in=within.values('pk'))
+    txn_ids = ranked_ids('transaction', query, within=lines)
+    if txn_ids:
+        extra = EFTTransaction.objects.filter(pk__in=txn_ids).values_list('batch_id', flat=True).distinct()
+        ids.extend(pk for pk in extra if pk not in ids)
+    return ids
+
+
+# ---- keeping the index current ----
+
+def _changed(kind, update_fields):
+    return update_fields is None or bool(set(update_fields) & set(INDEXED[kind][2]))
+
+
+@receiver(post_save, sender=Supplier)
+def _index_supplier(sender, instance, update_fields=None, raw=False, **kwargs):
+    if not raw and _changed('supplier', update_fields):
+        index_object('supplier', instance)
+
+
+@receiver(post_save, sender=EFTBatch)
+def _index_batch(sender, instance, update_fields=None, raw=False, **kwargs):
+    if not raw and _changed('batch', update_fields):
+        index_object('batch', instance)
+
+
+@receiver(post_save, sender=EFTTransaction)
+def _index_transaction(sender, instance, update_fields=None, raw=False, **kwargs):
+    if not raw and _changed('transaction', update_fields):
+        index_object('transaction', instance)
+
+
+@receiver(pre_delete, sender=Supplier)
+def _unindex_supplier(sender, instance, **kwargs):
+    unindex('supplier', [instance.pk])
+
+
+@receiver(pre_delete, sender=EFTBatch)
+def _unindex_batch(sender, instance, **kwargs):
+    # Transactions go with the batch; drop their tokens in one statement rather
+    # than a receiver per cascaded row. Stale tokens of individually deleted
+    # transactions are harmless (results are re-filtered against live rows)
+    # and are cleared by rebuild_search_index.
+    unindex('transaction', instance.transactions.values('pk'))
+    unindex('batch', [instance.pk])
@@ -0,0 +1,22 @@
+"""
+signals.py — Application signals for CRWB EFT System.
+
+batch_status_changed is sent after a batch moves between workflow states
+(DRAFT → PENDING_FM → PENDING_DIRECTOR → APPROVED → EXPORTED, or → REJECTED).
+Receivers get: batch, old_status, new_status, user.
+"""
+from django.dispatch import Signal
+
+
+batch_status_changed = Signal()
+
+
+def send_status_changed(batch, old_status, user=None):
+    """Notify receivers that ``batch`` left ``old_status`` for its current status."""
+    batch_status_changed.send(
+        sender=batch.__class__,
+        batch=batch,
+        old_status=old_status,
+        new_status=batch.status,
+        user=user,
+    )
@@ -0,0 +1,109 @@
+"""
+stats.py — Denormalised supplier payment statistics.
+
+When a batch is approved, its transactions are grouped by supplier and
+added to SupplierPaymentStats in the same transaction as the status change.
+Supplier pages then read four columns instead of counting and summing every
+transaction the supplier has ever had.
+
+rebuild_supplier_stats() recomputes the table from APPROVED/EXPORTED live
+transactions plus the archive, for backfill or repair.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ArchivedEFTTransaction, EFTTransaction, Supplier, SupplierPaymentStats
+from .signals import batch_status_changed
+
+PAID_STATUSES = ('APPROVED', 'EXPORTED')
+
+
+def record_batch_payments(batch):
+    """Add an approved batch's transactions to its suppliers' stats."""
+    paid_at = batch.approved_at or timezone.now()
+    rows = list(
+        EFTTransaction.objects.filter(batch=batch).order_by()
+        .values('supplier_id').annotate(count=Count('id'), total=Sum('amount'))
+    )
+    if not rows:
+        return
+    supplier_ids = [row['supplier_id'] for row in rows]
+    with transaction.atomic():
+        SupplierPaymentStats.objects.bulk_create(
+            [SupplierPaymentStats(supplier_id=pk) for pk in supplier_ids], ignore_conflicts=True,
+        )
+        for row in rows:
+            SupplierPaymentStats.objects.filter(supplier_id=row['supplier_id']).update(
+                payment_count=F('payment_count') + row['count'],
+                lifetime_amount=F('lifetime_amount') + row['total'],
+            )
+        SupplierPaymentStats.objects.filter(supplier_id__in=supplier_ids).filter(
+            Q(last_paid_at__isnull=True) | Q(last_paid_at__lte=paid_at)
+        ).update(last_paid_at=paid_at, last_batch_id=batch.pk, last_batch_reference=batch.batch_reference)
+
+
+@receiver(batch_status_changed)
+def _count_approved_batch(sender, batch, old_status, new_status, **kwargs):
+    if new_status == 'APPROVED' and old_status not in PAID_STATUSES:
+        record_batch_payments(batch)
+
+
+def rebuild_supplier_stats():
+    """Recompute every supplier's stats from scratch; returns the number of rows written."""
+    totals = {}
+
+    def add(queryset, batch_prefix):
+        rows = (
+            queryset.order_by()
+            .values('supplier_id')
+            .annotate(count=Count('id'), total=Sum('amount'), last=Max(f'{batch_prefix}approved_at'))
+        )
+        for row in rows:
+            entry = totals.setdefault(row['supplier_id'], {'count': 0, 'total': Decimal('0'), 'last': None})
+            entry['count'] += row['count']
+            entry['total'] += row['total'] or 0
+            if row['last'] and (entry['last'] is None or row['last'] > entry['last']):
+                entry['last'] = row['last']
+
+    live = EFTTransaction.objects.filter(batch__status__in=PAID_STATUSES)
+    archived = ArchivedEFTTransaction.objects.filter(batch__status__in=PAID_STATUSES)
+    add(live, 'batch__')
+    add(archived, 'batch__')
+
+    # The batch behind each supplier's latest approval
+    last_batches = {}
+    for queryset in (live, archived):
+        pairs = queryset.order_by().values_list(
+            'supplier_id', 'batch_id', 'batch__batch_reference', 'batch__approved_at'
+        ).distinct()
+        for supplier_id, batch_id, reference, approved_at in pairs:
+            if approved_at is not None and approved_at == totals[supplier_id]['last']:
+                last_batches[supplier_id] = (batch_id, reference)
+
+    stats = [
+        SupplierPaymentStats(
+            supplier_id=supplier_id,
+            payment_count=entry['count'],
+            lifetime_amount=entry['total'],
+            last_paid_at=entry['last'],
+            last_batch_id=last_batches.get(supplier_id, (None, ''))[0],
+            last_batch_reference=last_batches.get(supplier_id, (None, ''))[1],
+        )
+        for supplier_id, entry in totals.items()
+    ]
+    with transaction.atomic():
+        SupplierPaymentStats.objects.all().delete()
+        SupplierPaymentStats.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
+
+
+def supplier_stats(supplier):
+    """The supplier's stats row, or an unsaved empty one."""
+    try:
+        return supplier.payment_stats
+    except Supplier.payment_stats.RelatedObjectDoesNotExist:
+        return SupplierPaymentStats(supplier=supplier)
@@ -1,3 +1,1484 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import types
+from importlib import import_module
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+from copy import deepcopy
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import DatabaseError, connection, router, transaction
+from django.db.models import ProtectedError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, path, reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import (
+    analytics, archive, audit, caching, events, health, jobs, reference_data, references, search, stats, transitions,
+    urls as eft_urls, validation, views,
+)
+from .eft_generator import EFTGenerator
+from .forms import ReferenceChoiceField, ReferenceChoiceIterator
+from .context_processors import PENDING_COUNT_CACHE_KEY, PENDING_STATUSES, get_pending_count
+from .db_routers import PIN_COOKIE, PrimaryPinning, read_from_replica
+from .middleware import PrimaryPinningMiddleware
+from .pagination import KeysetPaginator
+from .models import (
+    Bank, Zone, Scheme, Supplier, DebitAccount,
+    EFTBatch, EFTBatchQuerySet, EFTTransaction, ApprovalAuditLog,
+    ArchivedAuditLog, ArchivedEFTBatch, AuditCheckpoint, BackgroundJob, SearchToken, SpendRollup,
+    DailyMetric, ReferenceCounter, SupplierPaymentStats,
+)
+
+
+# ================ QUERY-COUNT REGRESSION HARNESS ================
+#
+# Every named route in eft_app/urls.py is requested as every role, once on a
+# small dataset (10 transactions per batch, a handful of master rows) and again
+# after the dataset has grown (1,000 transactions per batch, dozens of users,
+# suppliers, zones and batches). A view whose query count grows with the data
+# has an N+1 somewhere; the failure lists the statements that multiplied.
+
+SMALL_TRANSACTIONS = 10
+LARGE_TRANSACTIONS = 1000
+
+# Absolute ceiling per request; override per route name where a view
+# legitimately needs more (e.g. dashboards with many independent counts).
+DEFAULT_QUERY_BUDGET = 30
+QUERY_BUDGETS = {}
+
+ROLES = ('System Admin', 'Accounts Personnel', 'Finance Manager', 'Director of Finance')
+
+# Which seeded batch a batch_id route is exercised against
+ROUTE_BATCH_STATUS = {
+    'edit_batch': 'DRAFT',
+    'submit_batch': 'DRAFT',
+    'delete_batch': 'DRAFT',
+    'add_transaction': 'DRAFT',
+    'delete_transaction': 'DRAFT',
+    'preview_eft_file': 'PENDING_DIRECTOR',
+    'fm_review_batch': 'PENDING_FM',
+    'fm_forward_batch': 'PENDING_FM',
+    'fm_reject_batch': 'PENDING_FM',
+    'director_review_batch': 'PENDING_DIRECTOR',
+    'director_approve_batch': 'PENDING_DIRECTOR',
+    'director_reject_batch': 'PENDING_DIRECTOR',
+    'review_batch': 'PENDING_FM',
+    'approve_batch': 'PENDING_FM',
+    'reject_batch': 'PENDING_FM',
+}
+
+# Extra query strings walked in addition to the bare URL
+ROUTE_QUERY_STRINGS = {
+    'user_list': ['q=user', 'role=Accounts Personnel'],
+    'user_export': ['format=excel'],
+    'bank_export': ['format=excel'],
+    'batch_list': ['status=APPROVED', 'search=CRWB'],
+    'fm_batch_list': ['status=APPROVED'],
+    'director_batch_list': ['status=PENDING_DIRECTOR'],
+    'supplier_list': ['q=Supplier'],
+}
+
+# Routes that are also walked with a POST carrying a valid payload
+ROUTE_POST_DATA = {
+    'fm_forward_batch': {'remarks': 'OK'},
+    'fm_reject_batch': {'rejection_reason': 'Wrong amounts'},
+    'director_approve_batch': {'remarks': 'Approved'},
+    'director_reject_batch': {'rejection_reason': 'Wrong amounts'},
+    'approve_batch': {},
+    'reject_batch': {'rejection_reason': 'Wrong amounts'},
+    'api_enqueue_job': {'days': '2'},
+    'generate_batch_file': {},
+}
+
+# Views render a few templates that are not shipped in this tree. Stand-ins
+# touch the same relations a real page would, so template-side N+1s still show.
+_STAND_IN = (
+    "{% extends 'base.html' %}{% block content %}"
+    "{% for trans in transactions %}{{ trans.supplier.supplier_name }} {{ trans.supplier.bank.swift_code }} "
+    "{{ trans.supplier.account_number }} {{ trans.scheme.scheme_code }} {{ trans.zone.zone_code }} "
+    "{{ trans.debit_account.account_number }} {{ trans.amount }}{% endfor %}"
+    "{% for batch in batches %}{{ batch.batch_reference }} {{ batch.created_by.username }}{% endfor %}"
+    "{% for batch in pending_batches %}{{ batch.batch_reference }} {{ batch.created_by.username }}{% endfor %}"
+    "{% for batch in recent_batches %}{{ batch.batch_reference }} {{ batch.created_by.username }}{% endfor %}"
+    "{% for batch in recent_approvals %}{{ batch.batch_reference }} {{ batch.created_by.username }}{% endfor %}"
+    "{% for log in audit_logs %}{{ log.action }} {{ log.user.username }}{% endfor %}"
+    "{{ batch.created_by.username }} {{ batch.debit_account.account_number }}"
+    "{% endblock %}"
+)
+STAND_IN_TEMPLATES = {
+    name: _STAND_IN for name in (
+        'admin/bank_detail.html', 'admin/scheme_detail.html', 'admin/supplier_detail.html',
+        'admin/zone_detail.html', 'admin/user_detail.html', 'admin/user_confirm_delete.html',
+        'finance_manager/fm_dashboard.html', 'finance_manager/batch_list.html',
+        'finance_manager/review_batch.html',
+        'director/director_dashboard.html', 'director/batch_list.html', 'director/review_batch.html',
+        'shared/view_batch.html', 'shared/preview_eft_file.html',
+    )
+}
+
+
+def _templates_with_stand_ins():
+    templates = deepcopy(settings.TEMPLATES)
+    templates[0]['APP_DIRS'] = False
+    templates[0]['OPTIONS']['loaders'] = [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+        ('django.template.loaders.locmem.Loader', STAND_IN_TEMPLATES),
+    ]
+    return templates
+
+
+def _normalize_sql(sql):
+    """Collapse literals so repeated statements with different ids group together."""
+    sql = re.sub(r"'[^']*'", '?', sql)
+    return re.sub(r'\b\d+\b', '?', sql)
+
+
+class SeededDataMixin:
+    """One user per role, one row of each master table and a batch in every status."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {}
+        for role in ROLES:
+            user = User.objects.create_user(
+                username=role.lower().replace(' ', '_'), password='pw',
+                first_name=role.split()[0], last_name='User', is_staff=(role == 'System Admin'),
+            )
+            user.groups.add(Group.objects.get(name=role))
+            cls.users[role] = user
+        cls.clerk = cls.users['Accounts Personnel']
+
+        cls.bank = Bank.objects.create(bank_name='National Bank', swift_code='NBMAMWM0', created_by=cls.clerk)
+        cls.zone = Zone.objects.create(zone_code='CZ', zone_name='Central Zone')
+        cls.scheme = Scheme.objects.create(
+            scheme_code='LL01', scheme_name='Lilongwe', zone=cls.zone, default_cost_center='03000101'
+        )
+        cls.supplier = Supplier.objects.create(
+            supplier_code='5781900', supplier_name='Supplier 0', bank=cls.bank,
+            account_number='1000000000', account_name='Supplier 0 Ltd', created_by=cls.clerk,
+        )
+        cls.debit_account = DebitAccount.objects.create(
+            account_number='0013006161228', account_name='ORT Account'
+        )
+
+        cls.batches = {}
+        for index, status in enumerate(['DRAFT', 'PENDING_FM', 'PENDING_DIRECTOR', 'APPROVED', 'EXPORTED', 'REJECTED']):
+            batch = EFTBatch.objects.create(
+                batch_name=f'Batch {status}', batch_reference=f'CRWB-TEST-{index:04d}',
+                status=status, created_by=cls.clerk, debit_account=cls.debit_account,
+            )
+            cls._add_transactions(batch, SMALL_TRANSACTIONS)
+            audit.record(batch=batch, action='SUBMITTED', user=cls.clerk)
+            cls.batches[status] = batch
+        cls.job = BackgroundJob.objects.create(name='record_daily_metrics', created_by=cls.clerk)
+
+    @classmethod
+    def _add_transactions(cls, batch, target):
+        start = batch.transactions.count()
+        EFTTransaction.objects.bulk_create([
+            EFTTransaction(
+                batch=batch, sequence_number=str(seq).zfill(4),
+                debit_account=cls.debit_account, supplier=cls.supplier,
+                scheme=cls.scheme, zone=cls.zone, amount=Decimal('100.00'),
+                narration=f'Payment {seq}', reference_number=f'INV{seq}',
+                source_reference=f'SRC{seq}', cost_center='03000101',
+            )
+            for seq in range(start + 1, target + 1)
+        ])
+        batch.update_totals()
+
+
+@override_settings(TEMPLATES=_templates_with_stand_ins(), EFT_REQUEST_METRICS={'ENABLED': False})
+class QueryBudgetTests(SeededDataMixin, TestCase):
+    """Per-view query budgets must not grow with row count."""
+
+    def _grow_dataset(self):
+        for status, batch in self.batches.items():
+            self._add_transactions(batch, LARGE_TRANSACTIONS)
+            for n in range(3):
+                audit.record(batch=batch, action='SUBMITTED', user=self.clerk)
+        for n in range(1, 41):
+            user = User.objects.create_user(username=f'user{n}', password='pw')
+            user.groups.add(Group.objects.get(name=ROLES[n % len(ROLES)]))
+            bank = Bank.objects.create(bank_name=f'Bank {n}', swift_code=f'BANKMW{n:02d}', created_by=user)
+            zone = Zone.objects.create(zone_code=f'Z{n}', zone_name=f'Zone {n}')
+            Scheme.objects.create(scheme_code=f'S{n}', scheme_name=f'Scheme {n}', zone=zone)
+            Supplier.objects.create(
+                supplier_code=f'{n:07d}', supplier_name=f'Supplier {n}', bank=bank,
+                account_number=f'2{n:09d}', account_name=f'Supplier {n} Ltd', created_by=user,
+            )
+            DebitAccount.objects.create(account_number=f'00130{n:08d}', account_name=f'Account {n}')
+        for n in range(30):
+            EFTBatch.objects.create(
+                batch_name=f'Extra {n}', batch_reference=f'CRWB-EXTRA-{n:04d}',
+                status=['PENDING_FM', 'PENDING_DIRECTOR', 'APPROVED', 'EXPORTED', 'REJECTED', 'DRAFT'][n % 6],
+                created_by=self.clerk, debit_account=self.debit_account,
+                fm_reviewed_by=self.users['Finance Manager'], approved_by=self.users['Director of Finance'],
+            )
+
+    def _route_kwargs(self, pattern):
+        name = pattern.name
+        kwargs = {}
+        for key in pattern.pattern.converters:
+            if key == 'batch_id':
+                kwargs[key] = self.batches[ROUTE_BATCH_STATUS.get(name, 'APPROVED')].id
+            elif key == 'transaction_id':
+                kwargs[key] = self.batches['DRAFT'].transactions.order_by('sequence_number').first().id
+            elif key == 'format':
+                kwargs[key] = 'txt'
+            elif key == 'user_id':
+                kwargs[key] = self.clerk.id
+            elif key == 'supplier_id':
+                kwargs[key] = self.supplier.id
+            elif key == 'scheme_id':
+                kwargs[key] = self.scheme.id
+            elif key == 'job_id':
+                kwargs[key] = self.job.id
+            elif key == 'name':
+                kwargs[key] = 'record_daily_metrics'
+            elif key == 'pk':
+                for prefix, obj in (('bank', self.bank), ('zone', self.zone), ('supplier', self.supplier),
+                                    ('scheme', self.scheme), ('debit_account', self.debit_account)):
+                    if name.startswith(prefix):
+                        kwargs[key] = obj.pk
+        return kwargs
+
+    def _requests(self):
+        """Yield (label, method, url, data) for every route, variant and role."""
+        for pattern in eft_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            url = reverse(pattern.name, kwargs=self._route_kwargs(pattern) or None)
+            variants = [('GET', url, None)]
+            variants += [('GET', f'{url}?{qs}', None) for qs in ROUTE_QUERY_STRINGS.get(pattern.name, [])]
+            if pattern.name in ROUTE_POST_DATA:
+                variants.append(('POST', url, ROUTE_POST_DATA[pattern.name]))
+            for method, target, data in variants:
+                yield pattern.name, method, target, data
+
+    def _measure(self):
+        """Run every request as every role; state changes are rolled back."""
+        results = {}
+        for role in ROLES:
+            self.client.force_login(self.users[role])
+            for name, method, url, data in self._requests():
+                cache.clear()
+                # The query log is a bounded deque; once full, captures come back empty
+                connection.queries_log.clear()
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as ctx:
+                        if method == 'POST':
+                            self.client.post(url, data)
+                        else:
+                            self.client.get(url)
+                    transaction.set_rollback(True)
+                results[(role, method, url)] = (name, [q['sql'] for q in ctx.captured_queries])
+        return results
+
+    def test_query_count_does_not_grow_with_rows(self):
+        small = self._measure()
+        self._grow_dataset()
+        large = self._measure()
+
+        failures = []
+        for key, (name, large_sql) in large.items():
+            role, method, url = key
+            small_sql = small[key][1]
+            budget = QUERY_BUDGETS.get(name, DEFAULT_QUERY_BUDGET)
+            problems = []
+            if len(large_sql) > len(small_sql):
+                problems.append(f'grew from {len(small_sql)} to {len(large_sql)} queries')
+            if len(large_sql) > budget:
+                problems.append(f'{len(large_sql)} queries exceeds budget of {budget}')
+            if not problems:
+                continue
+            grown = Counter(map(_normalize_sql, large_sql)) - Counter(map(_normalize_sql, small_sql))
+            offenders = grown.most_common(5) or Counter(map(_normalize_sql, large_sql)).most_common(5)
+            detail = '\n'.join(f'      x{count}  {sql}' for count, sql in ((c, s) for s, c in offenders))
+            failures.append(f'  {method} {url} as {role} [{name}]: {"; ".join(problems)}\n{detail}')
+
+        if failures:
+            self.fail('Query budget regressions:\n' + '\n'.join(failures))
+
+
+# ================ READ-REPLICA ROUTER ================
+#
+# Routing decisions are checked through QuerySet.db, which needs no second
+# database. The end-to-end test runs when the settings define a separate
+# 'replica' database (not a test MIRROR) — locally, two SQLite files or two
+# in-memory SQLite databases are enough.
+
+def _has_separate_replica():
+    replica = settings.DATABASES.get('replica')
+    return bool(replica) and not replica.get('TEST', {}).get('MIRROR')
+
+
+@override_settings(EFT_DB_REPLICA_ALIAS='replica', DATABASE_ROUTERS=['eft_app.db_routers.ReplicaRouter'])
+class ReplicaRouterTests(TransactionTestCase):
+    databases = {'default', 'replica'} if _has_separate_replica() else {'default'}
+
+    def _read_db(self, model=EFTBatch):
+        return model.objects.all().db
+
+    def test_reads_use_primary_outside_replica_views(self):
+        self.assertEqual(self._read_db(), 'default')
+
+    def test_replica_view_reads_use_replica(self):
+        view = read_from_replica(lambda: (self._read_db(), self._read_db(User)))
+        self.assertEqual(view(), ('replica', 'replica'))
+
+    def test_non_replicated_apps_stay_on_primary(self):
+        from django.contrib.sessions.models import Session
+        view = read_from_replica(lambda: self._read_db(Session))
+        self.assertEqual(view(), 'default')
+
+    def test_reads_after_write_use_primary(self):
+        def view():
+            before = self._read_db()
+            router.db_for_write(EFTBatch)
+            return before, self._read_db()
+        request = RequestFactory().get('/')
+        with PrimaryPinning(request):
+            self.assertEqual(read_from_replica(view)(), ('replica', 'default'))
+
+    def test_reads_inside_transaction_use_primary(self):
+        def view():
+            with transaction.atomic():
+                return self._read_db()
+        self.assertEqual(read_from_replica(view)(), 'default')
+
+    def test_pin_cookie_after_post_and_honoured_on_next_request(self):
+        view = read_from_replica(lambda request: HttpResponse(self._read_db()))
+        middleware = PrimaryPinningMiddleware(view)
+        factory = RequestFactory()
+
+        response = middleware(factory.get('/'))
+        self.assertEqual(response.content, b'replica')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        response = middleware(factory.post('/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(middleware(request).content, b'default')
+
+    @skipUnless(_has_separate_replica(), "settings define no separate 'replica' database")
+    def test_replica_view_reads_replica_data(self):
+        # Written in an earlier "request" so this one is not pinned by the write
+        with PrimaryPinning(RequestFactory().post('/')):
+            bank = Bank.objects.create(
+                bank_name='Primary Only Bank', swift_code='PRIMMWMW',
+                created_by=User.objects.create(username='router-test'),
+            )
+
+        def view():
+            return (
+                Bank.objects.filter(pk=bank.pk).exists(),
+                Bank.objects.db_manager('default').filter(pk=bank.pk).exists(),
+            )
+        # Not replicated in tests: the row exists on the primary only
+        self.assertEqual(read_from_replica(view)(), (False, True))
+
+
+# ================ ARCHIVE TIER ================
+
+@override_settings(TEMPLATES=_templates_with_stand_ins(), EFT_REQUEST_METRICS={'ENABLED': False})
+class ArchiveTests(SeededDataMixin, TestCase):
+
+    def test_archived_batch_view(self):
+        batch = self.batches['EXPORTED']
+        self.assertEqual(archive.archive_chunk([batch.id]), (1, SMALL_TRANSACTIONS, 1))
+        self.client.force_login(self.users['Finance Manager'])
+
+        response = self.client.get(reverse('view_batch', args=[batch.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.context['batch'], ArchivedEFTBatch)
+        breakdown = list(response.context['scheme_breakdown'])
+        self.assertEqual(len(breakdown), 1)
+        self.assertEqual(breakdown[0]['line_count'], SMALL_TRANSACTIONS)
+        self.assertEqual(breakdown[0]['line_total'], Decimal('100.00') * SMALL_TRANSACTIONS)
+
+    def _exported_batches(self, count):
+        batches = []
+        for n in range(count):
+            batch = EFTBatch.objects.create(
+                batch_name=f'Old {n}', status='EXPORTED', created_by=self.clerk, debit_account=self.debit_account,
+            )
+            self._add_transactions(batch, 2)
+            audit.record(batch, 'SUBMITTED', self.clerk)
+            audit.record(batch, 'EXPORTED', self.clerk)
+            batches.append(batch)
+        return batches
+
+    def test_archive_batches_moves_exports_older_than_the_cutoff(self):
+        old = self._exported_batches(3)
+        cutoff = timezone.now() + timedelta(minutes=1)
+        recent = self._exported_batches(1)[0]
+        ApprovalAuditLog.objects.filter(batch=recent, action='EXPORTED').update(timestamp=cutoff + timedelta(days=1))
+        self.assertEqual(list(archive.archivable_batches(cutoff)), [b.id for b in old])
+
+        progress = []
+        self.assertEqual(archive.archive_batches(cutoff, chunk_size=2, progress=progress.append), (3, 6, 6))
+        self.assertEqual(progress, [(2, 4, 4), (3, 6, 6)])
+        self.assertFalse(EFTBatch.objects.filter(id__in=[b.id for b in old]).exists())
+        self.assertEqual(ArchivedEFTBatch.objects.count(), 3)
+        self.assertIsInstance(archive.get_batch(old[0].id), ArchivedEFTBatch)
+        self.assertIsInstance(archive.get_batch(recent.id), EFTBatch)
+
+    def test_interrupted_chunk_is_rolled_back_and_resumed(self):
+        old = self._exported_batches(2)
+        cutoff = timezone.now() + timedelta(minutes=1)
+        with mock.patch.object(ArchivedAuditLog.objects, 'bulk_create', side_effect=DatabaseError('lost connection')):
+            with self.assertRaises(DatabaseError):
+                archive.archive_batches(cutoff)
+        self.assertEqual(EFTBatch.objects.filter(id__in=[b.id for b in old]).count(), 2)
+        self.assertEqual(ArchivedEFTBatch.objects.count(), 0)
+
+        self.assertEqual(archive.archive_batches(cutoff, limit=1), (1, 2, 2))
+        self.assertEqual(archive.archive_batches(cutoff), (1, 2, 2))
+        self.assertEqual(archive.archive_batches(cutoff), (0, 0, 0))
+        # Archived logs stay in the hash chain
+        self.assertEqual(audit.verify_chain(full=True)[1], [])
+
+
+# ================ REQUEST METRICS ================
+
+def _server_timing_queries(response):
+    return int(re.search(r'desc="(\d+) queries"', response['Server-Timing']).group(1))
+
+
+_async_lookup_urls = types.ModuleType('async_lookup_urls')
+_async_lookup_urls.urlpatterns = [
+    path('supplier/<int:supplier_id>/', views.aget_supplier_details),
+]
+
+
+@override_settings(TEMPLATES=_templates_with_stand_ins())
+class RequestMetricsTests(SeededDataMixin, TestCase):
+
+    def _wsgi_query_count(self, name):
+        self.client.force_login(self.clerk)
+        with self.assertLogs('eft_app.requests', 'INFO'):
+            return _server_timing_queries(self.client.get(reverse(name)))
+
+    def test_wsgi_request_counts_queries(self):
+        self.assertGreater(self._wsgi_query_count('batch_list'), 0)
+
+    async def test_asgi_request_counts_queries_run_in_threads(self):
+        # Session, auth and the sync view all run in sync_to_async threads
+        wsgi_count = await sync_to_async(self._wsgi_query_count)('batch_list')
+
+        await self.async_client.aforce_login(self.clerk)
+        with self.assertLogs('eft_app.requests', 'INFO'):
+            response = await self.async_client.get(reverse('batch_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_server_timing_queries(response), wsgi_count)
+
+    @override_settings(ROOT_URLCONF=_async_lookup_urls)
+    async def test_asgi_async_view_counts_async_orm_queries(self):
+        await self.async_client.aforce_login(self.clerk)
+        await cache.aclear()  # the reference-data snapshot is rebuilt from the database
+
+        with self.assertLogs('eft_app.requests', 'INFO'):
+            response = await self.async_client.get(f'/supplier/{self.supplier.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(_server_timing_queries(response), 0)
+
+
+# ================ AUDIT CHAIN ================
+
+class AuditTests(SeededDataMixin, TestCase):
+
+    def _pending_fm_batches(self, count):
+        batches = []
+        for n in range(count):
+            batch = EFTBatch.objects.create(
+                batch_name=f'Bulk {n}', status='PENDING_FM', created_by=self.clerk, debit_account=self.debit_account,
+            )
+            self._add_transactions(batch, 2)
+            batches.append(batch)
+        return batches
+
+    def test_apply_many_writes_audit_rows_with_one_insert(self):
+        batches = self._pending_fm_batches(4)
+        # Forwarded by someone else after the list was loaded
+        EFTBatch.objects.filter(id=batches[1].id).update(status='PENDING_DIRECTOR')
+
+        with CaptureQueriesContext(connection) as ctx:
+            results = transitions.apply_many(batches, 'fm_forward', self.users['Finance Manager'], remarks='Checked')
+
+        self.assertEqual([result.ok for result in results], [True, False, True, True])
+        self.assertEqual(results[1].current_status, 'PENDING_DIRECTOR')
+        inserts = [q['sql'] for q in ctx.captured_queries
+                   if q['sql'].startswith('INSERT INTO "eft_app_approvalauditlog"')]
+        self.assertEqual(len(inserts), 1)
+        logs = ApprovalAuditLog.objects.filter(batch__in=batches, action='FM_REVIEWED')
+        self.assertEqual(sorted(logs.values_list('batch_id', flat=True)), [batches[n].id for n in (0, 2, 3)])
+        self.assertEqual(set(logs.values_list('remarks', flat=True)), {'Checked'})
+        self.assertEqual(
+            set(EFTBatch.objects.filter(id__in=[b.id for b in batches]).values_list('status', flat=True)),
+            {'PENDING_DIRECTOR'},
+        )
+        self.assertEqual(audit.verify_chain(full=True)[1], [])
+
+    def test_entries_chain_onto_the_previous_hash(self):
+        audit.record(self.batches['APPROVED'], 'EXPORTED', self.clerk)
+        logs = list(ApprovalAuditLog.objects.order_by('id'))
+        self.assertEqual(logs[0].prev_hash, '')
+        for prev, log in zip(logs, logs[1:]):
+            self.assertEqual(log.prev_hash, prev.entry_hash)
+            self.assertEqual(log.entry_hash, audit.hash_log(log, log.prev_hash))
+        self.assertEqual(audit.verify_chain(full=True), (len(logs), []))
+
+    def test_modified_and_removed_rows_break_the_chain(self):
+        logs = list(ApprovalAuditLog.objects.order_by('id'))
+        ApprovalAuditLog.objects.filter(pk=logs[1].pk).update(remarks='Edited afterwards')
+        ApprovalAuditLog.objects.filter(pk=logs[3].pk).delete()
+
+        checked, errors = audit.verify_chain(full=True)
+        self.assertEqual(checked, len(logs) - 1)
+        self.assertEqual(
+            [(e.log_id, e.problem.split(' (')[0]) for e in errors],
+            [(logs[1].pk, 'content does not match entry_hash'),
+             (logs[4].pk, 'prev_hash does not match the previous entry')],
+        )
+
+    @override_settings(EFT_AUDIT_CHECKPOINT_INTERVAL=2)
+    def test_verification_resumes_from_the_last_verified_checkpoint(self):
+        for _ in range(4):
+            audit.record(self.batches['APPROVED'], 'EXPORTED', self.clerk)
+        total = ApprovalAuditLog.objects.count()
+        self.assertEqual(audit.verify_chain(), (total, []))
+        newest = AuditCheckpoint.objects.first()
+        self.assertIsNotNone(newest.verified_at)
+
+        audit.record(self.batches['APPROVED'], 'EXPORTED', self.clerk)
+        self.assertEqual(audit.verify_chain(), (1, []))
+
+        # Rows behind a verified checkpoint are only rehashed by a full run
+        ApprovalAuditLog.objects.filter(pk=newest.log_id).update(remarks='Edited afterwards')
+        self.assertEqual(audit.verify_chain()[1], [])
+        self.assertEqual([e.log_id for e in audit.verify_chain(full=True)[1]], [newest.log_id])
+
+    def test_batches_with_audit_history_cannot_be_deleted(self):
+        batch = self.batches['APPROVED']
+        with self.assertRaises(ProtectedError):
+            batch.delete()
+
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_superuser('root', 'root@example.com', 'x')
+        batch_admin = admin.site._registry[EFTBatch]
+        self.assertFalse(batch_admin.has_delete_permission(request, batch))
+        draft = EFTBatch.objects.create(batch_name='Unsent', created_by=self.clerk, debit_account=self.debit_account)
+        self.assertTrue(batch_admin.has_delete_permission(request, draft))
+
+
+# ================ SEARCH INDEX ================
+
+class SearchTests(SeededDataMixin, TestCase):
+
+    def test_tokens(self):
+        self.assertEqual(search.words('Lilongwe Hardware-Ltd'), ['lilongwe', 'hardware', 'ltd'])
+        self.assertIn('6161228', search.code_tokens('0013006161228'))
+        self.assertEqual(search.query_terms('a Supplier supplier 0013'), ['supplier', '0013'])
+
+    def test_every_term_must_prefix_a_token(self):
+        self.assertEqual(search.ranked_ids('supplier', '1000000'), [self.supplier.pk])
+        self.assertEqual(search.ranked_ids('supplier', 'supp 0000'), [self.supplier.pk])
+        self.assertEqual(search.ranked_ids('supplier', 'supp nomatch'), [])
+        self.assertIsNone(search.ranked_ids('supplier', 's'))
+
+    def test_prefix_range_stops_at_the_next_term(self):
+        Supplier.objects.create(
+            supplier_code='5781901', supplier_name='Suppz Traders', bank=self.bank,
+            account_number='1000000001', account_name='Suppz', created_by=self.clerk,
+        )
+        matched = Supplier.objects.filter(pk__in=search.ranked_ids('supplier', 'supp')).count()
+        self.assertEqual(matched, 2)
+        self.assertEqual(search.ranked_ids('supplier', 'suppz'), [Supplier.objects.get(supplier_code='5781901').pk])
+        self.assertEqual(search.ranked_ids('supplier', 'suppy'), [])
+
+    def test_limit_applies_after_the_callers_filters(self):
+        other = self.users['Finance Manager']
+        for n in range(3):
+            # Code matches outrank the clerk's name match
+            EFTBatch.objects.create(batch_name='Misc', batch_reference=f'PAYROLL-{n}', created_by=other)
+        own = EFTBatch.objects.create(batch_name='Payroll October', created_by=self.clerk)
+
+        self.assertNotIn(own.pk, search.ranked_ids('batch', 'payroll', limit=2))
+        mine = EFTBatch.objects.filter(created_by=self.clerk)
+        self.assertEqual(search.batch_ids('payroll', within=mine), [own.pk])
+
+        self.client.force_login(self.clerk)
+        with override_settings(TEMPLATES=_templates_with_stand_ins(), EFT_REQUEST_METRICS={'ENABLED': False}):
+            response = self.client.get(reverse('batch_list'), {'search': 'payroll'})
+        self.assertEqual([b.pk for b in response.context['batches']], [own.pk])
+
+    def test_backfill_indexes_rows_created_before_the_index(self):
+        SearchToken.objects.all().delete()
+        backfill = import_module('eft_app.migrations.0018_backfill_search_tokens')
+        backfill.index_existing_rows(django_apps, None)
+        self.assertEqual(search.ranked_ids('supplier', 'supplier'), [self.supplier.pk])
+        self.assertEqual(search.ranked_ids('batch', 'crwb-test-0003'), [self.batches['APPROVED'].pk])
+
+
+# ================ EFT FILE GENERATION ================
+
+class EFTGeneratorTests(SeededDataMixin, TestCase):
+
+    def test_file_uses_current_bank_details_not_the_snapshot(self):
+        reference_data.snapshot()
+        # QuerySet.update() sends no signal, so the snapshot still has the old code
+        Bank.objects.filter(pk=self.bank.pk).update(swift_code='NBMAMWM1')
+        self.assertEqual(reference_data.get('banks', self.bank.pk).swift_code, 'NBMAMWM0')
+
+        batch = self.batches['APPROVED']
+        # Validation lines, the joined transactions and the save
+        with self.assertNumQueries(3):
+            content = EFTGenerator.generate_eft_file(batch)
+
+        header, *body = content.splitlines()
+        self.assertEqual(header, f'0;{batch.file_reference};MWK;1000.00;0010')
+        self.assertEqual(len(body), SMALL_TRANSACTIONS)
+        self.assertEqual({line.split(';')[11] for line in body}, {'NBMAMWM1'})
+
+    def test_validation_checks_current_bank_details_not_the_snapshot(self):
+        reference_data.snapshot()
+        Bank.objects.filter(pk=self.bank.pk).update(swift_code='NBMAMWMW')
+        self.assertEqual(reference_data.get('banks', self.bank.pk).swift_code, 'NBMAMWM0')
+
+        batch = self.batches['APPROVED']
+        with self.assertRaisesMessage(ValueError, "Invalid BIC 'NBMAMWMW' for transaction 0001"):
+            EFTGenerator.generate_eft_file(batch)
+        self.assertEqual(EFTBatch.objects.get(id=batch.id).generated_file, '')
+
+
+# ================ CONDITIONAL GET ================
+
+@override_settings(TEMPLATES=_templates_with_stand_ins(), EFT_REQUEST_METRICS={'ENABLED': False})
+class ConditionalGetTests(SeededDataMixin, TestCase):
+
+    def test_queued_messages_are_not_answered_with_304(self):
+        batch = self.batches['PENDING_FM']
+        url = reverse('view_batch', args=[batch.id])
+        self.client.force_login(self.clerk)
+        self.client.get(url)  # sets the CSRF cookie the ETag covers
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A failed export redirects back to the page with an error message
+        response = self.client.get(reverse('export_batch_shared', args=[batch.id, 'txt']))
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'Only approved batches can be exported')
+
+        # Shown once; the page revalidates again afterwards
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_if_modified_since_alone_is_not_answered_with_304(self):
+        batch = self.batches['EXPORTED']
+        self.client.force_login(self.clerk)
+        url = reverse('export_batch_shared', args=[batch.id, 'txt'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        # A bank change alters the file without touching the batch's updated_at
+        Bank.objects.filter(pk=self.bank.pk).update(swift_code='NBMAMWM1')
+        reference_data.bump()
+        since = http_date((batch.updated_at + timedelta(hours=1)).timestamp())
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(';NBMAMWM1;', response.content.decode())
+
+
+# ================ LIVE EVENTS ================
+
+class EventsTests(SeededDataMixin, TestCase):
+
+    @staticmethod
+    def _event(old_status, new_status, created_by_id=0):
+        return {'old_status': old_status, 'new_status': new_status, 'created_by_id': created_by_id}
+
+    def test_audience_sees_its_queues(self):
+        fm = events.Audience(1, ['PENDING_FM'])
+        self.assertTrue(fm.sees(self._event('DRAFT', 'PENDING_FM')))
+        self.assertTrue(fm.sees(self._event('PENDING_FM', 'PENDING_DIRECTOR')))
+        self.assertFalse(fm.sees(self._event('PENDING_DIRECTOR', 'APPROVED')))
+
+        clerk = events.Audience(7, own=True)
+        self.assertTrue(clerk.sees(self._event('PENDING_DIRECTOR', 'APPROVED', created_by_id=7)))
+        self.assertFalse(clerk.sees(self._event('PENDING_DIRECTOR', 'APPROVED', created_by_id=8)))
+
+        admin_audience = events.Audience(1, events.PENDING_STATUSES, everything=True)
+        self.assertTrue(admin_audience.sees(self._event('APPROVED', 'EXPORTED')))
+        self.assertEqual(fm.counts({'PENDING_FM': 2, 'PENDING_DIRECTOR': 5}), {'PENDING_FM': 2})
+
+    async def test_audience_for_user_follows_groups(self):
+        fm = await events.Audience.for_user(self.users['Finance Manager'])
+        self.assertEqual((fm.statuses, fm.own, fm.everything), (('PENDING_FM',), False, False))
+        director = await events.Audience.for_user(self.users['Director of Finance'])
+        self.assertEqual(director.statuses, ('PENDING_DIRECTOR',))
+        clerk = await events.Audience.for_user(self.clerk)
+        self.assertEqual((clerk.statuses, clerk.own), ((), True))
+        self.assertTrue((await events.Audience.for_user(self.users['System Admin'])).everything)
+
+    async def _first_messages(self, user, last_event_id, count):
+        body = events.stream(user, last_event_id)
+        try:
+            return [await anext(body) for _ in range(count)]
+        finally:
+            await body.aclose()
+            hub = events.get_hub()
+            hub.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await hub.task
+
+    async def test_reconnect_replays_missed_transitions(self):
+        log_ids = [pk async for pk in ApprovalAuditLog.objects.order_by('id').values_list('id', flat=True)]
+        missed = log_ids[-2:]
+
+        retry, *replayed, counts = await self._first_messages(self.users['Finance Manager'], log_ids[-3], 4)
+        self.assertTrue(retry.startswith('retry: '))
+        self.assertEqual([int(message.split('\n')[0][len('id: '):]) for message in replayed], missed)
+        self.assertIn('event: transition', replayed[0])
+        self.assertEqual(counts, f'event: counts\ndata: {json.dumps({"PENDING_FM": 1})}\n\n')
+
+        # Directors were not watching those batches, so only the counts come back
+        _, counts = await self._first_messages(self.users['Director of Finance'], log_ids[-3], 2)
+        self.assertEqual(counts, f'event: counts\ndata: {json.dumps({"PENDING_DIRECTOR": 1})}\n\n')
+
+
+# ================ BACKGROUND JOBS ================
+
+@override_settings(EFT_REQUEST_METRICS={'ENABLED': False})
+class JobsTests(SeededDataMixin, TestCase):
+
+    def _run_claimed(self, job):
+        # jobs.execute without closing the test's connection
+        result = jobs.REGISTRY[job.name].func(**job.kwargs)
+        BackgroundJob.objects.filter(id=job.id).update(status='SUCCEEDED', result=result, finished_at=timezone.now())
+
+    def test_claim_takes_due_jobs_by_priority_once(self):
+        archive_job = jobs.enqueue('archive_batches')
+        urgent = jobs.enqueue('rebuild_supplier_stats', priority=10)
+        jobs.enqueue('record_daily_metrics', delay=60)
+        jobs.enqueue('generate_eft_file', batch_id=self.batches['APPROVED'].id)  # another queue
+
+        claimed = jobs.claim(['maintenance'], 'host:1', 5)
+        self.assertEqual([job.id for job in claimed], [urgent.id, archive_job.id])
+        self.assertEqual({(job.status, job.attempts, job.worker) for job in claimed}, {('RUNNING', 1, 'host:1')})
+        self.assertEqual(jobs.claim(['maintenance'], 'host:2', 5), [])
+
+    @override_settings(EFT_JOBS={'RETRY_BACKOFF_SECONDS': 30, 'RETRY_BACKOFF_MAX_SECONDS': 45})
+    def test_failures_back_off_then_give_up(self):
+        job = jobs.enqueue('rebuild_supplier_stats')
+        self.assertEqual([jobs.backoff(n) for n in (1, 2, 3)], [30, 45, 45])
+
+        for attempt, expected in ((1, 'QUEUED'), (2, 'QUEUED'), (3, 'FAILED')):
+            BackgroundJob.objects.filter(id=job.id).update(run_after=timezone.now())
+            self.assertEqual([j.id for j in jobs.claim(['maintenance'], 'host:1', 1)], [job.id])
+            before = timezone.now()
+            with self.assertLogs('eft_app.jobs', 'WARNING'):
+                self.assertEqual(jobs.fail(job.id, 'Traceback ...\nValueError: boom'), expected)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.worker), (expected, attempt, ''))
+            if expected == 'QUEUED':
+                delay = (job.run_after - before).total_seconds()
+                self.assertAlmostEqual(delay, jobs.backoff(attempt), delta=2)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(jobs.describe(job)['error'], 'ValueError: boom')
+        # Only RUNNING jobs can fail
+        self.assertIsNone(jobs.fail(job.id, 'again'))
+
+    def test_requeue_stale_fails_jobs_without_heartbeats(self):
+        stale = jobs.enqueue('archive_batches')
+        alive = jobs.enqueue('rebuild_supplier_stats')
+        jobs.claim(['maintenance'], 'host:1', 2)
+        BackgroundJob.objects.filter(id=stale.id).update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+
+        with self.assertLogs('eft_app.jobs', 'WARNING'):
+            self.assertEqual(jobs.requeue_stale(), [stale.id])
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.error), ('QUEUED', 'Worker stopped sending heartbeats'))
+        self.assertEqual(BackgroundJob.objects.get(id=alive.id).status, 'RUNNING')
+
+    def test_file_generated_by_a_job_is_exported_as_stored(self):
+        batch = self.batches['APPROVED']
+        self.client.force_login(self.clerk)
+        response = self.client.post(reverse('generate_batch_file', args=[batch.id]))
+        self.assertEqual(response.status_code, 202)
+        job = BackgroundJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual((job.name, job.kwargs, job.created_by), ('generate_eft_file', {'batch_id': batch.id}, self.clerk))
+        self.assertEqual(response['Location'], reverse('job_status', args=[job.id]))
+
+        self._run_claimed(jobs.claim(['default'], 'host:1', 1)[0])
+        generated_at = EFTBatch.objects.get(id=batch.id).generated_at
+
+        response = self.client.get(reverse('export_batch_shared', args=[batch.id, 'txt']), {'job': job.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode(), EFTBatch.objects.get(id=batch.id).generated_file)
+        batch.refresh_from_db()
+        self.assertEqual((batch.generated_at, batch.status), (generated_at, 'EXPORTED'))
+
+        pending = self.batches['PENDING_FM']
+        self.assertEqual(self.client.post(reverse('generate_batch_file', args=[pending.id])).status_code, 400)
+
+
+# ================ SPEND ROLLUPS ================
+
+@override_settings(EFT_REQUEST_METRICS={'ENABLED': False})
+class SpendRollupTests(SeededDataMixin, TestCase):
+
+    def _rollups(self):
+        return list(SpendRollup.objects.values_list('zone_id', 'scheme_id', 'line_count', 'amount'))
+
+    def test_record_batch_spend_adds_to_the_approval_day(self):
+        batch = self.batches['APPROVED']
+        analytics.record_batch_spend(batch)
+        analytics.record_batch_spend(batch)
+        self.assertEqual(self._rollups(), [(self.zone.id, self.scheme.id, 20, Decimal('2000.00'))])
+        self.assertEqual(SpendRollup.objects.get().day, timezone.localdate())
+
+    def test_rebuild_recomputes_from_paid_batches(self):
+        # Double-counted approval plus a row for a day with no spend
+        analytics.record_batch_spend(self.batches['APPROVED'])
+        analytics.record_batch_spend(self.batches['APPROVED'])
+        yesterday = timezone.localdate() - timedelta(days=1)
+        SpendRollup.objects.create(day=yesterday, zone=self.zone, scheme=self.scheme, line_count=1, amount=5)
+
+        # A range rebuild leaves other days alone
+        self.assertEqual(analytics.rebuild_spend_rollups(yesterday, yesterday), 0)
+        self.assertEqual(SpendRollup.objects.filter(day=yesterday).count(), 0)
+        self.assertEqual(self._rollups(), [(self.zone.id, self.scheme.id, 20, Decimal('2000.00'))])
+
+        # APPROVED and EXPORTED batches count; the rest do not
+        self.assertEqual(analytics.rebuild_spend_rollups(), 1)
+        self.assertEqual(self._rollups(), [(self.zone.id, self.scheme.id, 20, Decimal('2000.00'))])
+
+    def test_report_ignores_malformed_filters(self):
+        analytics.rebuild_spend_rollups()
+        self.client.force_login(self.users['Finance Manager'])
+        url = reverse('spend_report')
+
+        response = self.client.get(url, {'group_by': 'zone', 'zone': 'abc', 'scheme': '1 OR 1', 'file_type': 'NOPE'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_count'], 20)
+
+        response = self.client.get(url, {'group_by': 'zone', 'zone': self.zone.id + 1})
+        self.assertEqual(response.context['total_count'], 0)
+        response = self.client.get(url, {'group_by': 'zone', 'zone': self.zone.id, 'format': 'csv'})
+        label, count, amount = response.content.decode().splitlines()[1].rsplit(',', 2)
+        self.assertEqual((label, count, Decimal(amount)), ('CZ - Central Zone', '20', Decimal('2000')))
+
+
+# ================ WORKFLOW TRANSITIONS ================
+
+@override_settings(TEMPLATES=_templates_with_stand_ins(), EFT_REQUEST_METRICS={'ENABLED': False})
+class TransitionTests(SeededDataMixin, TestCase):
+
+    def _forward(self, batch, version):
+        response = self.client.post(
+            reverse('fm_forward_batch', args=[batch.id]), {'remarks': 'Checked', 'version': version}, follow=True,
+        )
+        self.assertRedirects(response, reverse('fm_dashboard'))
+        return [str(message) for message in response.context['messages']]
+
+    def test_only_the_first_of_two_forwards_applies(self):
+        first, second = (EFTBatch.objects.get(id=self.batches['PENDING_FM'].id) for _ in range(2))
+        self.assertTrue(transitions.apply(first, 'fm_forward', self.users['Finance Manager']).ok)
+        result = transitions.apply(second, 'fm_forward', self.users['Finance Manager'])
+        self.assertEqual((result.ok, result.current_status), (False, 'PENDING_DIRECTOR'))
+        self.assertEqual(ApprovalAuditLog.objects.filter(batch=first, action='FM_REVIEWED').count(), 1)
+
+    def test_double_forward_from_the_review_page(self):
+        batch = self.batches['PENDING_FM']
+        self.client.force_login(self.users['Finance Manager'])
+        form = self.client.get(reverse('fm_review_batch', args=[batch.id])).context['approval_form']
+        self.assertEqual(form.initial['version'], batch.version)
+
+        self.assertIn('forwarded to Director of Finance', self._forward(batch, batch.version)[0])
+        self.assertEqual(
+            self._forward(batch, batch.version),
+            ['This batch has already been processed by someone else. Current status: Pending Director of Finance'],
+        )
+        self.assertEqual(ApprovalAuditLog.objects.filter(batch=batch, action='FM_REVIEWED').count(), 1)
+
+    def test_stale_version_is_not_applied(self):
+        batch = self.batches['PENDING_FM']
+        seen = batch.version
+        # Changed after the reviewer opened the page
+        EFTBatch.objects.filter(id=batch.id).update(version=seen + 1)
+        self.client.force_login(self.users['Finance Manager'])
+
+        self.assertEqual(self._forward(batch, seen), [
+            'This batch was changed by someone else while you were reviewing it. Please review it again.'
+        ])
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.fm_reviewed_by), ('PENDING_FM', None))
+        self.assertIn('forwarded', self._forward(batch, seen + 1)[0])
+
+
+# ================ KEYSET PAGINATION ================
+
+class KeysetPaginationTests(SeededDataMixin, TestCase):
+
+    def setUp(self):
+        # Ties on created_at must be broken by id, not skipped or repeated
+        tied = timezone.now()
+        for n in range(5):
+            batch = EFTBatch.objects.create(batch_name=f'Tied {n}', created_by=self.clerk)
+            EFTBatch.objects.filter(id=batch.id).update(created_at=tied)
+        self.expected = list(EFTBatch.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.paginator = KeysetPaginator(EFTBatch.objects.all(), per_page=4)
+
+    def test_next_cursors_walk_every_row_once(self):
+        seen, page = [], self.paginator.page()
+        self.assertFalse(page.has_previous)
+        while True:
+            seen.extend(batch.id for batch in page)
+            if not page.has_next:
+                break
+            page = self.paginator.page(page.next_cursor)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(page), len(self.expected) % 4 or 4)
+        self.assertIsNone(page.next_cursor)
+        self.assertEqual(page.total_count, len(self.expected))
+
+    def test_previous_cursor_returns_the_page_before(self):
+        first = self.paginator.page()
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+
+        back = self.paginator.page(third.previous_cursor)
+        self.assertEqual([b.id for b in back], self.expected[4:8])
+        self.assertTrue(back.has_previous and back.has_next)
+        back = self.paginator.page(back.previous_cursor)
+        self.assertEqual([b.id for b in back], self.expected[:4])
+        self.assertFalse(back.has_previous)
+
+    def test_malformed_cursor_gives_page_one(self):
+        for cursor in ('not-a-cursor', 'eyJkIjoic2lkZXdheXMiLCJ2IjpbXX0'):
+            page = self.paginator.page(cursor)
+            self.assertEqual([b.id for b in page], self.expected[:4])
+
+
+# ================ BATCH PROJECTIONS ================
+
+class ProjectionTests(SeededDataMixin, TestCase):
+
+    def setUp(self):
+        self.batch = self.batches['APPROVED']
+        EFTBatch.objects.filter(id=self.batch.id).update(generated_file='0;' + 'x' * 1000, remarks='Fine')
+
+    def test_list_projection_defers_text_and_joins_the_creator(self):
+        with self.assertNumQueries(1):
+            batch = EFTBatch.objects.for_list().get(id=self.batch.id)
+            self.assertEqual(batch.created_by.username, self.clerk.username)
+        self.assertEqual(batch.get_deferred_fields(), set(EFTBatchQuerySet.HEAVY_FIELDS))
+        # Deferred fields still load on access
+        with self.assertNumQueries(1):
+            self.assertEqual(batch.remarks, 'Fine')
+
+    def test_review_and_export_projections(self):
+        with self.assertNumQueries(1):
+            batch = EFTBatch.objects.for_review().get(id=self.batch.id)
+            self.assertEqual(batch.debit_account.account_number, self.debit_account.account_number)
+            self.assertIsNone(batch.approved_by)
+        self.assertEqual(batch.get_deferred_fields(), {'generated_file'})
+
+        batch = EFTBatch.objects.for_export().get(id=self.batch.id)
+        self.assertEqual(batch.get_deferred_fields(), {'fm_remarks', 'remarks', 'rejection_reason'})
+
+    def test_saving_a_projection_keeps_deferred_text(self):
+        batch = EFTBatch.objects.for_list().get(id=self.batch.id)
+        batch.batch_name = 'Renamed'
+        batch.save()
+        stored = EFTBatch.objects.get(id=self.batch.id)
+        self.assertEqual((stored.batch_name, stored.remarks, len(stored.generated_file)), ('Renamed', 'Fine', 1002))
+
+    def test_line_totals_are_summed_in_sql(self):
+        empty = EFTBatch.objects.create(batch_name='Empty', created_by=self.clerk)
+        totals = dict(
+            (batch.id, (batch.line_count, batch.line_total))
+            for batch in EFTBatch.objects.with_line_totals().filter(id__in=[self.batch.id, empty.id])
+        )
+        self.assertEqual(totals, {
+            self.batch.id: (SMALL_TRANSACTIONS, Decimal('100.00') * SMALL_TRANSACTIONS),
+            empty.id: (0, Decimal('0')),
+        })
+
+
+# ================ SUPPLIER PAYMENT STATS ================
+
+class SupplierStatsTests(SeededDataMixin, TestCase):
+
+    FIELDS = ('supplier_id', 'payment_count', 'lifetime_amount', 'last_paid_at', 'last_batch_id', 'last_batch_reference')
+
+    def _stats(self):
+        return list(SupplierPaymentStats.objects.order_by('supplier_id').values_list(*self.FIELDS))
+
+    def test_approval_increments_to_what_a_rebuild_gives(self):
+        self.assertEqual(stats.rebuild_supplier_stats(), 1)
+        self.assertEqual(self._stats(), [(self.supplier.id, 20, Decimal('2000.00'), None, None, '')])
+
+        batch = EFTBatch.objects.get(id=self.batches['PENDING_DIRECTOR'].id)
+        self.assertTrue(transitions.apply(batch, 'director_approve', self.users['Director of Finance']).ok)
+        # Exporting an approved batch does not count it twice
+        self.assertTrue(transitions.apply(batch, 'export', self.clerk).ok)
+        incremented = self._stats()
+        self.assertEqual(
+            incremented,
+            [(self.supplier.id, 30, Decimal('3000.00'), batch.approved_at, batch.id, batch.batch_reference)],
+        )
+
+        stats.rebuild_supplier_stats()
+        self.assertEqual(self._stats(), incremented)
+
+    def test_rebuild_counts_archived_batches(self):
+        archive.archive_chunk([self.batches['EXPORTED'].id])
+        stats.rebuild_supplier_stats()
+        self.assertEqual(self._stats(), [(self.supplier.id, 20, Decimal('2000.00'), None, None, '')])
+
+    def test_supplier_without_payments_reads_as_zero(self):
+        row = stats.supplier_stats(Supplier.objects.get(id=self.supplier.id))
+        self.assertEqual((row.pk, row.payment_count, row.lifetime_amount), (self.supplier.id, 0, 0))
+
+
+# ================ DAILY METRICS ================
+
+@override_settings(EFT_REQUEST_METRICS={'ENABLED': False})
+class DailyMetricsTests(SeededDataMixin, TestCase):
+
+    COUNTERS = analytics.METRIC_FIELDS[:-1]
+
+    def _today(self):
+        return DailyMetric.objects.values(*analytics.METRIC_FIELDS).get(day=timezone.localdate())
+
+    def test_counters_match_a_recompute(self):
+        today = timezone.localdate()
+        self.assertEqual(analytics.record_daily_metrics(today, today), 1)
+
+        fm, director = self.users['Finance Manager'], self.users['Director of Finance']
+        steps = [
+            ('DRAFT', 'submit', self.clerk),
+            ('PENDING_FM', 'fm_reject', fm),
+            ('PENDING_DIRECTOR', 'director_approve', director),
+            ('APPROVED', 'export', self.clerk),
+        ]
+        for status, name, user in steps:
+            batch = EFTBatch.objects.get(id=self.batches[status].id)
+            self.assertTrue(transitions.apply(batch, name, user).ok)
+        EFTBatch.objects.create(batch_name='Created today', created_by=self.clerk)
+        counted = self._today()
+        self.assertEqual(
+            [counted[field] for field in self.COUNTERS],
+            [7, 7, 1, 1, 1, Decimal('7000.00'), Decimal('1000.00'), Decimal('1000.00')],
+        )
+
+        analytics.record_daily_metrics(today, today)
+        recomputed = self._today()
+        self.assertEqual({f: recomputed[f] for f in self.COUNTERS}, {f: counted[f] for f in self.COUNTERS})
+        self.assertEqual(recomputed['active_users'], 3)
+
+    def test_recompute_writes_zero_rows_for_quiet_days(self):
+        today = timezone.localdate()
+        self.assertEqual(analytics.record_daily_metrics(today - timedelta(days=2), today), 3)
+        quiet = DailyMetric.objects.get(day=today - timedelta(days=1))
+        self.assertEqual([getattr(quiet, field) for field in analytics.METRIC_FIELDS], [0] * 9)
+
+    def test_trend_fills_missing_days_oldest_first(self):
+        today = timezone.localdate()
+        DailyMetric.objects.create(day=today - timedelta(days=2), batches_approved=4, amount_approved=Decimal('12.50'))
+        series = analytics.trend(5, today=today)
+        self.assertEqual([row['day'] for row in series], [today - timedelta(days=n) for n in range(4, -1, -1)])
+        self.assertEqual([row['batches_approved'] for row in series], [0, 0, 4, 0, 0])
+
+    def test_trends_api_clamps_days(self):
+        self.client.force_login(self.users['System Admin'])
+        url = reverse('api_dashboard_trends')
+        self.assertEqual(len(self.client.get(url, {'days': 'abc'}).json()['days']), 90)
+        self.assertEqual(len(self.client.get(url, {'days': 5000}).json()['days']), 366)
+        body = self.client.get(url, {'days': 1}).json()
+        self.assertEqual(body['days'], [timezone.localdate().isoformat()])
+        self.assertEqual(body['series']['batches_created'], [6])
+
+
+# ================ CACHE-ASIDE ================
+
+class CacheAsideTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_stampede_computes_once(self):
+        calls = []
+        callers = 8
+        barrier = threading.Barrier(callers)
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'batches': 42}
+
+        def request():
+            barrier.wait()
+            return caching.cache_aside('eft:test:stampede', compute, timeout=60)
+
+        with ThreadPoolExecutor(max_workers=callers) as pool:
+            results = list(pool.map(lambda _: request(), range(callers)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'batches': 42}] * callers)
+        self.assertIsNone(cache.get('eft:test:stampede' + caching.LOCK_SUFFIX))
+
+    def test_none_is_cached(self):
+        compute = mock.Mock(return_value=None)
+        for _ in range(2):
+            self.assertIsNone(caching.cache_aside('eft:test:none', compute, timeout=60))
+        compute.assert_called_once_with()
+
+    def test_waiter_computes_when_the_lock_holder_dies(self):
+        # A holder that took the lock and never stored a value
+        cache.add('eft:test:orphan' + caching.LOCK_SUFFIX, 'dead', 0.2)
+        compute = mock.Mock(return_value='fresh')
+        self.assertEqual(caching.cache_aside('eft:test:orphan', compute, timeout=60, lock_timeout=1), 'fresh')
+        compute.assert_called_once_with()
+
+
+# ================ HEALTH PROBES ================
+
+class HealthProbeTests(TestCase):
+
+    def test_liveness_does_no_io(self):
+        served = health.process_info()['requests_served']
+        with self.assertNumQueries(0):
+            # Answered before host validation, sessions and auth
+            response = self.client.get('/healthz', HTTP_HOST='10.0.0.7:8000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ok')
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(health.process_info()['requests_served'], served + 1)
+
+    async def test_liveness_under_asgi(self):
+        response = await self.async_client.get('/healthz/')
+        self.assertEqual((response.status_code, response.json()['status']), (200, 'ok'))
+
+    def test_readiness_checks_every_dependency(self):
+        with tempfile.TemporaryDirectory() as artifacts:
+            with override_settings(EFT_HEALTH={'ARTIFACT_DIR': os.path.join(artifacts, 'eft')}):
+                response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'ok')
+        self.assertEqual(set(body['checks']), {'database:default', 'cache', 'artifacts'})
+        self.assertTrue(all(check['ok'] for check in body['checks'].values()))
+
+    def test_readiness_fails_on_any_check(self):
+        with tempfile.NamedTemporaryFile() as not_a_dir:
+            with override_settings(EFT_HEALTH={'ARTIFACT_DIR': os.path.join(not_a_dir.name, 'eft')}):
+                response = self.client.get('/readyz/')
+        self.assertEqual(response.status_code, 503)
+        body = response.json()
+        self.assertEqual(body['status'], 'unavailable')
+        self.assertFalse(body['checks']['artifacts']['ok'])
+        self.assertIn('is not writable', body['checks']['artifacts']['error'])
+
+        with mock.patch.object(health, 'check_database', return_value=(False, 'connection refused')):
+            body = self.client.get('/readyz').json()
+        self.assertEqual(body['checks']['database:default'], {'ok': False, 'ms': mock.ANY, 'error': 'connection refused'})
+
+
+# ================ CHUNKED VALIDATION ================
+
+@override_settings(EFT_VALIDATION={'PARALLEL_MIN_ROWS': 10, 'CHUNK_SIZE': 4, 'WORKERS': 3})
+class ValidationTests(SeededDataMixin, TestCase):
+
+    def setUp(self):
+        self.lines = [
+            validation.Line(
+                n, Decimal(n), self.supplier.id, '5781900', 'Supplier 0 Ltd', '1000000000', 'NBMAMWM0',
+                self.debit_account.id, f'INV{n}', f'SRC{n}', f'Payment {n}',
+            )
+            for n in range(1, 26)
+        ]
+        self.lines[2] = self.lines[2]._replace(narration='')
+        self.lines[8] = self.lines[8]._replace(supplier_id=None)
+        self.lines[16] = self.lines[16]._replace(reference_number='')
+        self.lines[23] = self.lines[23]._replace(debit_account_id=None)
+
+    def test_chunked_threads_match_inline(self):
+        inline = validation.validate_lines(self.lines, executor='inline')
+        self.assertEqual((inline.count, inline.total), (25, Decimal(325)))
+        self.assertEqual(inline.errors, [
+            'Description required for transaction 3',
+            'Supplier is required for transaction 9',
+            'Invoice Number required for transaction 17',
+            'Debit account required for transaction 24',
+        ])
+
+        with mock.patch.object(validation, 'validate_chunk', wraps=validation.validate_chunk) as chunk:
+            chunked = validation.validate_lines(self.lines, executor='thread')
+        self.assertEqual(chunk.call_count, 7)
+        self.assertEqual(chunked, inline)
+
+    def test_small_batches_run_inline(self):
+        with mock.patch.object(validation, 'validate_chunk', wraps=validation.validate_chunk) as chunk:
+            result = validation.validate_lines(self.lines[:9], executor='thread')
+        chunk.assert_called_once_with(self.lines[:9])
+        self.assertEqual(result.count, 9)
+
+    def test_batch_lines_validate_clean(self):
+        batch = self.batches['APPROVED']
+        result = validation.validate_lines(validation.load_lines(batch))
+        self.assertEqual(result, (SMALL_TRANSACTIONS, batch.total_amount, []))
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            validation.validate_lines(self.lines, executor='gpu')
+
+    def test_settings_cannot_choose_process_pools(self):
+        with override_settings(EFT_VALIDATION={'EXECUTOR': 'process'}):
+            with self.assertRaises(ImproperlyConfigured):
+                validation.validate_lines(self.lines)
+
+
+# ================ BATCH REFERENCES ================
+
+class ReferenceTests(TestCase):
+
+    day = date(2026, 3, 7)
+
+    def _last_value(self):
+        return ReferenceCounter.objects.get(day=self.day).last_value
+
+    def test_reserve_hands_out_contiguous_blocks(self):
+        first = references.reserve(3, self.day)
+        second = references.reserve(2, self.day)
+        self.assertEqual([ref.number for ref in first + second], [1, 2, 3, 4, 5])
+        self.assertEqual(first[0].batch_reference, 'CRWB-20260307-000001')
+        self.assertEqual(second[-1].file_reference, 'CRWB-070326-0005')
+        self.assertEqual(references.reserve(0, self.day), [])
+        self.assertEqual(self._last_value(), 5)
+
+    def test_rolled_back_creation_gives_its_numbers_back(self):
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic():
+                references.reserve(4, self.day)
+                raise DatabaseError('insert failed')
+        self.assertEqual(references.allocate(self.day).number, 1)
+
+    def test_assign_only_fills_missing_references(self):
+        batches = [
+            EFTBatch(batch_name='New'),
+            EFTBatch(batch_name='Imported', batch_reference='LEGACY-1', file_reference='LEGACY-F1'),
+            EFTBatch(batch_name='Half', batch_reference='LEGACY-2'),
+        ]
+        references.assign(batches, self.day)
+        self.assertEqual(
+            [(b.batch_reference, b.file_reference) for b in batches],
+            [
+                ('CRWB-20260307-000001', 'CRWB-070326-0001'),
+                ('LEGACY-1', 'LEGACY-F1'),
+                ('LEGACY-2', 'CRWB-070326-0002'),
+            ],
+        )
+        self.assertEqual(self._last_value(), 2)
+
+    def test_per_day_cap(self):
+        ReferenceCounter.objects.create(day=self.day, last_value=references.MAX_PER_DAY - 1)
+        # A block that would cross the cap is refused whole
+        with self.assertRaisesMessage(ValueError, 'No batch references left for 07.03.2026'):
+            references.reserve(2, self.day)
+        self.assertEqual(self._last_value(), references.MAX_PER_DAY - 1)
+
+        self.assertEqual(references.allocate(self.day).file_reference, 'CRWB-070326-9999')
+        with self.assertRaises(ValueError):
+            references.allocate(self.day)
+        # The next day starts again from one
+        self.assertEqual(references.allocate(self.day + timedelta(days=1)).number, 1)
+
+
+# ================ REFERENCE DATA SNAPSHOTS ================
+
+class ReferenceDataTests(SeededDataMixin, TestCase):
+
+    def test_save_and_delete_bump_the_version(self):
+        before = reference_data.snapshot()
+        zone = Zone.objects.create(zone_code='NZ', zone_name='Northern Zone')
+        after_save = reference_data.snapshot()
+        self.assertNotEqual(after_save.version, before.version)
+        self.assertEqual(after_save['zones'].get(zone.pk).label, str(zone))
+
+        zone.delete()
+        after_delete = reference_data.snapshot()
+        self.assertNotEqual(after_delete.version, after_save.version)
+        self.assertIsNone(after_delete['zones'].get(zone.pk))
+
+    def test_bump_is_repeated_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.bank.save()
+            during = reference_data.version()
+        self.assertEqual(len(callbacks), 1)
+        # Snapshots built from rows read before the commit are dropped too
+        self.assertNotEqual(reference_data.version(), during)
+
+    @override_settings(EFT_REFDATA_MAX_AGE=60)
+    def test_snapshot_is_rebuilt_when_too_old(self):
+        current = reference_data.snapshot()
+        with mock.patch.object(reference_data.time, 'monotonic', return_value=current.built_at + 59):
+            self.assertIs(reference_data.snapshot(), current)
+        with mock.patch.object(reference_data.time, 'monotonic', return_value=current.built_at + 61):
+            rebuilt = reference_data.snapshot()
+        self.assertIsNot(rebuilt, current)
+        self.assertEqual(rebuilt.version, current.version)
+
+    def test_choice_field_renders_from_the_snapshot_and_checks_the_database(self):
+        field = ReferenceChoiceField('suppliers')
+        reference_data.snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(list(field.choices)[1:], [(self.supplier.pk, '5781900 - Supplier 0')])
+
+        # Changes made by another worker: no signal reaches this one
+        added = Supplier.objects.bulk_create([Supplier(
+            supplier_code='5781901', supplier_name='Supplier 1', bank=self.bank,
+            account_number='1000000001', account_name='Supplier 1 Ltd', created_by=self.clerk,
+        )])[0]
+        Supplier.objects.filter(pk=self.supplier.pk).update(is_active=False)
+        self.assertIsNone(reference_data.table('suppliers').get(added.pk))
+
+        self.assertEqual(field.clean(str(added.pk)).supplier_code, '5781901')
+        for value in (str(self.supplier.pk), 'abc'):
+            with self.assertRaisesMessage(ValidationError, 'Select a valid choice'):
+                field.clean(value)
+
+
+# ================ PENDING-COUNT BADGES ================
+
+@override_settings(TEMPLATES=_templates_with_stand_ins(), EFT_REQUEST_METRICS={'ENABLED': False})
+class PendingCountTests(SeededDataMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @staticmethod
+    def _badge_counts(ctx):
+        return [q['sql'] for q in ctx.captured_queries
+                if q['sql'].startswith('SELECT COUNT(*)') and 'FROM "eft_app_eftbatch"' in q['sql']]
+
+    def test_second_render_does_not_count(self):
+        for role, status in (('Finance Manager', 'PENDING_FM'), ('Director of Finance', 'PENDING_DIRECTOR')):
+            with self.subTest(role=role):
+                self.client.force_login(self.users[role])
+                url = reverse('view_batch', args=[self.batches[status].id])
+                with CaptureQueriesContext(connection) as first:
+                    response = self.client.get(url)
+                self.assertEqual(response.context['pending_count'], 1)
+                self.assertEqual(len(self._badge_counts(first)), 1)
+
+                with CaptureQueriesContext(connection) as second:
+                    response = self.client.get(url)
+                self.assertEqual(response.context['pending_count'], 1)
+                self.assertEqual(self._badge_counts(second), [])
+
+    @staticmethod
+    def _cached():
+        return {s for s in PENDING_STATUSES if cache.get(PENDING_COUNT_CACHE_KEY.format(status=s)) is not None}
+
+    def test_transitions_drop_affected_counts_after_commit(self):
+        fm, director = self.users['Finance Manager'], self.users['Director of Finance']
+        cases = [
+            ('DRAFT', 'submit', self.clerk, {'PENDING_FM'}),
+            ('PENDING_FM', 'fm_forward', fm, {'PENDING_FM', 'PENDING_DIRECTOR'}),
+            ('PENDING_FM', 'fm_reject', fm, {'PENDING_FM'}),
+            ('PENDING_DIRECTOR', 'director_approve', director, {'PENDING_DIRECTOR'}),
+            ('PENDING_DIRECTOR', 'director_reject', director, {'PENDING_DIRECTOR'}),
+        ]
+        for status, name, user, dropped in cases:
+            with self.subTest(name=name):
+                batch = EFTBatch.objects.create(
+                    batch_name=name, status=status, created_by=self.clerk, debit_account=self.debit_account,
+                )
+                for pending in PENDING_STATUSES:
+                    get_pending_count(pending)
+
+                with self.captureOnCommitCallbacks() as callbacks:
+                    self.assertTrue(transitions.apply(batch, name, user).ok)
+                    # A render before the commit still sees the old count
+                    self.assertEqual(self._cached(), set(PENDING_STATUSES))
+                self.assertEqual(self._cached(), set(PENDING_STATUSES))
+                for callback in callbacks:
+                    callback()
+                self.assertEqual(self._cached(), set(PENDING_STATUSES) - dropped)
+
+
+# ================ CACHED OPTION LISTS ================
+
+@override_settings(TEMPLATES=_templates_with_stand_ins(), EFT_REQUEST_METRICS={'ENABLED': False})
+class OptionListCacheTests(SeededDataMixin, TestCase):
+
+    REFERENCE_TABLES = ('eft_app_supplier', 'eft_app_bank', 'eft_app_debitaccount', 'eft_app_scheme', 'eft_app_zone')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_login(self.clerk)
+        self.url = reverse('edit_batch', args=[self.batches['DRAFT'].id])
+
+    def _render(self):
+        with CaptureQueriesContext(connection) as ctx, \
+                mock.patch.object(ReferenceChoiceIterator, '__iter__', autospec=True,
+                                  side_effect=ReferenceChoiceIterator.__iter__) as options:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        reference_queries = [q['sql'] for q in ctx.captured_queries
+                             if any(f'FROM "{table}"' in q['sql'] for table in self.REFERENCE_TABLES)]
+        return response.content.decode(), options.call_count, reference_queries
+
+    def test_option_lists_are_rendered_once_per_version(self):
+        content, rendered, _ = self._render()
+        self.assertGreater(rendered, 0)
+        self.assertIn('5781900 - Supplier 0', content)
+
+        content, rendered, queries = self._render()
+        self.assertEqual((rendered, queries), (0, []))
+        self.assertIn('5781900 - Supplier 0', content)
+
+        # Saving a supplier bumps the version, so the lists are rendered again
+        Supplier.objects.create(
+            supplier_code='5781901', supplier_name='Supplier 1', bank=self.bank,
+            account_number='1000000001', account_name='Supplier 1 Ltd', created_by=self.clerk,
+        )
+        content, rendered, _ = self._render()
+        self.assertGreater(rendered, 0)
+        self.assertIn('5781901 - Supplier 1', content)
@@ -0,0 +1,119 @@
+"""
+transitions.py — Batch workflow transitions as conditional UPDATEs.
+
+    result = transitions.apply(batch, 'fm_forward', request.user, remarks=..., ip_address=...)
+    if not result.ok:
+        messages.error(request, result.message)
+
+Each transition is one statement:
+
+    UPDATE eft_app_eftbatch
+       SET status = <target>, version = version + 1, updated_at = <now>, <its own fields>
+     WHERE id = <batch> AND status = <source> AND version = <version read>
+
+so of two approvers acting on the same batch exactly one matches the row;
+the other gets a conflict result naming the batch's current status instead
+of processing it again. Only the columns the transition sets are written.
+The audit row and the batch_status_changed receivers (rollups, stats,
+metrics) run in the same atomic block, so a transition is recorded with all
+of its side effects or not at all; cache invalidation still waits for the
+commit (see context_processors.py).
+
+apply_many() runs one transition over many batches in a single transaction
+under audit.buffered(), so their audit rows cost one INSERT and one
+chain-head lock.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import audit
+from .models import EFTBatch
+from .signals import send_status_changed
+
+Transition = namedtuple('Transition', 'source target action fields')
+
+
+def _fm_review(user, now, remarks):
+    return {'fm_reviewed_by': user, 'fm_reviewed_at': now, 'fm_remarks': remarks}
+
+
+def _fm_rejection(user, now, remarks):
+    return {'fm_reviewed_by': user, 'fm_reviewed_at': now, 'rejection_reason': remarks}
+
+
+def _approval(user, now, remarks):
+    return {'approved_by': user, 'approved_at': now, 'remarks': remarks}
+
+
+def _rejection(user, now, remarks):
+    return {'approved_by': user, 'approved_at': now, 'rejection_reason': remarks}
+
+
+def _no_fields(user, now, remarks):
+    return {}
+
+
+# name -> (source status, target status, audit action, fields(user, now, remarks))
+TRANSITIONS = {
+    'submit': Transition('DRAFT', 'PENDING_FM', 'SUBMITTED', _no_fields),
+    'fm_forward': Transition('PENDING_FM', 'PENDING_DIRECTOR', 'FM_REVIEWED', _fm_review),
+    'fm_reject': Transition('PENDING_FM', 'REJECTED', 'FM_REJECTED', _fm_rejection),
+    'director_approve': Transition('PENDING_DIRECTOR', 'APPROVED', 'APPROVED', _approval),
+    'director_reject': Transition('PENDING_DIRECTOR', 'REJECTED', 'REJECTED', _rejection),
+    'export': Transition('APPROVED', 'EXPORTED', 'EXPORTED', _no_fields),
+}
+
+
+class Result(namedtuple('Result', 'ok batch old_status current_status')):
+    """Outcome of apply(); on conflict ``current_status`` is the status found (None if deleted)."""
+
+    @property
+    def message(self):
+        if self.ok:
+            return ''
+        if self.current_status is None:
+            return 'This batch no longer exists.'
+        if self.current_status == self.old_status:
+            return 'This batch was changed by someone else while you were reviewing it. Please review it again.'
+        label = dict(EFTBatch.STATUS_CHOICES).get(self.current_status, self.current_status)
+        return f'This batch has already been processed by someone else. Current status: {label}'
+
+
+def apply(batch, name, user, remarks='', ip_address=None, expected_version=None):
+    """
+    Run transition ``name`` on ``batch`` if it is still in the source status
+    at ``expected_version`` (default: the version ``batch`` was loaded with).
+    On success ``batch`` is updated in place and the audit row is written.
+    """
+    transition = TRANSITIONS[name]
+    version = batch.version if expected_version is None else expected_version
+    now = timezone.now()
+    fields = transition.fields(user, now, remarks or '')
+
+    with transaction.atomic():
+        updated = EFTBatch.objects.filter(id=batch.id, status=transition.source, version=version).update(
+            status=transition.target, version=F('version') + 1, updated_at=now, **fields,
+        )
+        if not updated:
+            current = EFTBatch.objects.filter(id=batch.id).values_list('status', flat=True).first()
+            return Result(False, batch, transition.source, current)
+
+        for field, value in fields.items():
+            setattr(batch, field, value)
+        batch.status, batch.version, batch.updated_at = transition.target, version + 1, now
+        audit.record(batch=batch, action=transition.action, user=user, remarks=remarks or '', ip_address=ip_address)
+        send_status_changed(batch, transition.source, user)
+    return Result(True, batch, transition.source, transition.target)
+
+
+def apply_many(batches, name, user, remarks='', ip_address=None):
+    """
+    apply() for each of ``batches`` in one transaction, with all audit rows
+    written by one bulk insert. Batches someone else has already moved get
+    a conflict Result; the rest still go through.
+    """
+    with transaction.atomic(), audit.buffered():
+        return [apply(batch, name, user, remarks=remarks, ip_address=ip_address) for batch in batches]
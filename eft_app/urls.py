@@ -1,9 +1,18 @@
 # eft_app/urls.py
+from django.conf import settings
 from django.urls import path
 from django.views.generic import RedirectView
 from django.contrib.auth import views as auth_views
 from . import views
 
+# Async lookups for ASGI deployments; the sync views serve WSGI
+if getattr(settings, 'EFT_ASYNC_LOOKUPS', False):
+    supplier_details, scheme_zone, scheme_details = (
+        views.aget_supplier_details, views.aget_scheme_zone, views.aget_scheme_details)
+else:
+    supplier_details, scheme_zone, scheme_details = (
+        views.get_supplier_details, views.get_scheme_zone, views.get_scheme_details)
+
 urlpatterns = [
     path('', RedirectView.as_view(pattern_name='login'), name='home'),
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
@@ -103,6 +112,7 @@ urlpatterns = [
     # These use the role-aware view_batch and preview_eft_file
     path('batches/<int:batch_id>/view/', views.view_batch, name='view_batch'),
     path('batches/<int:batch_id>/preview/', views.preview_eft_file, name='preview_eft_file'),
+    path('batches/<int:batch_id>/generate/', views.generate_batch_file, name='generate_batch_file'),
     path('batches/<int:batch_id>/export/<str:format>/', views.export_batch, name='export_batch_shared'),
     path('batches/<int:batch_id>/export/', views.export_batch, {'format': 'txt'}, name='export_batch'),
 
@@ -127,11 +137,18 @@ urlpatterns = [
     path('authorizer/batches/<int:batch_id>/approve/', views.approve_batch, name='approve_batch'),
     path('authorizer/batches/<int:batch_id>/reject/', views.reject_batch, name='reject_batch'),
 
+    # Reports (System Admin, Finance Manager, Director of Finance)
+    path('reports/spend/', views.spend_report, name='spend_report'),
+
     # API
-    path('api/supplier/<int:supplier_id>/details/', views.get_supplier_details, name='supplier_details'),
-    path('api/scheme/<int:scheme_id>/zone/', views.get_scheme_zone, name='scheme_zone'),
-    path('api/scheme/<int:scheme_id>/details/', views.get_scheme_details, name='scheme_details'),
-    path('api/scheme/<str:scheme_id>/details/', views.get_scheme_details, name='scheme_details_str'),
+    path('api/supplier/<int:supplier_id>/details/', supplier_details, name='supplier_details'),
+    path('api/scheme/<int:scheme_id>/zone/', scheme_zone, name='scheme_zone'),
+    path('api/scheme/<int:scheme_id>/details/', scheme_details, name='scheme_details'),
+    path('api/scheme/<str:scheme_id>/details/', scheme_details, name='scheme_details_str'),
     path('system-admin/api/system-activity/', views.api_system_activity, name='api_system_activity'),
     path('system-admin/api/system-status/', views.api_system_status, name='api_system_status'),
+    path('system-admin/api/trends/', views.api_dashboard_trends, name='api_dashboard_trends'),
+    path('system-admin/api/jobs/<str:name>/', views.api_enqueue_job, name='api_enqueue_job'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('events/', views.event_stream, name='event_stream'),
 ]
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+validation.py — Line checks for EFT export, chunked across a worker pool.
+
+    lines = validation.load_lines(batch)
+    result = validation.validate_lines(lines)
+    result.count, result.total, result.errors
+
+EFTGenerator.validate_batch runs these checks before every export. A
+batch's lines are read in one query as plain tuples, not model instances,
+with the supplier, bank and debit-account fields the checks need joined
+in. They come from the same rows the file is written from, never from a
+reference_data snapshot that may be stale, so the checks are pure CPU
+work on the tuples.
+
+Small batches (fewer than EFT_VALIDATION['PARALLEL_MIN_ROWS'] lines) run
+inline. Larger ones are split into CHUNK_SIZE slices and validated on
+WORKERS threads. Per-chunk counts, totals and errors are then merged in
+line order, so the outcome is the same as validating inline.
+
+Threads only run the checks in parallel on a free-threaded Python build.
+A process pool ('process') runs them in parallel everywhere but pays to
+pickle the lines. It is never taken from settings, because forking a pool
+inside a threaded web worker is unsafe; only callers that own their
+process pass it explicitly, such as ``manage.py benchmark_validation``,
+which shows which is faster on a given host.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+DEFAULTS = {
+    'EXECUTOR': 'thread',
+    'WORKERS': min(os.cpu_count() or 1, 8),
+    'CHUNK_SIZE': 2000,
+    'PARALLEL_MIN_ROWS': 5000,
+}
+
+EXECUTORS = ('inline', 'thread', 'process')
+# What settings.EFT_VALIDATION['EXECUTOR'] may choose for exports
+CONFIGURABLE_EXECUTORS = ('inline', 'thread')
+
+Line = namedtuple(
+    'Line',
+    'sequence_number amount supplier_id supplier_code account_name account_number swift_code '
+    'debit_account_id reference_number source_reference narration',
+)
+
+# Line field -> transaction lookup
+LINE_LOOKUPS = {
+    'supplier_code': 'supplier__supplier_code',
+    'account_name': 'supplier__account_name',
+    'account_number': 'supplier__account_number',
+    'swift_code': 'supplier__bank__swift_code',
+}
+
+ChunkResult = namedtuple('ChunkResult', 'count total errors')
+
+
+def get_validation_settings():
+    return {**DEFAULTS, **getattr(settings, 'EFT_VALIDATION', {})}
+
+
+def load_lines(batch):
+    """The batch's lines in sequence order, as Line tuples, in one query."""
+    lookups = [LINE_LOOKUPS.get(field, field) for field in Line._fields]
+    return [Line(*row) for row in batch.transactions.order_by('sequence_number').values_list(*lookups)]
+
+
+def line_error(line):
+    """The first problem with ``line`` that would make RBM reject the file, or None."""
+    seq = line.sequence_number
+    if line.supplier_id is None:
+        return f"Supplier is required for transaction {seq}"
+    if not line.supplier_code:
+        return f"Vendor Code (supplier_code) required for transaction {seq}"
+    if not line.account_name:
+        return f"Payee Details (account_name) required for transaction {seq}"
+    if not line.swift_code:
+        return f"Bank SWIFT code required for transaction {seq}"
+
+    bic = line.swift_code
+    if bic.startswith('NBMA') and bic.endswith('W'):
+        return (
+            f"Invalid BIC '{bic}' for transaction {seq}. "
+            f"RBM BIC codes must end with '0', not 'W'. "
+            f"Please update the bank's SWIFT code in the database."
+        )
+
+    if not line.account_number:
+        return f"Credit Account Number required for transaction {seq}"
+    if line.debit_account_id is None:
+        return f"Debit account required for transaction {seq}"
+    if not line.reference_number:
+        return f"Invoice Number required for transaction {seq}"
+    if not line.source_reference:
+        return f"Source Reference required for transaction {seq}"
+    if not line.narration:
+        return f"Description required for transaction {seq}"
+    return None
+
+
+def validate_chunk(lines):
+    """Count, total and line errors for one slice of a batch."""
+    errors = []
+    total = Decimal('0')
+    for line in lines:
+        total += line.amount
+        error = line_error(line)
+        if error:
+            errors.append(error)
+    return ChunkResult(len(lines), total, errors)
+
+
+def chunks(lines, size):
+    return [lines[start:start + size] for start in range(0, len(lines), size)]
+
+
+def validate_lines(lines, executor=None, workers=None, chunk_size=None):
+    """
+    Validate ``lines`` and merge the per-chunk results; arguments left as
+    None come from settings.EFT_VALIDATION. ``executor='process'`` must be
+    passed explicitly (see the module docstring).
+    """
+    config = get_validation_settings()
+    if executor is None:
+        executor = config['EXECUTOR']
+        if executor not in CONFIGURABLE_EXECUTORS:
+            raise ImproperlyConfigured(
+                f"EFT_VALIDATION['EXECUTOR'] must be one of {', '.join(CONFIGURABLE_EXECUTORS)}, not '{executor}'"
+            )
+    workers = workers or config['WORKERS']
+    chunk_size = chunk_size or config['CHUNK_SIZE']
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown validation executor '{executor}'; use one of {', '.join(EXECUTORS)}")
+
+    if executor == 'inline' or workers <= 1 or len(lines) < max(config['PARALLEL_MIN_ROWS'], chunk_size + 1):
+        results = [validate_chunk(lines)]
+    elif executor == 'thread':
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='eft-validate') as pool:
+            results = list(pool.map(validate_chunk, chunks(lines, chunk_size)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(validate_chunk, chunks(lines, chunk_size)))
+
+    return ChunkResult(
+        sum(result.count for result in results),
+        sum((result.total for result in results), Decimal('0')),
+        [error for result in results for error in result.errors],
+    )
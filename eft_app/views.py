@@ -2,30 +2,36 @@
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy, reverse
 from django.utils import timezone
-from django.db import transaction as db_transaction, connection
-from django.db.models import Sum, Count, Q
+from django.db import transaction as db_transaction
+from django.db.models import Sum, Count, Exists, OuterRef, Q, Value, IntegerField, CharField
+from django.db.models.functions import Cast, LPad
 from django.db.utils import OperationalError, DatabaseError
 from django.views.decorators.http import require_POST
 from django.contrib.auth.models import Group, User
 from django.utils.safestring import mark_safe
 from django.conf import settings
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+import django
+import hashlib
 import json
 import platform
 import csv
 import xlwt
 from datetime import datetime, timedelta
 from decimal import Decimal
+from functools import wraps
 
 from .models import (
     Bank, Zone, Scheme, Supplier, DebitAccount,
-    EFTBatch, EFTTransaction, ApprovalAuditLog
+    EFTBatch, EFTBatchQuerySet, EFTTransaction, ApprovalAuditLog, BackgroundJob
 )
 from .forms import (
     BankForm, ZoneForm, SchemeForm, SupplierForm, DebitAccountForm,
@@ -33,6 +39,11 @@ from .forms import (
     UserRegistrationForm, UserEditForm
 )
 from .eft_generator import EFTGenerator
+from .conditional import revalidate_batch
+from .db_routers import read_from_replica
+from .pagination import KeysetPaginator
+from . import analytics, archive, caching, events, health, jobs, reference_data, search, transitions
+from .stats import supplier_stats
 
 # ================ HELPER FUNCTIONS ================
 
@@ -66,35 +77,35 @@ def format_time_ago(timestamp):
     else:
         return 'Just now'
 
-def check_database_connection():
-    try:
-        User.objects.count()
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-        return True, None
-    except (OperationalError, DatabaseError) as e:
-        return False, str(e)
-    except Exception as e:
-        return True, str(e)
+def batch_transactions(batch):
+    """Transactions of a batch with every relation the tables and generator touch."""
+    return batch.transactions.select_related(
+        'supplier__bank', 'scheme', 'zone', 'debit_account'
+    ).order_by('sequence_number')
 
-def calculate_uptime():
-    try:
-        first_user = User.objects.order_by('date_joined').first()
-        if first_user:
-            uptime_delta = timezone.now() - first_user.date_joined
-            days = uptime_delta.days
-            hours = uptime_delta.seconds // 3600
-            minutes = (uptime_delta.seconds % 3600) // 60
-            if days > 0:
-                return f"{days}d {hours}h" if hours > 0 else f"{days} day{'s' if days > 1 else ''}"
-            elif hours > 0:
-                return f"{hours}h {minutes}m" if minutes > 0 else f"{hours} hour{'s' if hours > 1 else ''}"
-            else:
-                return f"{minutes} minute{'s' if minutes > 1 else ''}"
-        return "System initializing"
-    except:
-        return "1 day"
+TRANSACTIONS_PER_PAGE = 100
+
+def batch_transaction_page(request, batch):
+    """One page of a batch's transaction rows, by sequence number (?txn_cursor=)."""
+    return KeysetPaginator(
+        batch_transactions(batch), TRANSACTIONS_PER_PAGE, ordering=('sequence_number', 'id')
+    ).page(request.GET.get('txn_cursor'))
+
+def batch_line_totals(batch):
+    """(total amount, line count) — from with_line_totals() when annotated, else one aggregate."""
+    if hasattr(batch, 'line_total'):
+        return batch.line_total, batch.line_count
+    totals = batch.transactions.aggregate(total=Sum('amount'), count=Count('id'))
+    return totals['total'] or Decimal('0'), totals['count']
+
+def selected_batch_ids(request):
+    """The batch_ids posted by a list page's bulk action, ignoring malformed values."""
+    return [value for value in request.POST.getlist('batch_ids') if value.isdigit()]
+
+def posted_version(request):
+    """The batch version a review form was rendered with, or None if it did not post one."""
+    value = request.POST.get('version', '')
+    return int(value) if value.isdigit() else None
 
 # ================ ROLE CHECK FUNCTIONS ================
 
@@ -110,6 +121,12 @@ def is_finance_manager(user):
 def is_director_of_finance(user):
     return user.groups.filter(name='Director of Finance').exists()
 
+def can_view_reports(user):
+    return is_system_admin(user) or user.groups.filter(name__in=['Finance Manager', 'Director of Finance']).exists()
+
+def can_export_files(user):
+    return user.has_perm('eft_app.can_export_eft') or get_user_role(user) in ['accounts', 'director', 'admin']
+
 # ================ COMMON VIEWS ================
 
 @login_required
@@ -130,12 +147,14 @@ def dashboard(request):
 # ================ SHARED VIEW BATCH — ALL ROLES ================
 
 @login_required
+@revalidate_batch('view')
 def view_batch(request, batch_id):
     """
     Role-aware batch view — renders shared/view_batch.html for all roles.
-    Each role gets appropriate action buttons and back URLs.
+    Each role gets appropriate action buttons and back URLs. Archived batches
+    are shown from the archive tables at the same URL.
     """
-    batch = get_object_or_404(EFTBatch, id=batch_id)
+    batch = archive.get_batch(batch_id, EFTBatch.objects.for_review().with_line_totals())
     user = request.user
     user_role = get_user_role(user)
 
@@ -166,8 +185,10 @@ def view_batch(request, batch_id):
         list_url = reverse('batch_list')
         back_url = reverse('edit_batch', args=[batch.id]) if batch.status == 'DRAFT' else reverse('batch_list')
 
-    audit_logs = batch.audit_logs.all().order_by('-timestamp')
-    total_amount = sum(t.amount for t in batch.transactions.all())
+    audit_logs = KeysetPaginator(
+        batch.audit_logs.select_related('user'), 50, ordering=('-timestamp', '-id')
+    ).page(request.GET.get('log_cursor'))
+    total_amount, transaction_count = batch_line_totals(batch)
     can_export = (
         user.has_perm('eft_app.can_export_eft') or
         user_role in ['accounts', 'director', 'admin']
@@ -176,7 +197,9 @@ def view_batch(request, batch_id):
 
     context = {
         'batch': batch,
-        'transactions': batch.transactions.all().order_by('sequence_number'),
+        'transactions': batch_transaction_page(request, batch),
+        'transaction_count': transaction_count,
+        'scheme_breakdown': batch.transactions.breakdown_by_scheme(),
         'audit_logs': audit_logs,
         'total_amount': total_amount,
         'back_url': back_url,
@@ -190,8 +213,9 @@ def view_batch(request, batch_id):
 
 
 @login_required
+@revalidate_batch('preview')
 def preview_eft_file(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id)
+    batch = archive.get_batch(batch_id, EFTBatch.objects.for_export())
     user = request.user
     user_role = get_user_role(user)
 
@@ -252,16 +276,34 @@ def preview_eft_file(request, batch_id):
     return render(request, 'shared/preview_eft_file.html', context)
 
 
+def _file_from_job(batch, job_id, user):
+    """The file a finished generate_eft_file job of ``user`` stored on ``batch``, if it is still there."""
+    job = BackgroundJob.objects.filter(
+        id=job_id, name='generate_eft_file', status='SUCCEEDED', created_by=user,
+    ).first()
+    if job is None or job.kwargs.get('batch_id') != batch.id or not batch.generated_file:
+        return None
+    if hashlib.sha256(batch.generated_file.encode('utf-8')).hexdigest() != (job.result or {}).get('sha256'):
+        return None
+    return batch.generated_file
+
 @login_required
+@require_POST
+def generate_batch_file(request, batch_id):
+    """Build the EFT file on the job runner; poll the job, then export with ?job=<id>."""
+    batch = get_object_or_404(EFTBatch.objects.for_export(), id=batch_id)
+    if not can_export_files(request.user):
+        return JsonResponse({'success': False, 'error': 'You do not have permission to export this file.'}, status=403)
+    if batch.status not in ('APPROVED', 'EXPORTED'):
+        return JsonResponse({'success': False, 'error': 'Only approved batches can be exported.'}, status=400)
+    return job_accepted(jobs.enqueue('generate_eft_file', user=request.user, batch_id=batch.id))
+
+@login_required
+@revalidate_batch('export')
 def export_batch(request, batch_id, format='txt'):
-    batch = get_object_or_404(EFTBatch, id=batch_id)
-    user_role = get_user_role(request.user)
+    batch = archive.get_batch(batch_id, EFTBatch.objects.for_export())
 
-    can_export = (
-        request.user.has_perm('eft_app.can_export_eft') or
-        user_role in ['accounts', 'director', 'admin']
-    )
-    if not can_export:
+    if not can_export_files(request.user):
         messages.error(request, 'You do not have permission to export this file.')
         return redirect('view_batch', batch_id=batch.id)
 
@@ -273,29 +315,30 @@ def export_batch(request, batch_id, format='txt'):
         messages.error(request, 'Cannot export: No valid debit account found.')
         return redirect('view_batch', batch_id=batch.id)
 
-    try:
-        content = EFTGenerator.generate_eft_file(batch)
-    except Exception as e:
-        messages.error(request, f'Export failed: {str(e)}')
-        return redirect('view_batch', batch_id=batch.id)
+    # A file built by generate_batch_file is served as stored; otherwise build it now
+    job_id = request.GET.get('job', '')
+    content = _file_from_job(batch, job_id, request.user) if job_id.isdigit() else None
+    if content is None:
+        try:
+            content = EFTGenerator.generate_eft_file(batch)
+        except Exception as e:
+            messages.error(request, f'Export failed: {str(e)}')
+            return redirect('view_batch', batch_id=batch.id)
 
     filename = batch.get_obdx_filename(format)
     response = HttpResponse(content, content_type='application/octet-stream')
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     response['Content-Length'] = str(len(content.encode('utf-8')))
-    response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response['Pragma'] = 'no-cache'
-    response['Expires'] = '0'
 
     if batch.status == 'APPROVED':
-        batch.status = 'EXPORTED'
-        batch.save(update_fields=['status', 'updated_at'])
-        ApprovalAuditLog.objects.create(
-            batch=batch,
-            action='EXPORTED',
-            user=request.user,
-            remarks=f'Exported as {filename}',
-            ip_address=request.META.get('REMOTE_ADDR'),
+        # The exporting request is never revalidated (see conditional.py); don't keep it either
+        response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+        response['Pragma'] = 'no-cache'
+        response['Expires'] = '0'
+        # On conflict a concurrent export has already recorded it; the file is the same
+        transitions.apply(
+            batch, 'export', request.user,
+            remarks=f'Exported as {filename}', ip_address=request.META.get('REMOTE_ADDR'),
         )
 
     return response
@@ -304,9 +347,10 @@ def export_batch(request, batch_id, format='txt'):
 
 @login_required
 @user_passes_test(is_system_admin)
+@read_from_replica
 def admin_dashboard(request):
     try:
-        db_connected, db_error = check_database_connection()
+        db_connected, db_error = health.check_database()
         stats = {}
         try:
             stats = {
@@ -321,21 +365,21 @@ def admin_dashboard(request):
         except (OperationalError, DatabaseError):
             stats = {k: 0 for k in ['users_count', 'active_users_count', 'banks_count',
                                       'suppliers_count', 'zones_count', 'schemes_count', 'debit_accounts_count']}
-        uptime = calculate_uptime()
+        process = health.process_info()
         today = timezone.now().date()
         today_batches_count = 0
         last_batch = None
         try:
             today_batches_count = EFTBatch.objects.filter(created_at__date=today).count()
-            last_batch = EFTBatch.objects.order_by('-created_at').first()
+            last_batch = EFTBatch.objects.for_list().order_by('-created_at').first()
         except (OperationalError, DatabaseError):
             pass
         context = {
             'stats': stats, 'db_connected': db_connected,
             'db_error': db_error if not db_connected else None,
-            'uptime': uptime, 'today_batches_count': today_batches_count,
+            'uptime': process['uptime'], 'process': process, 'today_batches_count': today_batches_count,
             'last_batch': last_batch, 'current_date': timezone.now(),
-            'python_version': platform.python_version(), 'django_version': '5.0.6',
+            'python_version': process['python_version'], 'django_version': process['django_version'],
             'debug': settings.DEBUG,
         }
         return render(request, 'admin/dashboard.html', context)
@@ -343,89 +387,176 @@ def admin_dashboard(request):
         context = {
             'stats': {k: 0 for k in ['users_count', 'active_users_count', 'banks_count',
                                        'suppliers_count', 'zones_count', 'schemes_count', 'debit_accounts_count']},
-            'db_connected': False, 'db_error': str(e), 'uptime': '1 day',
+            'db_connected': False, 'db_error': str(e), 'uptime': health.format_uptime(health.uptime_seconds()),
             'today_batches_count': 0, 'last_batch': None, 'current_date': timezone.now(),
             'python_version': 'Unknown', 'django_version': 'Unknown', 'debug': settings.DEBUG,
         }
         return render(request, 'admin/dashboard.html', context)
 
-@login_required
-@user_passes_test(is_system_admin)
-def api_system_activity(request):
+def _system_activity():
+    activities = []
+    db_connected, _ = health.check_database()
+    if not db_connected:
+        return {'success': False, 'error': 'Database not connected', 'activities': []}
     try:
-        activities = []
-        db_connected, _ = check_database_connection()
-        if not db_connected:
-            return JsonResponse({'success': False, 'error': 'Database not connected', 'activities': []})
-        try:
-            for user in User.objects.order_by('-date_joined')[:3]:
-                activities.append({
-                    'icon': 'fas fa-user-plus', 'icon_color': 'bg-success',
-                    'title': 'New User Registration',
-                    'description': f'User "{user.get_full_name() or user.username}" registered',
-                    'time': format_time_ago(user.date_joined)
-                })
-        except: pass
-        try:
-            for bank in Bank.objects.order_by('-created_at')[:2]:
-                activities.append({
-                    'icon': 'fas fa-university', 'icon_color': 'bg-primary',
-                    'title': 'Bank Added',
-                    'description': f'Bank "{bank.bank_name}" configured',
-                    'time': format_time_ago(bank.created_at) if bank.created_at else 'Recently'
-                })
-        except: pass
-        try:
-            for batch in EFTBatch.objects.filter(status__in=['APPROVED', 'EXPORTED']).order_by('-approved_at')[:3]:
-                activities.append({
-                    'icon': 'fas fa-file-invoice-dollar', 'icon_color': 'bg-warning',
-                    'title': 'EFT Batch Approved',
-                    'description': f'Batch "{batch.batch_name}" approved',
-                    'time': format_time_ago(batch.approved_at) if batch.approved_at else 'Recently'
-                })
-        except: pass
-        if not activities:
+        for user in User.objects.order_by('-date_joined')[:3]:
             activities.append({
-                'icon': 'fas fa-info-circle', 'icon_color': 'bg-info',
-                'title': 'System Ready', 'description': 'CRWB EFT System is operational',
-                'time': 'Just now'
+                'icon': 'fas fa-user-plus', 'icon_color': 'bg-success',
+                'title': 'New User Registration',
+                'description': f'User "{user.get_full_name() or user.username}" registered',
+                'time': format_time_ago(user.date_joined)
             })
-        return JsonResponse({
-            'success': True, 'activities': activities[:10],
-            'timestamp': timezone.now().isoformat(), 'db_connected': db_connected
+    except: pass
+    try:
+        for bank in Bank.objects.order_by('-created_at')[:2]:
+            activities.append({
+                'icon': 'fas fa-university', 'icon_color': 'bg-primary',
+                'title': 'Bank Added',
+                'description': f'Bank "{bank.bank_name}" configured',
+                'time': format_time_ago(bank.created_at) if bank.created_at else 'Recently'
+            })
+    except: pass
+    try:
+        for batch in EFTBatch.objects.for_list().filter(status__in=['APPROVED', 'EXPORTED']).order_by('-approved_at')[:3]:
+            activities.append({
+                'icon': 'fas fa-file-invoice-dollar', 'icon_color': 'bg-warning',
+                'title': 'EFT Batch Approved',
+                'description': f'Batch "{batch.batch_name}" approved',
+                'time': format_time_ago(batch.approved_at) if batch.approved_at else 'Recently'
+            })
+    except: pass
+    if not activities:
+        activities.append({
+            'icon': 'fas fa-info-circle', 'icon_color': 'bg-info',
+            'title': 'System Ready', 'description': 'CRWB EFT System is operational',
+            'time': 'Just now'
         })
+    return {
+        'success': True, 'activities': activities[:10],
+        'timestamp': timezone.now().isoformat(), 'db_connected': db_connected
+    }
+
+def _system_status():
+    db_connected, db_error = health.check_database()
+    active_users = 0
+    if db_connected:
+        try:
+            active_users = User.objects.filter(is_active=True).count()
+        except: pass
+    return {
+        'success': True,
+        'system_info': {
+            'python_version': platform.python_version(), 'django_version': django.get_version(),
+            'os': platform.system(), 'server_time': timezone.now().isoformat(),
+        },
+        'database_connected': db_connected,
+        'database_error': db_error if not db_connected else None,
+        'active_users': active_users, 'server_time': timezone.now().isoformat(),
+    }
+
+# Polled by every open admin dashboard: served from the cache for
+# EFT_API_CACHE_SECONDS, with one recompute per expiry (see caching.py)
+@login_required
+@user_passes_test(is_system_admin)
+@read_from_replica
+def api_system_activity(request):
+    try:
+        return JsonResponse(caching.cache_aside(
+            'eft:api:system_activity', _system_activity, settings.EFT_API_CACHE_SECONDS,
+        ))
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e), 'activities': []}, status=500)
 
 @login_required
 @user_passes_test(is_system_admin)
+@read_from_replica
 def api_system_status(request):
     try:
-        db_connected, db_error = check_database_connection()
-        active_users = 0
-        if db_connected:
-            try:
-                active_users = User.objects.filter(is_active=True).count()
-            except: pass
+        status = caching.cache_aside('eft:api:system_status', _system_status, settings.EFT_API_CACHE_SECONDS)
+        # Process figures belong to the worker answering, so they are never cached
+        return JsonResponse({**status, 'process': health.process_info()})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+@login_required
+@user_passes_test(is_system_admin)
+@read_from_replica
+def api_dashboard_trends(request):
+    try:
+        days = min(max(int(request.GET.get('days', 90)), 1), 366)
+    except ValueError:
+        days = 90
+    try:
+        series = analytics.trend(days)
         return JsonResponse({
             'success': True,
-            'system_info': {
-                'python_version': platform.python_version(), 'django_version': '5.0.6',
-                'os': platform.system(), 'server_time': timezone.now().isoformat(),
+            'days': [row['day'].isoformat() for row in series],
+            'series': {
+                field: [float(row[field]) if field.startswith('amount_') else row[field] for row in series]
+                for field in analytics.METRIC_FIELDS
             },
-            'database_connected': db_connected,
-            'database_error': db_error if not db_connected else None,
-            'active_users': active_users, 'server_time': timezone.now().isoformat(),
         })
-    except Exception as e:
+    except (OperationalError, DatabaseError) as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+# ================ BACKGROUND JOBS ================
+
+def job_accepted(job):
+    """202 for work handed to the job runner (jobs.enqueue): the job id and where to poll it."""
+    status_url = reverse('job_status', args=[job.id])
+    response = JsonResponse({'success': True, 'job_id': job.id, 'status': job.status, 'status_url': status_url},
+                            status=202)
+    response['Location'] = status_url
+    return response
+
+@login_required
+def job_status(request, job_id):
+    job = BackgroundJob.objects.filter(id=job_id).first()
+    # Users see their own jobs; admins see every job
+    if job is None or (job.created_by_id != request.user.id and not is_system_admin(request.user)):
+        return JsonResponse({'success': False, 'error': 'Job not found'}, status=404)
+    return JsonResponse({'success': True, **jobs.describe(job)})
+
+def _iso_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+
+def _search_kind(value):
+    if value not in search.INDEXED:
+        raise ValueError(value)
+    return value
+
+# Maintenance jobs a system admin may start, with their accepted POST parameters
+ADMIN_JOBS = {
+    'archive_batches': {'months': int},
+    'rebuild_spend_rollups': {'date_from': _iso_date, 'date_to': _iso_date},
+    'record_daily_metrics': {'days': int},
+    'rebuild_supplier_stats': {},
+    'rebuild_search_index': {'kind': _search_kind},
+}
+
+@login_required
+@user_passes_test(is_system_admin)
+@require_POST
+def api_enqueue_job(request, name):
+    if name not in ADMIN_JOBS:
+        return JsonResponse({'success': False, 'error': f"Unknown job '{name}'"}, status=404)
+    kwargs = {}
+    for param, parse in ADMIN_JOBS[name].items():
+        value = request.POST.get(param)
+        if not value:
+            continue
+        try:
+            kwargs[param] = parse(value)
+        except ValueError:
+            return JsonResponse({'success': False, 'error': f"Invalid {param}: '{value}'"}, status=400)
+    return job_accepted(jobs.enqueue(name, user=request.user, **kwargs))
+
 # ================ USER MANAGEMENT VIEWS ================
 
 @login_required
 @user_passes_test(is_system_admin)
 def user_list(request):
-    users = User.objects.all().order_by('-date_joined')
+    users = User.objects.all().prefetch_related('groups').order_by('-date_joined')
     query = request.GET.get('q')
     if query:
         users = users.filter(
@@ -593,16 +724,18 @@ def user_toggle_status(request, user_id):
 
 @login_required
 @user_passes_test(is_system_admin)
+@read_from_replica
 def export_users(request):
     format = request.GET.get('format', 'csv')
-    users = User.objects.all().order_by('-date_joined')
+    users = User.objects.all().prefetch_related('groups').order_by('-date_joined')
     if format == 'csv':
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="users.csv"'
         writer = csv.writer(response)
         writer.writerow(['Username', 'Full Name', 'Email', 'Role', 'Status', 'Last Login', 'Date Joined'])
         for user in users:
-            role = 'Superuser' if user.is_superuser else (user.groups.first().name if user.groups.exists() else 'No Role')
+            groups = user.groups.all()
+            role = 'Superuser' if user.is_superuser else (groups[0].name if groups else 'No Role')
             writer.writerow([
                 user.username, user.get_full_name(), user.email, role,
                 'Active' if user.is_active else 'Inactive',
@@ -618,7 +751,8 @@ def export_users(request):
         for col_num, col in enumerate(['Username', 'Full Name', 'Email', 'Role', 'Status', 'Last Login', 'Date Joined']):
             ws.write(0, col_num, col)
         for row_num, user in enumerate(users, 1):
-            role = 'Superuser' if user.is_superuser else (user.groups.first().name if user.groups.exists() else 'No Role')
+            groups = user.groups.all()
+            role = 'Superuser' if user.is_superuser else (groups[0].name if groups else 'No Role')
             ws.write(row_num, 0, user.username)
             ws.write(row_num, 1, user.get_full_name() or '')
             ws.write(row_num, 2, user.email or '')
@@ -740,9 +874,10 @@ def bank_toggle_status(request, pk):
 
 @login_required
 @user_passes_test(is_system_admin)
+@read_from_replica
 def export_banks(request):
     format = request.GET.get('format', 'csv')
-    banks = Bank.objects.all().order_by('bank_name')
+    banks = Bank.objects.all().select_related('created_by').order_by('bank_name')
     if format == 'csv':
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="banks.csv"'
@@ -779,6 +914,7 @@ def export_banks(request):
 def bank_bulk_activate(request):
     bank_ids = request.POST.getlist('bank_ids')
     Bank.objects.filter(id__in=bank_ids).update(is_active=True)
+    reference_data.bump()
     messages.success(request, f'{len(bank_ids)} bank(s) activated')
     return redirect(request.POST.get('next', 'bank_list'))
 
@@ -788,6 +924,7 @@ def bank_bulk_activate(request):
 def bank_bulk_deactivate(request):
     bank_ids = request.POST.getlist('bank_ids')
     Bank.objects.filter(id__in=bank_ids).update(is_active=False)
+    reference_data.bump()
     messages.success(request, f'{len(bank_ids)} bank(s) deactivated')
     return redirect(request.POST.get('next', 'bank_list'))
 
@@ -809,7 +946,7 @@ class ZoneListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     permission_required = 'eft_app.view_zone'
     paginate_by = 20
     def get_queryset(self):
-        queryset = Zone.objects.all()
+        queryset = Zone.objects.annotate(scheme_count=Count('schemes'))
         query = self.request.GET.get('q')
         if query:
             queryset = queryset.filter(Q(zone_code__icontains=query) | Q(zone_name__icontains=query))
@@ -881,6 +1018,7 @@ def zone_toggle_status(request, pk):
 
 @login_required
 @user_passes_test(is_system_admin)
+@read_from_replica
 def export_zones(request):
     zones = Zone.objects.all().order_by('zone_code')
     response = HttpResponse(content_type='text/csv')
@@ -900,6 +1038,7 @@ def export_zones(request):
 @require_POST
 def zone_bulk_activate(request):
     Zone.objects.filter(id__in=request.POST.getlist('zone_ids')).update(is_active=True)
+    reference_data.bump()
     messages.success(request, 'Zones activated')
     return redirect(request.POST.get('next', 'zone_list'))
 
@@ -908,6 +1047,7 @@ def zone_bulk_activate(request):
 @require_POST
 def zone_bulk_deactivate(request):
     Zone.objects.filter(id__in=request.POST.getlist('zone_ids')).update(is_active=False)
+    reference_data.bump()
     messages.success(request, 'Zones deactivated')
     return redirect(request.POST.get('next', 'zone_list'))
 
@@ -928,21 +1068,26 @@ class SupplierListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     permission_required = 'eft_app.view_supplier'
     paginate_by = 20
     def get_queryset(self):
-        queryset = Supplier.objects.all().select_related('bank', 'created_by')
-        query = self.request.GET.get('q')
-        if query:
-            queryset = queryset.filter(
-                Q(supplier_code__icontains=query) | Q(supplier_name__icontains=query) |
-                Q(account_number__icontains=query) | Q(account_name__icontains=query)
-            )
+        queryset = Supplier.objects.all().select_related('bank', 'created_by', 'payment_stats')
         bank_id = self.request.GET.get('bank')
         if bank_id: queryset = queryset.filter(bank_id=bank_id)
         status = self.request.GET.get('status')
         if status == 'active': queryset = queryset.filter(is_active=True)
         elif status == 'inactive': queryset = queryset.filter(is_active=False)
+        query = self.request.GET.get('q')
+        ranked = search.ranked_ids('supplier', query, within=queryset) if query else None
+        if ranked is not None:
+            queryset = queryset.filter(pk__in=ranked)
+        elif query:
+            queryset = queryset.filter(
+                Q(supplier_code__icontains=query) | Q(supplier_name__icontains=query) |
+                Q(account_number__icontains=query) | Q(account_name__icontains=query)
+            )
         sort_field = self.request.GET.get('sort', 'created_at')
         order = self.request.GET.get('order', 'desc')
-        if sort_field in ['supplier_code', 'supplier_name', 'is_active', 'created_at']:
+        if ranked and 'sort' not in self.request.GET:
+            queryset = queryset.order_by(search.rank_ordering(ranked))
+        elif sort_field in ['supplier_code', 'supplier_name', 'is_active', 'created_at']:
             if order == 'desc': sort_field = f'-{sort_field}'
             queryset = queryset.order_by(sort_field)
         return queryset
@@ -979,11 +1124,18 @@ class SupplierDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         supplier = self.get_object()
-        transactions = EFTTransaction.objects.filter(supplier=supplier).select_related('batch', 'scheme')
+        transactions = EFTTransaction.objects.filter(supplier=supplier).select_related(
+            'batch', 'scheme', 'zone', 'debit_account', 'supplier__bank'
+        ).defer(*[f'batch__{f}' for f in EFTBatchQuerySet.HEAVY_FIELDS])
+        page_obj = KeysetPaginator(transactions, 10).page(self.request.GET.get('cursor'))
+        payment_stats = supplier_stats(supplier)
         context.update({
-            'transactions': transactions[:10],
-            'total_payments': transactions.count(),
-            'total_amount': transactions.aggregate(Sum('amount'))['amount__sum'] or 0,
+            'transactions': page_obj,
+            'page_obj': page_obj,
+            'is_paginated': page_obj.has_other_pages,
+            'payment_stats': payment_stats,
+            'total_payments': payment_stats.payment_count,
+            'total_amount': payment_stats.lifetime_amount,
         })
         return context
 
@@ -1017,6 +1169,7 @@ def supplier_toggle_status(request, pk):
 
 @login_required
 @user_passes_test(is_system_admin)
+@read_from_replica
 def export_suppliers(request):
     suppliers = Supplier.objects.all().select_related('bank', 'created_by').order_by('supplier_name')
     response = HttpResponse(content_type='text/csv')
@@ -1035,6 +1188,7 @@ def export_suppliers(request):
 @require_POST
 def supplier_bulk_activate(request):
     Supplier.objects.filter(id__in=request.POST.getlist('supplier_ids')).update(is_active=True)
+    reference_data.bump()
     messages.success(request, 'Suppliers activated')
     return redirect(request.POST.get('next', 'supplier_list'))
 
@@ -1043,6 +1197,7 @@ def supplier_bulk_activate(request):
 @require_POST
 def supplier_bulk_deactivate(request):
     Supplier.objects.filter(id__in=request.POST.getlist('supplier_ids')).update(is_active=False)
+    reference_data.bump()
     messages.success(request, 'Suppliers deactivated')
     return redirect(request.POST.get('next', 'supplier_list'))
 
@@ -1138,6 +1293,7 @@ def scheme_toggle_status(request, pk):
 
 @login_required
 @user_passes_test(is_system_admin)
+@read_from_replica
 def export_schemes(request):
     schemes = Scheme.objects.all().select_related('zone').order_by('scheme_code')
     response = HttpResponse(content_type='text/csv')
@@ -1157,6 +1313,7 @@ def export_schemes(request):
 @require_POST
 def scheme_bulk_activate(request):
     Scheme.objects.filter(id__in=request.POST.getlist('scheme_ids')).update(is_active=True)
+    reference_data.bump()
     messages.success(request, 'Schemes activated')
     return redirect(request.POST.get('next', 'scheme_list'))
 
@@ -1165,6 +1322,7 @@ def scheme_bulk_activate(request):
 @require_POST
 def scheme_bulk_deactivate(request):
     Scheme.objects.filter(id__in=request.POST.getlist('scheme_ids')).update(is_active=False)
+    reference_data.bump()
     messages.success(request, 'Schemes deactivated')
     return redirect(request.POST.get('next', 'scheme_list'))
 
@@ -1219,6 +1377,7 @@ def debit_account_toggle_status(request, pk):
 
 @login_required
 @user_passes_test(is_system_admin)
+@read_from_replica
 def export_debit_accounts(request):
     accounts = DebitAccount.objects.all().order_by('account_number')
     response = HttpResponse(content_type='text/csv')
@@ -1237,6 +1396,7 @@ def export_debit_accounts(request):
 @require_POST
 def debit_account_bulk_activate(request):
     DebitAccount.objects.filter(id__in=request.POST.getlist('account_ids')).update(is_active=True)
+    reference_data.bump()
     messages.success(request, 'Accounts activated')
     return redirect(request.POST.get('next', 'debit_account_list'))
 
@@ -1245,6 +1405,7 @@ def debit_account_bulk_activate(request):
 @require_POST
 def debit_account_bulk_deactivate(request):
     DebitAccount.objects.filter(id__in=request.POST.getlist('account_ids')).update(is_active=False)
+    reference_data.bump()
     messages.success(request, 'Accounts deactivated')
     return redirect(request.POST.get('next', 'debit_account_list'))
 
@@ -1260,6 +1421,7 @@ def debit_account_bulk_delete(request):
 
 @login_required
 @user_passes_test(is_accounts_personnel)
+@read_from_replica
 def accounts_dashboard(request):
     user = request.user
     batches = EFTBatch.objects.filter(created_by=user)
@@ -1275,13 +1437,13 @@ def accounts_dashboard(request):
         'exported_batches': batches.filter(status='EXPORTED').count(),
         'total_amount': batches.filter(status__in=['APPROVED', 'EXPORTED']).aggregate(Sum('total_amount'))['total_amount__sum'] or 0,
     }
-    recent_batches = batches.order_by('-created_at')[:10]
+    recent_batches = batches.for_list().order_by('-created_at')[:10]
     return render(request, 'accounts/dashboard.html', {'stats': stats, 'recent_batches': recent_batches})
 
 @login_required
 @user_passes_test(is_accounts_personnel)
 def batch_list(request):
-    batches = EFTBatch.objects.filter(created_by=request.user).order_by('-created_at')
+    batches = EFTBatch.objects.for_list().filter(created_by=request.user).order_by('-created_at')
     status_filter = request.GET.get('status', '')
     
     if status_filter:
@@ -1291,26 +1453,25 @@ def batch_list(request):
         else:
             batches = batches.filter(status=status_filter)
     
-    search = request.GET.get('search')
-    if search:
-        batches = batches.filter(Q(batch_reference__icontains=search) | Q(batch_name__icontains=search))
+    search_query = request.GET.get('search')
+    if search_query:
+        matching = search.batch_ids(search_query, within=batches)
+        if matching is not None:
+            batches = batches.filter(pk__in=matching)
+        else:
+            batches = batches.filter(Q(batch_reference__icontains=search_query) | Q(batch_name__icontains=search_query))
     
     total_amount = batches.filter(status__in=['APPROVED', 'EXPORTED']).aggregate(Sum('total_amount'))['total_amount__sum'] or Decimal('0')
     all_my_batches = EFTBatch.objects.filter(created_by=request.user)
     
-    paginator = Paginator(batches, 20)
-    page = request.GET.get('page')
-    try:
-        page_obj = paginator.page(page)
-    except:
-        page_obj = paginator.page(1)
+    page_obj = KeysetPaginator(batches, 20).page(request.GET.get('cursor'))
     
     context = {
         'batches': page_obj,
         'page_obj': page_obj,
-        'is_paginated': paginator.num_pages > 1,
+        'is_paginated': page_obj.has_other_pages,
         'status_filter': status_filter,
-        'total_batches': batches.count(),
+        'total_batches': batches.count,  # evaluated only if the template shows it
         'total_amount': total_amount,
         'draft_count': all_my_batches.filter(status='DRAFT').count(),
         'pending_fm_count': all_my_batches.filter(status='PENDING_FM').count(),
@@ -1341,11 +1502,11 @@ def create_batch(request):
 @login_required
 @user_passes_test(is_accounts_personnel)
 def edit_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, created_by=request.user)
+    batch = get_object_or_404(EFTBatch.objects.for_review().with_line_totals(), id=batch_id, created_by=request.user)
     if batch.status != 'DRAFT':
         messages.error(request, 'Cannot edit a batch that is not in DRAFT status.')
         return redirect('accounts_dashboard')
-    transactions = batch.transactions.all().order_by('sequence_number')
+    transactions = batch_transactions(batch)
     if request.method == 'POST':
         form = EFTBatchForm(request.POST, instance=batch)
         if form.is_valid():
@@ -1357,13 +1518,15 @@ def edit_batch(request, batch_id):
     return render(request, 'accounts/edit_batch.html', {
         'batch': batch, 'transactions': transactions, 'form': form,
         'transaction_form': EFTTransactionForm(),
-        'total_amount': sum(t.amount for t in transactions)
+        # Keys the cached supplier/scheme/debit account <select> fragments
+        'refdata_version': reference_data.version(),
+        'total_amount': batch.line_total,
     })
 
 @login_required
 @user_passes_test(is_accounts_personnel)
 def add_transaction(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, created_by=request.user)
+    batch = get_object_or_404(EFTBatch.objects.for_review(), id=batch_id, created_by=request.user)
     if batch.status != 'DRAFT':
         return JsonResponse({'success': False, 'message': 'Batch not in DRAFT status'})
     if request.method == 'POST':
@@ -1387,40 +1550,48 @@ def add_transaction(request, batch_id):
 @login_required
 @user_passes_test(is_accounts_personnel)
 def delete_transaction(request, batch_id, transaction_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, created_by=request.user)
+    batch = get_object_or_404(EFTBatch.objects.for_review(), id=batch_id, created_by=request.user)
     if batch.status != 'DRAFT':
         return JsonResponse({'success': False, 'message': 'Batch not in DRAFT status'})
     transaction = get_object_or_404(EFTTransaction, id=transaction_id, batch=batch)
-    transaction.delete()
-    batch.update_totals()
-    for idx, t in enumerate(batch.transactions.all().order_by('id'), 1):
-        t.sequence_number = str(idx).zfill(4)
-        t.save()
+    with db_transaction.atomic():
+        transaction.delete()
+        # Close the gap in one statement; ascending order keeps (batch, sequence_number) unique
+        batch.transactions.filter(sequence_number__gt=transaction.sequence_number).order_by('sequence_number').update(
+            sequence_number=LPad(
+                Cast(Cast('sequence_number', IntegerField()) - 1, CharField()), 4, Value('0')
+            )
+        )
+        batch.update_totals()
     return JsonResponse({'success': True, 'batch_total': str(batch.total_amount), 'record_count': batch.record_count})
 
 @login_required
 @user_passes_test(is_accounts_personnel)
 def submit_for_approval(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, created_by=request.user)
+    batch = get_object_or_404(EFTBatch.objects.for_review(), id=batch_id, created_by=request.user)
     if batch.status != 'DRAFT':
         messages.error(request, 'Only DRAFT batches can be submitted.')
         return redirect('view_batch', batch_id=batch.id)
     if batch.transactions.count() == 0:
         messages.error(request, 'Cannot submit an empty batch.')
         return redirect('edit_batch', batch_id=batch.id)
-    batch.status = 'PENDING_FM'
-    batch.save()
-    ApprovalAuditLog.objects.create(batch=batch, action='SUBMITTED', user=request.user, ip_address=request.META.get('REMOTE_ADDR'))
+    result = transitions.apply(batch, 'submit', request.user, ip_address=request.META.get('REMOTE_ADDR'))
+    if not result.ok:
+        messages.error(request, result.message)
+        return redirect('view_batch', batch_id=batch.id)
     messages.success(request, 'Batch submitted to Finance Manager for review.')
     return redirect('accounts_dashboard')
 
 @login_required
 @require_POST
 def delete_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, created_by=request.user)
+    batch = get_object_or_404(EFTBatch.objects.for_review(), id=batch_id, created_by=request.user)
     if batch.status != 'DRAFT':
         messages.error(request, 'Only DRAFT batches can be deleted.')
         return redirect('batch_list')
+    if batch.audit_logs.exists():
+        messages.error(request, 'Batches with approval history cannot be deleted.')
+        return redirect('batch_list')
     batch.delete()
     messages.success(request, 'Batch deleted.')
     return redirect('batch_list')
@@ -1432,9 +1603,10 @@ def export_batch_details(request, batch_id):
 
 @login_required
 @user_passes_test(is_accounts_personnel)
+@read_from_replica
 def batch_export_all(request):
     format = request.GET.get('format', 'csv')
-    batches = EFTBatch.objects.filter(created_by=request.user).order_by('-created_at')
+    batches = EFTBatch.objects.for_list().filter(created_by=request.user).order_by('-created_at')
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="my_batches.csv"'
     writer = csv.writer(response)
@@ -1449,12 +1621,13 @@ def batch_export_all(request):
 
 @login_required
 @user_passes_test(is_accounts_personnel)
+@read_from_replica
 def batch_export_selected(request):
     batch_ids = request.GET.getlist('batch_ids')
     if not batch_ids:
         messages.error(request, 'No batches selected')
         return redirect('batch_list')
-    batches = EFTBatch.objects.filter(id__in=batch_ids, created_by=request.user).order_by('-created_at')
+    batches = EFTBatch.objects.for_list().filter(id__in=batch_ids, created_by=request.user).order_by('-created_at')
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="selected_batches.csv"'
     writer = csv.writer(response)
@@ -1470,8 +1643,11 @@ def batch_export_selected(request):
 @user_passes_test(is_accounts_personnel)
 @require_POST
 def batch_bulk_delete(request):
-    batch_ids = request.POST.getlist('batch_ids')
-    count = EFTBatch.objects.filter(id__in=batch_ids, created_by=request.user, status='DRAFT').delete()[0]
+    batch_ids = selected_batch_ids(request)
+    count = EFTBatch.objects.filter(
+        ~Exists(ApprovalAuditLog.objects.filter(batch=OuterRef('pk'))),
+        id__in=batch_ids, created_by=request.user, status='DRAFT',
+    ).delete()[0]
     messages.success(request, f'{count} draft batch(es) deleted')
     return redirect(request.POST.get('next', 'batch_list'))
 
@@ -1479,9 +1655,10 @@ def batch_bulk_delete(request):
 
 @login_required
 @user_passes_test(is_finance_manager)
+@read_from_replica
 def fm_dashboard(request):
-    pending = EFTBatch.objects.filter(status='PENDING_FM').order_by('-created_at')
-    recent = EFTBatch.objects.filter(
+    pending = EFTBatch.objects.for_list().filter(status='PENDING_FM').order_by('-created_at')
+    recent = EFTBatch.objects.for_list().filter(
         status__in=['PENDING_DIRECTOR', 'APPROVED', 'REJECTED', 'EXPORTED'],
         fm_reviewed_by=request.user
     ).order_by('-fm_reviewed_at')[:10]
@@ -1503,7 +1680,7 @@ def fm_dashboard(request):
 @login_required
 @user_passes_test(is_finance_manager)
 def fm_batch_list(request):
-    batches = EFTBatch.objects.exclude(status='DRAFT').order_by('-created_at')
+    batches = EFTBatch.objects.for_list().exclude(status='DRAFT').order_by('-created_at')
     status_filter = request.GET.get('status', '')
     
     if status_filter:
@@ -1517,9 +1694,12 @@ def fm_batch_list(request):
     approved_count = EFTBatch.objects.filter(status__in=['APPROVED', 'EXPORTED']).count()
     exported_count = EFTBatch.objects.filter(status='EXPORTED').count()
     pending_fm_count = EFTBatch.objects.filter(status='PENDING_FM').count()
+    page_obj = KeysetPaginator(batches, 20).page(request.GET.get('cursor'))
     
     return render(request, 'finance_manager/batch_list.html', {
-        'batches': batches,
+        'batches': page_obj,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages,
         'status_filter': status_filter,
         'pending_fm_count': pending_fm_count,
         'approved_count': approved_count,
@@ -1529,38 +1709,40 @@ def fm_batch_list(request):
 @login_required
 @user_passes_test(is_finance_manager)
 def fm_review_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, status='PENDING_FM')
+    batch = get_object_or_404(EFTBatch.objects.for_review().with_line_totals(), id=batch_id, status='PENDING_FM')
     if batch.created_by == request.user:
         messages.error(request, 'You cannot review your own batch.')
         return redirect('fm_dashboard')
     return render(request, 'finance_manager/review_batch.html', {
         'batch': batch,
-        'transactions': batch.transactions.all().order_by('sequence_number'),
-        'audit_logs': batch.audit_logs.all().order_by('timestamp'),
-        'approval_form': BatchApprovalForm(),
-        'rejection_form': BatchRejectionForm(),
-        'total_amount': sum(t.amount for t in batch.transactions.all()),
+        'transactions': batch_transaction_page(request, batch),
+        'transaction_count': batch.line_count,
+        'scheme_breakdown': batch.transactions.breakdown_by_scheme(),
+        'audit_logs': batch.audit_logs.select_related('user').order_by('timestamp'),
+        'approval_form': BatchApprovalForm(initial={'version': batch.version}),
+        'rejection_form': BatchRejectionForm(initial={'version': batch.version}),
+        'total_amount': batch.line_total,
     })
 
 @login_required
 @user_passes_test(is_finance_manager)
 def fm_forward_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, status='PENDING_FM')
+    # No status filter: a batch someone else has moved gets transitions' conflict message
+    batch = get_object_or_404(EFTBatch.objects.for_review(), id=batch_id)
     if batch.created_by == request.user:
         messages.error(request, 'You cannot forward your own batch.')
         return redirect('fm_dashboard')
     if request.method == 'POST':
         form = BatchApprovalForm(request.POST)
         if form.is_valid():
-            batch.status = 'PENDING_DIRECTOR'
-            batch.fm_reviewed_by = request.user
-            batch.fm_reviewed_at = timezone.now()
-            batch.fm_remarks = form.cleaned_data.get('remarks', '')
-            batch.save()
-            ApprovalAuditLog.objects.create(
-                batch=batch, action='FM_REVIEWED', user=request.user,
-                remarks=batch.fm_remarks, ip_address=request.META.get('REMOTE_ADDR')
+            result = transitions.apply(
+                batch, 'fm_forward', request.user,
+                remarks=form.cleaned_data.get('remarks', ''), ip_address=request.META.get('REMOTE_ADDR'),
+                expected_version=form.cleaned_data.get('version'),
             )
+            if not result.ok:
+                messages.error(request, result.message)
+                return redirect('fm_dashboard')
             messages.success(request, f'Batch {batch.batch_reference} forwarded to Director of Finance.')
             return redirect('fm_dashboard')
     return redirect('fm_review_batch', batch_id=batch_id)
@@ -1568,22 +1750,22 @@ def fm_forward_batch(request, batch_id):
 @login_required
 @user_passes_test(is_finance_manager)
 def fm_reject_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, status='PENDING_FM')
+    # No status filter: a batch someone else has moved gets transitions' conflict message
+    batch = get_object_or_404(EFTBatch.objects.for_review(), id=batch_id)
     if batch.created_by == request.user:
         messages.error(request, 'You cannot reject your own batch.')
         return redirect('fm_dashboard')
     if request.method == 'POST':
         form = BatchRejectionForm(request.POST)
         if form.is_valid():
-            batch.status = 'REJECTED'
-            batch.rejection_reason = form.cleaned_data['rejection_reason']
-            batch.fm_reviewed_by = request.user
-            batch.fm_reviewed_at = timezone.now()
-            batch.save()
-            ApprovalAuditLog.objects.create(
-                batch=batch, action='FM_REJECTED', user=request.user,
-                remarks=batch.rejection_reason, ip_address=request.META.get('REMOTE_ADDR')
+            result = transitions.apply(
+                batch, 'fm_reject', request.user,
+                remarks=form.cleaned_data['rejection_reason'], ip_address=request.META.get('REMOTE_ADDR'),
+                expected_version=form.cleaned_data.get('version'),
             )
+            if not result.ok:
+                messages.error(request, result.message)
+                return redirect('fm_dashboard')
             messages.success(request, f'Batch {batch.batch_reference} has been rejected.')
             return redirect('fm_dashboard')
     return redirect('fm_review_batch', batch_id=batch_id)
@@ -1592,9 +1774,10 @@ def fm_reject_batch(request, batch_id):
 
 @login_required
 @user_passes_test(is_director_of_finance)
+@read_from_replica
 def director_dashboard(request):
-    pending = EFTBatch.objects.filter(status='PENDING_DIRECTOR').order_by('-created_at')
-    recent = EFTBatch.objects.filter(
+    pending = EFTBatch.objects.for_list().filter(status='PENDING_DIRECTOR').order_by('-created_at')
+    recent = EFTBatch.objects.for_list().filter(
         status__in=['APPROVED', 'REJECTED', 'EXPORTED'], approved_by=request.user
     ).order_by('-approved_at')[:10]
     
@@ -1613,7 +1796,7 @@ def director_dashboard(request):
 @login_required
 @user_passes_test(is_director_of_finance)
 def director_batch_list(request):
-    batches = EFTBatch.objects.exclude(status='DRAFT').order_by('-created_at')
+    batches = EFTBatch.objects.for_list().exclude(status='DRAFT').order_by('-created_at')
     status_filter = request.GET.get('status', '')
     
     if status_filter:
@@ -1627,9 +1810,12 @@ def director_batch_list(request):
     approved_count = EFTBatch.objects.filter(status__in=['APPROVED', 'EXPORTED']).count()
     exported_count = EFTBatch.objects.filter(status='EXPORTED').count()
     pending_count = EFTBatch.objects.filter(status='PENDING_DIRECTOR').count()
+    page_obj = KeysetPaginator(batches, 20).page(request.GET.get('cursor'))
     
     return render(request, 'director/batch_list.html', {
-        'batches': batches,
+        'batches': page_obj,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages,
         'status_filter': status_filter,
         'pending_count': pending_count,
         'approved_count': approved_count,
@@ -1639,23 +1825,25 @@ def director_batch_list(request):
 @login_required
 @user_passes_test(is_director_of_finance)
 def director_review_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, status='PENDING_DIRECTOR')
+    batch = get_object_or_404(EFTBatch.objects.for_review().with_line_totals(), id=batch_id, status='PENDING_DIRECTOR')
     if batch.created_by == request.user:
         messages.error(request, 'You cannot approve your own batch.')
         return redirect('director_dashboard')
     return render(request, 'director/review_batch.html', {
         'batch': batch,
-        'transactions': batch.transactions.all().order_by('sequence_number'),
-        'audit_logs': batch.audit_logs.all().order_by('timestamp'),
-        'approval_form': BatchApprovalForm(),
-        'rejection_form': BatchRejectionForm(),
-        'total_amount': sum(t.amount for t in batch.transactions.all()),
+        'transactions': batch_transaction_page(request, batch),
+        'transaction_count': batch.line_count,
+        'scheme_breakdown': batch.transactions.breakdown_by_scheme(),
+        'audit_logs': batch.audit_logs.select_related('user').order_by('timestamp'),
+        'approval_form': BatchApprovalForm(initial={'version': batch.version}),
+        'rejection_form': BatchRejectionForm(initial={'version': batch.version}),
+        'total_amount': batch.line_total,
     })
 
 @login_required
 @user_passes_test(is_director_of_finance)
 def director_approve_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id)
+    batch = get_object_or_404(EFTBatch.objects.for_review(), id=batch_id)
     if batch.status != 'PENDING_DIRECTOR':
         messages.error(request, f'Batch is not pending director approval. Current status: {batch.get_status_display()}')
         return redirect('director_dashboard')
@@ -1665,16 +1853,14 @@ def director_approve_batch(request, batch_id):
     if request.method == 'POST':
         form = BatchApprovalForm(request.POST)
         if form.is_valid():
-            batch.status = 'APPROVED'
-            batch.approved_by = request.user
-            batch.approved_at = timezone.now()
-            batch.remarks = form.cleaned_data.get('remarks', '')
-            batch.save()
-            ApprovalAuditLog.objects.create(
-                batch=batch, action='APPROVED', user=request.user,
-                remarks=form.cleaned_data.get('remarks', ''),
-                ip_address=request.META.get('REMOTE_ADDR')
+            result = transitions.apply(
+                batch, 'director_approve', request.user,
+                remarks=form.cleaned_data.get('remarks', ''), ip_address=request.META.get('REMOTE_ADDR'),
+                expected_version=form.cleaned_data.get('version'),
             )
+            if not result.ok:
+                messages.error(request, result.message)
+                return redirect('director_dashboard')
             messages.success(request, mark_safe(
                 f'Batch <strong>{batch.batch_reference}</strong> approved. Ready to export as <code>{batch.get_obdx_filename()}</code>.'
             ))
@@ -1684,22 +1870,22 @@ def director_approve_batch(request, batch_id):
 @login_required
 @user_passes_test(is_director_of_finance)
 def director_reject_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, status='PENDING_DIRECTOR')
+    # No status filter: a batch someone else has moved gets transitions' conflict message
+    batch = get_object_or_404(EFTBatch.objects.for_review(), id=batch_id)
     if batch.created_by == request.user:
         messages.error(request, 'You cannot reject your own batch.')
         return redirect('director_dashboard')
     if request.method == 'POST':
         form = BatchRejectionForm(request.POST)
         if form.is_valid():
-            batch.status = 'REJECTED'
-            batch.rejection_reason = form.cleaned_data['rejection_reason']
-            batch.approved_by = request.user
-            batch.approved_at = timezone.now()
-            batch.save()
-            ApprovalAuditLog.objects.create(
-                batch=batch, action='REJECTED', user=request.user,
-                remarks=batch.rejection_reason, ip_address=request.META.get('REMOTE_ADDR')
+            result = transitions.apply(
+                batch, 'director_reject', request.user,
+                remarks=form.cleaned_data['rejection_reason'], ip_address=request.META.get('REMOTE_ADDR'),
+                expected_version=form.cleaned_data.get('version'),
             )
+            if not result.ok:
+                messages.error(request, result.message)
+                return redirect('director_dashboard')
             messages.success(request, f'Batch {batch.batch_reference} has been rejected.')
             return redirect('director_dashboard')
     return redirect('director_review_batch', batch_id=batch_id)
@@ -1716,99 +1902,246 @@ def authorizer_dashboard(request):
 
 @login_required
 def authorizer_batch_list(request):
-    batches = EFTBatch.objects.exclude(status='DRAFT').order_by('-created_at')
-    return render(request, 'authorizer/batch_list.html', {'batches': batches})
+    batches = EFTBatch.objects.for_list().exclude(status='DRAFT')
+    page_obj = KeysetPaginator(batches, 20).page(request.GET.get('cursor'))
+    return render(request, 'authorizer/batch_list.html', {
+        'batches': page_obj, 'page_obj': page_obj, 'is_paginated': page_obj.has_other_pages,
+    })
 
 @login_required
 def review_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, status__in=['PENDING_FM', 'PENDING_DIRECTOR'])
+    batch = get_object_or_404(EFTBatch.objects.for_review().with_line_totals(), id=batch_id, status__in=['PENDING_FM', 'PENDING_DIRECTOR'])
     if batch.created_by == request.user:
         messages.error(request, 'You cannot review your own batch.')
         return redirect('authorizer_dashboard')
     return render(request, 'authorizer/review_batch.html', {
         'batch': batch,
-        'transactions': batch.transactions.all().order_by('sequence_number'),
-        'total_amount': sum(t.amount for t in batch.transactions.all()),
-        'approval_form': BatchApprovalForm(),
-        'rejection_form': BatchRejectionForm(),
+        'transactions': batch_transaction_page(request, batch),
+        'transaction_count': batch.line_count,
+        'scheme_breakdown': batch.transactions.breakdown_by_scheme(),
+        'total_amount': batch.line_total,
+        'approval_form': BatchApprovalForm(initial={'version': batch.version}),
+        'rejection_form': BatchRejectionForm(initial={'version': batch.version}),
     })
 
 @login_required
 def approve_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, status__in=['PENDING_FM', 'PENDING_DIRECTOR'])
+    batch = get_object_or_404(EFTBatch.objects.for_review(), id=batch_id, status__in=['PENDING_FM', 'PENDING_DIRECTOR'])
     if batch.created_by == request.user:
         messages.error(request, 'You cannot approve your own batch.')
         return redirect('authorizer_dashboard')
     if request.method == 'POST':
-        if batch.status == 'PENDING_FM':
-            batch.status = 'PENDING_DIRECTOR'
-            batch.fm_reviewed_by = request.user
-            batch.fm_reviewed_at = timezone.now()
+        name = 'fm_forward' if batch.status == 'PENDING_FM' else 'director_approve'
+        result = transitions.apply(
+            batch, name, request.user,
+            remarks=request.POST.get('remarks', ''), ip_address=request.META.get('REMOTE_ADDR'),
+            expected_version=posted_version(request),
+        )
+        if not result.ok:
+            messages.error(request, result.message)
+        elif name == 'fm_forward':
             messages.success(request, 'Batch forwarded to Director.')
         else:
-            batch.status = 'APPROVED'
-            batch.approved_by = request.user
-            batch.approved_at = timezone.now()
             messages.success(request, 'Batch approved.')
-        batch.save()
         return redirect('authorizer_dashboard')
     return redirect('review_batch', batch_id=batch_id)
 
 @login_required
 def reject_batch(request, batch_id):
-    batch = get_object_or_404(EFTBatch, id=batch_id, status__in=['PENDING_FM', 'PENDING_DIRECTOR'])
+    batch = get_object_or_404(EFTBatch.objects.for_review(), id=batch_id, status__in=['PENDING_FM', 'PENDING_DIRECTOR'])
     if batch.created_by == request.user:
         messages.error(request, 'You cannot reject your own batch.')
         return redirect('authorizer_dashboard')
     if request.method == 'POST':
-        batch.status = 'REJECTED'
-        batch.rejection_reason = request.POST.get('rejection_reason', '')
-        batch.save()
-        messages.success(request, 'Batch rejected.')
+        result = transitions.apply(
+            batch, 'fm_reject' if batch.status == 'PENDING_FM' else 'director_reject', request.user,
+            remarks=request.POST.get('rejection_reason', ''), ip_address=request.META.get('REMOTE_ADDR'),
+            expected_version=posted_version(request),
+        )
+        if result.ok:
+            messages.success(request, 'Batch rejected.')
+        else:
+            messages.error(request, result.message)
         return redirect('authorizer_dashboard')
     return redirect('review_batch', batch_id=batch_id)
 
+# ================ REPORTING VIEWS ================
+
+def _report_date(value, default):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else default
+    except ValueError:
+        return default
+
+def _report_id(value):
+    # Hand-edited query strings are ignored rather than failing the report
+    return int(value) if value and value.isdigit() else None
+
+@login_required
+@user_passes_test(can_view_reports)
+@read_from_replica
+def spend_report(request):
+    default_from, default_to = analytics.default_period()
+    date_from = _report_date(request.GET.get('date_from'), default_from)
+    date_to = _report_date(request.GET.get('date_to'), default_to)
+    group_by = request.GET.get('group_by', 'month')
+    if group_by not in analytics.GROUPINGS:
+        group_by = 'month'
+    filters = {}
+    zone_id = _report_id(request.GET.get('zone'))
+    if zone_id is not None:
+        filters['zone_id'] = zone_id
+    scheme_id = _report_id(request.GET.get('scheme'))
+    if scheme_id is not None:
+        filters['scheme_id'] = scheme_id
+    if request.GET.get('file_type') in dict(EFTBatch.FILE_TYPE_CHOICES):
+        filters['file_type'] = request.GET['file_type']
+
+    rows = analytics.spend_report(date_from, date_to, group_by, filters)
+    for row in rows:
+        if group_by == 'month':
+            row['label'] = row['month'].strftime('%b %Y')
+        elif group_by == 'zone':
+            row['label'] = f"{row['zone__zone_code']} - {row['zone__zone_name']}"
+        elif group_by == 'scheme':
+            row['label'] = f"{row['scheme__scheme_code']} - {row['scheme__scheme_name']}"
+        elif group_by == 'file_type':
+            row['label'] = dict(EFTBatch.FILE_TYPE_CHOICES).get(row['file_type'], row['file_type'])
+        else:
+            row['label'] = row['cost_center'] or '(none)'
+    group_label = analytics.GROUPINGS[group_by][0]
+
+    if request.GET.get('format') == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = (
+            f'attachment; filename="spend_by_{group_by}_{date_from:%Y%m%d}_{date_to:%Y%m%d}.csv"'
+        )
+        writer = csv.writer(response)
+        writer.writerow([group_label, 'Transactions', 'Amount (MWK)'])
+        for row in rows:
+            writer.writerow([row['label'], row['line_count'], str(row['amount'])])
+        return response
+
+    return render(request, 'admin/spend_report.html', {
+        'rows': rows,
+        'group_by': group_by,
+        'group_label': group_label,
+        'groupings': [(key, label) for key, (label, _) in analytics.GROUPINGS.items()],
+        'date_from': date_from,
+        'date_to': date_to,
+        'zones': Zone.objects.order_by('zone_code'),
+        'schemes': Scheme.objects.order_by('scheme_code'),
+        'file_types': EFTBatch.FILE_TYPE_CHOICES,
+        'total_count': sum(row['line_count'] for row in rows),
+        'total_amount': sum((row['amount'] for row in rows), Decimal('0')),
+    })
+
 # ================ API VIEWS ================
+#
+# Transaction-entry lookups, served from the reference-data snapshot. Each
+# has an async twin (a-prefixed) for ASGI deployments; urls.py routes to
+# those when settings.EFT_ASYNC_LOOKUPS is on.
+
+def _supplier_details(supplier, bank):
+    if supplier is None:
+        return JsonResponse({'error': 'Supplier not found'}, status=404)
+    return JsonResponse({
+        'bank_name': bank.bank_name if bank else '',
+        'swift_code': bank.swift_code if bank else '',
+        'account_number': supplier.account_number,
+        'account_name': supplier.account_name,
+    })
+
+def _scheme_zone(scheme, zone):
+    if scheme is None:
+        return JsonResponse({'error': 'Scheme not found'}, status=404)
+    return JsonResponse({
+        'zone_code': zone.zone_code if zone else '',
+        'zone_name': zone.zone_name if zone else '',
+    })
+
+def _scheme_details(scheme, zone):
+    if scheme is None:
+        return JsonResponse({'success': False, 'error': 'Scheme not found'}, status=404)
+    return JsonResponse({
+        'success': True,
+        'zone_code': zone.zone_code if zone else '',
+        'zone_name': zone.zone_name if zone else '',
+        'default_cost_center': scheme.default_cost_center or '',
+    })
+
+def _scheme_row(scheme_id):
+    """A scheme row by id, or by code for callers that pass scheme_code."""
+    return reference_data.get('schemes', scheme_id) or reference_data.table('schemes').find('scheme_code', scheme_id)
+
+def _zone_of(scheme):
+    return reference_data.get('zones', scheme.zone_id) if scheme else None
 
 @login_required
 def get_supplier_details(request, supplier_id):
-    try:
-        supplier = Supplier.objects.get(id=supplier_id)
-        return JsonResponse({
-            'bank_name': supplier.bank.bank_name if supplier.bank else '',
-            'swift_code': supplier.bank.swift_code if supplier.bank else '',
-            'account_number': supplier.account_number,
-            'account_name': supplier.account_name,
-        })
-    except Supplier.DoesNotExist:
-        return JsonResponse({'error': 'Supplier not found'}, status=404)
+    supplier = reference_data.get('suppliers', supplier_id)
+    return _supplier_details(supplier, reference_data.get('banks', supplier.bank_id) if supplier else None)
 
 @login_required
 def get_scheme_zone(request, scheme_id):
-    try:
-        try:
-            scheme = Scheme.objects.get(id=int(scheme_id))
-        except (ValueError, Scheme.DoesNotExist):
-            scheme = Scheme.objects.get(scheme_code=scheme_id)
-        return JsonResponse({
-            'zone_code': scheme.zone.zone_code if scheme.zone else '',
-            'zone_name': scheme.zone.zone_name if scheme.zone else '',
-        })
-    except Scheme.DoesNotExist:
-        return JsonResponse({'error': 'Scheme not found'}, status=404)
+    scheme = _scheme_row(scheme_id)
+    return _scheme_zone(scheme, _zone_of(scheme))
 
 @login_required
 def get_scheme_details(request, scheme_id):
-    try:
-        try:
-            scheme = Scheme.objects.get(id=int(scheme_id))
-        except (ValueError, Scheme.DoesNotExist):
-            scheme = Scheme.objects.get(scheme_code=scheme_id)
-        return JsonResponse({
-            'success': True,
-            'zone_code': scheme.zone.zone_code if scheme.zone else '',
-            'zone_name': scheme.zone.zone_name if scheme.zone else '',
-            'default_cost_center': scheme.default_cost_center or '',
-        })
-    except Scheme.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Scheme not found'}, status=404)
\ No newline at end of file
+    scheme = _scheme_row(scheme_id)
+    return _scheme_details(scheme, _zone_of(scheme))
+
+def alogin_required(view_func):
+    """login_required for async views (Django 5.0's decorator only wraps sync ones)."""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+async def _ascheme_row(scheme_id):
+    return (
+        await reference_data.aget('schemes', scheme_id)
+        or (await reference_data.atable('schemes')).find('scheme_code', scheme_id)
+    )
+
+async def _azone_of(scheme):
+    return await reference_data.aget('zones', scheme.zone_id) if scheme else None
+
+@alogin_required
+async def aget_supplier_details(request, supplier_id):
+    supplier = await reference_data.aget('suppliers', supplier_id)
+    return _supplier_details(supplier, await reference_data.aget('banks', supplier.bank_id) if supplier else None)
+
+@alogin_required
+async def aget_scheme_zone(request, scheme_id):
+    scheme = await _ascheme_row(scheme_id)
+    return _scheme_zone(scheme, await _azone_of(scheme))
+
+@alogin_required
+async def aget_scheme_details(request, scheme_id):
+    scheme = await _ascheme_row(scheme_id)
+    return _scheme_details(scheme, await _azone_of(scheme))
+
+# ================ LIVE EVENTS ================
+
+@alogin_required
+async def event_stream(request):
+    """Pending counts and queue changes for the user's role, pushed as they happen (events.py)."""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held for the life of the stream; 204 tells
+        # EventSource not to reconnect, and pages keep their server-rendered counts.
+        return HttpResponse(status=204)
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    user = await request.auser()
+    response = StreamingHttpResponse(
+        events.stream(user, int(last_event_id) if last_event_id.isdigit() else None),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
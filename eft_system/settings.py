@@ -34,6 +34,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # /healthz and /readyz, answered before anything else runs
+    'eft_app.middleware.HealthCheckMiddleware',
+    # Outermost (after probes) so SQL count/time and view time cover the whole stack
+    'eft_app.middleware.RequestMetricsMiddleware',
+    'eft_app.middleware.PrimaryPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,23 +68,65 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'eft_system.wsgi.application'
+ASGI_APPLICATION = 'eft_system.asgi.application'
 
 # Database
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'crwb_eft_system',
-        'USER': 'root',
-        'PASSWORD': '',  # Change this
-        'HOST': 'localhost',
-        'PORT': '3306',
+        'NAME': os.getenv('EFT_DB_NAME', 'crwb_eft_system'),
+        'USER': os.getenv('EFT_DB_USER', 'root'),
+        'PASSWORD': os.getenv('EFT_DB_PASSWORD', ''),  # Change this
+        'HOST': os.getenv('EFT_DB_HOST', 'localhost'),
+        'PORT': os.getenv('EFT_DB_PORT', '3306'),
         'OPTIONS': {
             'charset': 'utf8mb4',
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+            'connect_timeout': int(os.getenv('EFT_DB_CONNECT_TIMEOUT', '5')),
         },
     }
 }
 
+# Database profile: "development" (default) opens a connection per request;
+# "production" keeps connections open per worker thread and pings them before
+# reuse. Persistent connections mean one open connection per worker thread,
+# so EFT_DB_POOL is checked against the server's connection budget
+# (see eft_app/checks.py).
+EFT_DB_PROFILE = os.getenv('EFT_DB_PROFILE', 'development')
+
+if EFT_DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.getenv('EFT_DB_CONN_MAX_AGE', '300')),
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# Optional read replica for reporting/export views (see eft_app/db_routers.py).
+# Set EFT_DB_REPLICA_HOST to enable; other connection settings default to the
+# primary's. Reads stay on the primary inside transactions and for
+# EFT_DB_REPLICA_PIN_SECONDS after a client writes.
+EFT_DB_REPLICA_ALIAS = None
+if os.getenv('EFT_DB_REPLICA_HOST'):
+    EFT_DB_REPLICA_ALIAS = 'replica'
+    DATABASES[EFT_DB_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('EFT_DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('EFT_DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('EFT_DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('EFT_DB_REPLICA_HOST'),
+        'PORT': os.getenv('EFT_DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['eft_app.db_routers.ReplicaRouter']
+EFT_DB_REPLICA_PIN_SECONDS = int(os.getenv('EFT_DB_REPLICA_PIN_SECONDS', '10'))
+
+EFT_DB_POOL = {
+    'WORKERS': int(os.getenv('EFT_WEB_WORKERS', '4')),        # gunicorn/uwsgi processes
+    'THREADS': int(os.getenv('EFT_WEB_THREADS', '1')),        # threads per process
+    'EXTRA': int(os.getenv('EFT_DB_EXTRA_CONNECTIONS', '5')),  # cron, workers, shells
+    'MAX_CONNECTIONS': int(os.getenv('EFT_DB_MAX_CONNECTIONS', '151')),  # MySQL default max_connections
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -118,6 +165,126 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
 
+# Shared cache. EFT_CACHE_BACKEND selects the backend:
+#   locmem  per-process memory (default; development and tests)
+#   file    a directory shared by all workers on one host (EFT_CACHE_LOCATION)
+#   redis   a Redis-compatible server, e.g. redis://127.0.0.1:6379/1
+#           (EFT_CACHE_LOCATION; needs the redis package)
+# Use file or redis in production so invalidation reaches every worker.
+EFT_CACHE_BACKEND = os.getenv('EFT_CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'crwb-eft'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+_cache_backend, _cache_location = CACHE_BACKENDS.get(EFT_CACHE_BACKEND, CACHE_BACKENDS['locmem'])
+CACHES = {
+    'default': {
+        'BACKEND': _cache_backend,
+        'LOCATION': os.getenv('EFT_CACHE_LOCATION', _cache_location),
+        'KEY_PREFIX': os.getenv('EFT_CACHE_KEY_PREFIX', 'crwb-eft'),
+        'TIMEOUT': 300,
+    }
+}
+
+# Dashboard polling APIs (api_system_activity/api_system_status) are served
+# from the cache for this many seconds; one request recomputes per key.
+EFT_API_CACHE_SECONDS = int(os.getenv('EFT_API_CACHE_SECONDS', '10'))
+
+# Readiness probe (/readyz): SELECT 1 time limit on MySQL, and the directory
+# generated artifacts are written to, which must be writable.
+EFT_HEALTH = {
+    'DB_TIMEOUT_MS': int(os.getenv('EFT_HEALTH_DB_TIMEOUT_MS', '1000')),
+    'ARTIFACT_DIR': os.getenv('EFT_ARTIFACT_DIR', str(MEDIA_ROOT)),
+}
+
+# Pending-count badges are cached per status and invalidated on workflow
+# transitions; the timeout only bounds staleness from out-of-band edits.
+# With the default locmem cache the invalidation only reaches the worker that
+# made the transition, so other workers show counts up to this old; use the
+# file or redis backend (EFT_CACHE_BACKEND) for badges that update at once.
+PENDING_COUNT_CACHE_TIMEOUT = 300
+
+# EXPORTED batches move to the archive tables this long after export
+# (manage.py archive_batches); they stay viewable at the same URLs.
+EFT_ARCHIVE_AFTER_MONTHS = int(os.getenv('EFT_ARCHIVE_AFTER_MONTHS', '24'))
+
+# Audit hash chain: store a verification checkpoint every N entries
+EFT_AUDIT_CHECKPOINT_INTERVAL = int(os.getenv('EFT_AUDIT_CHECKPOINT_INTERVAL', '1000'))
+
+# Reference-data snapshots (reference_data.py) are rebuilt when the shared
+# version stamp changes, and at least this often as a fallback for
+# per-process caches.
+EFT_REFDATA_MAX_AGE = int(os.getenv('EFT_REFDATA_MAX_AGE', '300'))
+
+# Serve the transaction-entry lookups (supplier/scheme details) from async
+# views; enable when running under an ASGI server (uvicorn, daphne).
+EFT_ASYNC_LOOKUPS = os.getenv('EFT_ASYNC_LOOKUPS', '') == '1'
+
+# Background jobs (jobs.py, manage.py run_jobs): processes per worker, how
+# often idle workers poll, heartbeat/stale thresholds and retry backoff.
+EFT_JOBS = {
+    'PROCESSES': int(os.getenv('EFT_JOB_PROCESSES', '2')),
+    'POLL_SECONDS': int(os.getenv('EFT_JOB_POLL_SECONDS', '2')),
+    'HEARTBEAT_SECONDS': 10,
+    'STALE_AFTER_SECONDS': int(os.getenv('EFT_JOB_STALE_AFTER_SECONDS', '60')),
+    'RETRY_BACKOFF_SECONDS': int(os.getenv('EFT_JOB_RETRY_BACKOFF_SECONDS', '30')),
+    'RETRY_BACKOFF_MAX_SECONDS': 3600,
+}
+
+# Export validation (validation.py): batches with at least PARALLEL_MIN_ROWS
+# lines are checked in CHUNK_SIZE slices on WORKERS threads ('thread' or
+# 'inline'; process pools are only for manage.py benchmark_validation).
+EFT_VALIDATION = {
+    'EXECUTOR': os.getenv('EFT_VALIDATION_EXECUTOR', 'thread'),
+    'WORKERS': int(os.getenv('EFT_VALIDATION_WORKERS', '4')),
+    'CHUNK_SIZE': int(os.getenv('EFT_VALIDATION_CHUNK_SIZE', '2000')),
+    'PARALLEL_MIN_ROWS': int(os.getenv('EFT_VALIDATION_PARALLEL_MIN_ROWS', '5000')),
+}
+
+# Live workflow events (events.py, /events/ under ASGI): how often each worker
+# process checks the audit log for transitions made elsewhere, the keep-alive
+# interval, and how long a stream stays open before the browser reconnects.
+EFT_EVENTS = {
+    'POLL_SECONDS': int(os.getenv('EFT_EVENTS_POLL_SECONDS', '5')),
+    'HEARTBEAT_SECONDS': 20,
+    'MAX_STREAM_SECONDS': int(os.getenv('EFT_EVENTS_MAX_STREAM_SECONDS', '3600')),
+}
+
+# Per-request SQL/timing instrumentation (Server-Timing header + JSON log line)
+EFT_REQUEST_METRICS = {
+    'ENABLED': True,
+    'SLOW_REQUEST_MS': int(os.getenv('EFT_SLOW_REQUEST_MS', '500')),
+    'SLOW_QUERY_COUNT': int(os.getenv('EFT_SLOW_QUERY_COUNT', '50')),
+    'SLOW_SQL_MS': int(os.getenv('EFT_SLOW_SQL_MS', '100')),
+    'EXPLAIN_SLOW_REQUESTS': os.getenv('EFT_EXPLAIN_SLOW_REQUESTS', '') == '1',
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'eft_app.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('EFT_REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'eft_app.jobs': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'eft_app.events': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"